@@ -1,12 +1,20 @@
+import hashlib
 import json
 import os
-from typing import Dict, Any, List, Optional
+import time
+from typing import Dict, Any, Optional, Tuple
 try:
     import google.generativeai as genai  # type: ignore
 except Exception:
     genai = None
 from datetime import datetime
 from dotenv import load_dotenv
+from report_renderer import render_report
+from llm_resilience import ResilientClient
+import rule_engine
+import serialization
+from resources import FrozenDict
+from prediction import Prediction, PredictionData
 
 # ============================================================
 # GEMINI CONFIGURATION
@@ -24,6 +32,10 @@ except Exception:
     pass
 GEMINI_MODEL = "gemini-2.0-flash-exp"
 GEMINI_ENABLED = False
+# Optional llm_cache.ResponseCache; set with configure_response_cache()
+_response_cache = None
+# Rate limit, retries and circuit breaker for API calls; replace with configure_client()
+_client = ResilientClient()
 
 def configure_gemini() -> bool:
     """Configures the Gemini API client. Falls back gracefully if unavailable."""
@@ -48,346 +60,22 @@ def configure_gemini() -> bool:
         print(f"⚠️ Failed to configure Gemini API: {str(e)} — using local fallback generation")
         return False
 
-# ============================================================
-# ENHANCED HTML TEMPLATE
-# ============================================================
+def configure_client(client) -> None:
+    """Use `client` (llm_resilience.ResilientClient) for API calls; None calls the SDK directly."""
+    global _client
+    _client = client
 
-ENHANCED_HTML_TEMPLATE = """
-<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>LUMÉRA AI - Facial Analysis Report</title>
-    <style>
-        * {{
-            margin: 0;
-            padding: 0;
-            box-sizing: border-box;
-        }}
-        
-        body {{
-            font-family: 'Poppins', 'Inter', 'Segoe UI', -apple-system, BlinkMacSystemFont, sans-serif;
-            background: linear-gradient(135deg, #181c2f 0%, #23244a 50%, #101a2a 100%);
-            color: #e6f6f2;
-            min-height: 100vh;
-            padding: 40px 20px;
-            line-height: 1.6;
-        }}
-        
-        .container {{
-            background: linear-gradient(135deg, rgba(35,36,74,0.98) 0%, rgba(160,132,238,0.12) 100%);
-            backdrop-filter: blur(32px) saturate(200%);
-            border-radius: 24px;
-            border: 2.5px solid #a084ee;
-            box-shadow: 0 20px 60px rgba(160,132,238,0.3), 0 8px 32px rgba(0,0,0,0.5);
-            padding: 40px;
-            max-width: 900px;
-            margin: 0 auto;
-            animation: fadeIn 0.6s ease-in;
-        }}
-        
-        @keyframes fadeIn {{
-            from {{ opacity: 0; transform: translateY(20px); }}
-            to {{ opacity: 1; transform: translateY(0); }}
-        }}
-        
-        @keyframes float {{
-            0%, 100% {{ transform: translateY(0); }}
-            50% {{ transform: translateY(-10px); }}
-        }}
-        
-        header {{
-            text-align: center;
-            margin-bottom: 40px;
-            padding-bottom: 30px;
-            border-bottom: 3px solid rgba(160,132,238,0.3);
-        }}
-        
-        .logo-container {{
-            display: flex;
-            align-items: center;
-            justify-content: center;
-            gap: 15px;
-            margin-bottom: 20px;
-        }}
-        
-        .logo {{
-            width: 60px;
-            height: 60px;
-            background: white;
-            border-radius: 12px;
-            padding: 8px;
-            box-shadow: 0 0 20px rgba(160,132,238,0.6);
-            animation: float 3s ease-in-out infinite;
-        }}
-        
-        .logo-text {{
-            font-size: 2em;
-            font-weight: 800;
-            background: linear-gradient(90deg, #a084ee 0%, #f472b6 50%, #6ee7b7 100%);
-            -webkit-background-clip: text;
-            -webkit-text-fill-color: transparent;
-            background-clip: text;
-            letter-spacing: -0.02em;
-        }}
-        
-        header h1 {{
-            color: #e6f6f2;
-            font-size: 2em;
-            font-weight: 700;
-            margin-bottom: 10px;
-            background: linear-gradient(90deg, #a084ee 0%, #f472b6 50%, #6ee7b7 100%);
-            -webkit-background-clip: text;
-            -webkit-text-fill-color: transparent;
-            background-clip: text;
-        }}
-        
-        .timestamp {{
-            font-size: 0.95em;
-            color: #b3b8e0;
-            font-weight: 500;
-        }}
-        
-        .image-container {{
-            text-align: center;
-            margin: 30px 0;
-        }}
-        
-        .image-container img {{
-            border-radius: 16px;
-            max-width: 300px;
-            height: auto;
-            box-shadow: 0 10px 30px rgba(160,132,238,0.4);
-            border: 3px solid #a084ee;
-            transition: transform 0.3s ease;
-        }}
-        
-        .image-container img:hover {{
-            transform: scale(1.05);
-        }}
-        
-        section {{
-            margin: 30px 0;
-            padding: 25px;
-            background: rgba(35,36,74,0.6);
-            border-radius: 16px;
-            border-left: 5px solid #a084ee;
-            transition: all 0.3s ease;
-            box-shadow: 0 4px 12px rgba(0,0,0,0.2);
-        }}
-        
-        section:hover {{
-            box-shadow: 0 8px 24px rgba(160,132,238,0.3);
-            transform: translateX(5px);
-            background: rgba(35,36,74,0.8);
-        }}
-        
-        section h2 {{
-            color: #e6f6f2;
-            font-size: 1.5em;
-            margin-bottom: 15px;
-            font-weight: 600;
-            display: flex;
-            align-items: center;
-            gap: 10px;
-        }}
-        
-        section h2 .emoji {{
-            font-size: 1.3em;
-        }}
-        
-        section p {{
-            color: #b3b8e0;
-            font-size: 1.05em;
-            line-height: 1.8;
-            margin: 10px 0;
-        }}
-        
-        ul {{
-            list-style-type: none;
-            padding: 0;
-            margin-top: 15px;
-        }}
-        
-        li {{
-            margin: 12px 0;
-            padding: 12px 15px;
-            background: rgba(24,28,47,0.6);
-            border-radius: 10px;
-            position: relative;
-            padding-left: 35px;
-            box-shadow: 0 2px 8px rgba(0, 0, 0, 0.3);
-            transition: all 0.2s ease;
-            color: #b3b8e0;
-        }}
-        
-        li:hover {{
-            box-shadow: 0 4px 12px rgba(160,132,238,0.2);
-            transform: translateX(3px);
-            background: rgba(35,36,74,0.8);
-        }}
-        
-        li.good-feature::before {{
-            content: "✨";
-            position: absolute;
-            left: 12px;
-            top: 12px;
-            font-size: 1.2em;
-        }}
-        
-        li.bad-feature::before {{
-            content: "⚠️";
-            position: absolute;
-            left: 12px;
-            top: 12px;
-            font-size: 1.2em;
-        }}
-        
-        li.neutral-feature::before {{
-            content: "ℹ️";
-            position: absolute;
-            left: 12px;
-            top: 12px;
-            font-size: 1.2em;
-        }}
-        
-        .section-skincare {{
-            border-left-color: #6ee7b7;
-        }}
-        
-        .section-grooming {{
-            border-left-color: #f472b6;
-        }}
-        
-        .section-attractiveness {{
-            border-left-color: #7f5af0;
-        }}
-        
-        .section-features {{
-            border-left-color: #6f6ee8;
-        }}
-        
-        footer {{
-            margin-top: 50px;
-            padding-top: 30px;
-            border-top: 3px solid rgba(160,132,238,0.3);
-            text-align: center;
-            color: #b3b8e0;
-            font-size: 0.95em;
-            font-weight: 500;
-        }}
-        
-        .footer-brand {{
-            font-weight: 700;
-            background: linear-gradient(90deg, #a084ee 0%, #f472b6 50%, #6ee7b7 100%);
-            -webkit-background-clip: text;
-            -webkit-text-fill-color: transparent;
-            background-clip: text;
-        }}
-        
-        @media (max-width: 768px) {{
-            body {{
-                padding: 20px 10px;
-            }}
-            
-            .container {{
-                padding: 25px;
-            }}
-            
-            header h1 {{
-                font-size: 1.8em;
-            }}
-            
-            .logo {{
-                width: 50px;
-                height: 50px;
-            }}
-            
-            .logo-text {{
-                font-size: 1.5em;
-            }}
-            
-            section {{
-                padding: 20px;
-            }}
-            
-            section h2 {{
-                font-size: 1.3em;
-            }}
-        }}
-        
-        @media print {{
-            body {{
-                background: white;
-            }}
-            
-            .container {{
-                box-shadow: none;
-                border: 2px solid #a084ee;
-            }}
-            
-            section {{
-                break-inside: avoid;
-            }}
-        }}
-    </style>
-</head>
-<body>
-    <div class="container">
-        <header>
-            <div class="logo-container">
-                <img src="/logo_new.jpg" alt="LUMÉRA AI Logo" class="logo">
-                <div class="logo-text">LUMÉRA AI</div>
-            </div>
-            <h1>Facial Analysis Report</h1>
-            <div class="timestamp">Generated: {timestamp}</div>
-        </header>
-        
-        <div class="image-container">
-            <img src="{image_path}" alt="Subject Image">
-        </div>
-
-        <section class="section-summary">
-            <h2><span class="emoji">�</span> Executive Summary</h2>
-            <p>{summary_text}</p>
-        </section>
-
-        <section class="section-skincare">
-            <h2><span class="emoji">🧴</span> Skincare Insights</h2>
-            <ul>{skincare_list}</ul>
-        </section>
-
-        <section class="section-grooming">
-            <h2><span class="emoji">�</span> Grooming & Hair Insights</h2>
-            <ul>{grooming_list}</ul>
-        </section>
-
-        <section class="section-attractiveness">
-            <h2><span class="emoji">⭐</span> Attractiveness Analysis</h2>
-            <p>{attractiveness_comment}</p>
-        </section>
-
-        <section class="section-features">
-            <h2><span class="emoji">�</span> Feature Analysis</h2>
-            <h3 style="color: #6ee7b7; margin-top: 20px; margin-bottom: 10px; font-size: 1.2em;">👍 Standout Features</h3>
-            <ul>{good_features_list}</ul>
-            
-            <h3 style="color: #f472b6; margin-top: 20px; margin-bottom: 10px; font-size: 1.2em;">⚠️ Areas for Enhancement</h3>
-            <ul>{bad_features_list}</ul>
-            
-            <h3 style="color: #b3b8e0; margin-top: 20px; margin-bottom: 10px; font-size: 1.2em;">ℹ️ Additional Observations</h3>
-            <ul>{neutral_features_list}</ul>
-        </section>
-        
-        <footer>
-            <p>Generated by <span class="footer-brand">LUMÉRA AI</span> - Advanced Facial Analysis System</p>
-            <p style="margin-top: 8px; font-size: 0.85em; color: #8b93c0;">Powered by AI-driven computer vision and analysis</p>
-        </footer>
-    </div>
-</body>
-</html>
-"""
+def _generate(function: str, prompt: str):
+    model = genai.GenerativeModel(GEMINI_MODEL)
+    if _client is None:
+        return model.generate_content(prompt)
+    # Raises CircuitOpen/RateLimited without calling the API; callers fall back to local generation
+    return _client.call(function, lambda timeout: model.generate_content(prompt, request_options={"timeout": timeout}))
+
+def configure_response_cache(cache) -> None:
+    """Reuse Gemini responses for predictions with the same signature (None disables caching)."""
+    global _response_cache
+    _response_cache = cache
 
 # ============================================================
 # IMPROVED PROMPT TEMPLATES
@@ -543,176 +231,188 @@ def clean_json_response(response_text: str) -> str:
     
     return response_text.strip()
 
-def _local_summary(data: Dict[str, Any]) -> str:
-    # Construct a lightweight, human-friendly summary from available fields
+def _digest(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+_last_descriptions = (None, None)
+
+def _descriptions_digest(feature_descriptions: Dict[str, Any]) -> str:
+    # resources.attribute_mapping() returns the same read-only object until the file changes: digest it once
+    global _last_descriptions
+    if not isinstance(feature_descriptions, FrozenDict):
+        return _digest(json.dumps(feature_descriptions, sort_keys=True))
+    obj, digest = _last_descriptions
+    if obj is not feature_descriptions:
+        digest = _digest(json.dumps(feature_descriptions, sort_keys=True))
+        _last_descriptions = (feature_descriptions, digest)
+    return digest
+
+def _cached(kind: str, data: Prediction, *context: str, lookup: bool = True):
+    """(key, cached value) for a Gemini call; the key covers the model and prompt so edits invalidate it."""
+    if _response_cache is None:
+        return None, None
     try:
-        attrs = []
-        getp = lambda k: data.get(k, {}).get("predicted") if isinstance(data.get(k), dict) else data.get(k)
-        if getp("male") is True:
-            attrs.append("male")
-        elif getp("male") is False:
-            attrs.append("female")
-        if getp("attractive") is True:
-            attrs.append("attractive features")
-        if getp("sharp_jawline") is True:
-            attrs.append("a defined jawline")
-        if getp("high_cheekbones") is True:
-            attrs.append("high cheekbones")
-        if getp("big_eyes") is True:
-            attrs.append("expressive eyes")
-        if getp("sharp_nose") is True:
-            attrs.append("a sharp nose")
-        if getp("well_groomed") is True:
-            attrs.append("well-groomed appearance")
-        bits = ", ".join(attrs[:-1]) + (" and " + attrs[-1] if attrs else "")
-        core = f"You appear {bits}." if bits else "Your image has been analyzed for key facial attributes."
-        extras = []
-        if getp("oily_skin") is True:
-            extras.append("Consider oil-control skincare for balance.")
-        if getp("curly_hair") is True:
-            extras.append("Curl-enhancing care can improve definition.")
-        tail = " ".join(extras)
-        return (core + " " + tail).strip()
+        key = _response_cache.key_for(kind, data, GEMINI_MODEL, *context)
+        return key, _response_cache.get(kind, key) if lookup else None
+    except Exception as e:
+        print(f"⚠️ Warning: LLM cache lookup failed: {str(e)}")
+        return None, None
+
+def _store(kind: str, key: Optional[str], value: Any, latency: float) -> None:
+    if _response_cache is None or key is None:
+        return
+    try:
+        _response_cache.put(kind, key, value, latency)
+    except Exception as e:
+        print(f"⚠️ Warning: LLM cache write failed: {str(e)}")
+
+def _local_summary(data: Prediction) -> str:
+    # Lightweight, human-friendly summary from the rules in rules.json
+    try:
+        return rule_engine.local_summary(data)
     except Exception:
         return "Your facial attributes have been analyzed and summarized."
 
-def generate_summary(data: Dict[str, Any]) -> str:
+def _gemini_summary(data: Prediction, lookup: bool = True) -> str:
+    """Gemini summary through the response cache. Raises on any API failure."""
+    cache_key, cached = _cached("summary", data, _digest(GEMINI_SUMMARY_PROMPT), lookup=lookup)
+    if cached is not None:
+        return cached
+    start = time.perf_counter()
+    data_str = data.to_json(pretty=True)
+    prompt = GEMINI_SUMMARY_PROMPT.format(data_str=data_str)
+    response = _generate("summary", prompt)
+    summary = response.text.strip()
+    print(f"✅ Generated summary ({len(summary)} characters)")
+    _store("summary", cache_key, summary, time.perf_counter() - start)
+    return summary
+
+def generate_summary(data: PredictionData) -> str:
     """Generates a short summary; uses Gemini if available, else local fallback."""
+    data = Prediction.coerce(data)
     if GEMINI_ENABLED and genai is not None:
         try:
-            data_str = json.dumps(data, indent=2)
-            prompt = GEMINI_SUMMARY_PROMPT.format(data_str=data_str)
-            model = genai.GenerativeModel(GEMINI_MODEL)
-            response = model.generate_content(prompt)
-            summary = response.text.strip()
-            print(f"✅ Generated summary ({len(summary)} characters)")
-            return summary
+            return _gemini_summary(data)
         except Exception as e:
             print(f"⚠️ Warning: Gemini summary failed: {str(e)}; using local fallback")
     return _local_summary(data)
 
-def _local_content(data: Dict[str, Any]) -> Dict[str, Any]:
-    def pred(k):
-        v = data.get(k)
-        if isinstance(v, dict):
-            return bool(v.get("predicted"))
-        return bool(v)
-    skincare = []
-    grooming = []
-    positives = []
-    improve = []
-    other = []
-    if pred("oily_skin"):
-        skincare.append("Use an oil-free cleanser and non-comedogenic moisturizer.")
-    if pred("dark_circles"):
-        skincare.append("Consider eye cream with caffeine and ensure proper sleep.")
-    if pred("curly_hair"):
-        grooming.append("Use sulfate-free shampoo and a curl-defining leave-in.")
-    if pred("has_beard"):
-        grooming.append("Apply beard oil and maintain regular trims for shape.")
-    if pred("sharp_jawline"):
-        positives.append("Well-defined jawline enhances facial structure.")
-    if pred("big_eyes"):
-        positives.append("Expressive eyes draw positive attention.")
-    if pred("attractive"):
-        positives.append("Overall attractive facial balance.")
-    if pred("patchy_beard"):
-        improve.append("Even growth can improve with regular grooming and patience.")
-    if pred("receeding_hairline"):
-        improve.append("Consult a specialist and consider volumizing hairstyles.")
-    other.append("Recommendations are informational and not medical advice.")
-    return {
-        "skincare_list": skincare[:4] or ["Maintain a consistent, gentle skincare routine."],
-        "grooming_list": grooming[:4] or ["Keep a regular grooming routine aligned with your hair type."],
-        "attractiveness_comment": "",
-        "positive_features_list": positives[:5] or ["Multiple strengths observed across features."],
-        "features_to_improve_list": improve[:4] or ["No major areas of improvement identified."],
-        "other_observations_list": other[:3]
-    }
-
-def generate_content(data: Dict[str, Any], feature_descriptions: Dict[str, Any]) -> Dict[str, Any]:
+def _local_content(data: Prediction) -> Dict[str, Any]:
+    return rule_engine.local_content(data)
+
+def _gemini_content(data: Prediction, feature_descriptions: Dict[str, Any], lookup: bool = True) -> Dict[str, Any]:
+    """Gemini content sections through the response cache. Raises on API or JSON failures."""
+    cache_key, cached = _cached("content", data, _digest(GEMINI_CONTENT_PROMPT),
+                                _descriptions_digest(feature_descriptions), lookup=lookup)
+    if cached is not None:
+        return cached
+    start = time.perf_counter()
+    prompt = GEMINI_CONTENT_PROMPT.format(
+        json_data=data.to_json(pretty=True),
+        feature_descriptions=serialization.dumps_str(feature_descriptions, pretty=True)
+    )
+    response = _generate("content", prompt)
+    raw_response = response.text.strip()
+    print("📝 Raw Gemini response received")
+    cleaned_response = clean_json_response(raw_response)
+    content = json.loads(cleaned_response)
+    required_keys = [
+        "skincare_list", "grooming_list", "attractiveness_comment",
+        "positive_features_list", "features_to_improve_list", "other_observations_list"
+    ]
+    for key in required_keys:
+        if key not in content:
+            if key.endswith("_list"):
+                content[key] = []
+            else:
+                content[key] = ""
+    print("✅ Content validation successful")
+    _store("content", cache_key, content, time.perf_counter() - start)
+    return content
+
+def generate_content(data: PredictionData, feature_descriptions: Dict[str, Any]) -> Dict[str, Any]:
     """Generates content; uses Gemini if available, else a local rules-based fallback."""
+    data = Prediction.coerce(data)
     if GEMINI_ENABLED and genai is not None:
         try:
-            prompt = GEMINI_CONTENT_PROMPT.format(
-                json_data=json.dumps(data, indent=2),
-                feature_descriptions=json.dumps(feature_descriptions, indent=2)
-            )
-            model = genai.GenerativeModel(GEMINI_MODEL)
-            response = model.generate_content(prompt)
-            raw_response = response.text.strip()
-            print("📝 Raw Gemini response received")
-            cleaned_response = clean_json_response(raw_response)
-            content = json.loads(cleaned_response)
-            required_keys = [
-                "skincare_list", "grooming_list", "attractiveness_comment",
-                "positive_features_list", "features_to_improve_list", "other_observations_list"
-            ]
-            for key in required_keys:
-                if key not in content:
-                    if key.endswith("_list"):
-                        content[key] = []
-                    else:
-                        content[key] = ""
-            print("✅ Content validation successful")
-            return content
+            return _gemini_content(data, feature_descriptions)
         except Exception as e:
             print(f"⚠️ Warning: Gemini content failed: {str(e)}; using local fallback")
     return _local_content(data)
 
-def format_list_items(items: List[str]) -> str:
-    """Formats a list of items into HTML <li> tags with validation."""
-    if not items or len(items) == 0:
-        return "<li>No specific recommendations at this time</li>"
-    
-    formatted_items = []
-    for item in items:
-        # Clean and validate each item
-        cleaned_item = str(item).strip()
-        if cleaned_item:
-            formatted_items.append(f"<li>{cleaned_item}</li>")
-    
-    return "\n".join(formatted_items) if formatted_items else "<li>No specific recommendations at this time</li>"
+# ============================================================
+# LOCAL-FIRST GENERATION
+# ============================================================
+# The request returns local (or already cached) text at once; the Gemini
+# version is produced afterwards by generate_with_llm() off the request path.
+
+def llm_available() -> bool:
+    return GEMINI_ENABLED and genai is not None
+
+def generate_local_first(data: PredictionData, feature_descriptions: Dict[str, Any]) -> Tuple[str, Dict[str, Any], str]:
+    """
+    Summary and content without waiting on the API.
+
+    Returns:
+        tuple: (summary, content, source); source is "gemini" when both came
+        from the response cache, else "local"
+    """
+    data = Prediction.coerce(data)
+    if llm_available():
+        _, summary = _cached("summary", data, _digest(GEMINI_SUMMARY_PROMPT))
+        _, content = _cached("content", data, _digest(GEMINI_CONTENT_PROMPT),
+                             _descriptions_digest(feature_descriptions))
+        if summary is not None and content is not None:
+            return summary, content, "gemini"
+    return _local_summary(data), _local_content(data), "local"
+
+def generate_with_llm(data: PredictionData, feature_descriptions: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+    """
+    Gemini summary and content (stored in the response cache), with no local fallback.
+
+    Raises:
+        RuntimeError: If Gemini is not configured
+        Exception: Any API or parsing failure
+    """
+    if not llm_available():
+        raise RuntimeError("Gemini is not configured")
+    data = Prediction.coerce(data)
+    # generate_local_first() already missed the cache for this prediction
+    return _gemini_summary(data, lookup=False), _gemini_content(data, feature_descriptions, lookup=False)
 
 def get_formatted_timestamp() -> str:
     """Returns current timestamp in a nice format."""
     return datetime.now().strftime("%B %d, %Y, %I:%M %p IST")
 
 def generate_html_report(
-    data: Dict[str, Any],
+    data: PredictionData,
     summary: str,
     content: Dict[str, Any],
-    image_path: str
+    image_path: str,
+    inline_css: bool = False,
+    timestamp: Optional[str] = None
 ) -> str:
-    """Generates HTML report by injecting text into the enhanced template."""
+    """Generates the HTML report from the precompiled template (all text is HTML-escaped)."""
     try:
         # Extract attractiveness data safely
-        attractive_prob = data.get("attractive", {}).get("probability", 0)
-        attractiveness_class = "hidden" if attractive_prob <= 0.7 else ""
-        attractive_score = round(attractive_prob * 10, 2)
+        attractive_prob = Prediction.coerce(data).probability("attractive")
         attractiveness_comment = content.get("attractiveness_comment", "") if attractive_prob > 0.7 else ""
-        
-        # Generate timestamp
-        timestamp = get_formatted_timestamp()
-        
-        # Generate HTML
-        html_report = ENHANCED_HTML_TEMPLATE.format(
-            timestamp=timestamp,
-            image_path=image_path,
-            summary_text=summary,
-            skincare_list=format_list_items(content.get("skincare_list", [])),
-            grooming_list=format_list_items(content.get("grooming_list", [])),
-            attractiveness_class=attractiveness_class,
-            attractive_score=attractive_score,
-            attractiveness_comment=attractiveness_comment,
-            good_features_list=format_list_items(content.get("positive_features_list", [])),
-            bad_features_list=format_list_items(content.get("features_to_improve_list", [])),
-            neutral_features_list=format_list_items(content.get("other_observations_list", []))
-        )
-        
+
+        html_report = render_report({
+            "timestamp": timestamp or get_formatted_timestamp(),
+            "image_path": image_path,
+            "summary_text": summary,
+            "skincare_list": content.get("skincare_list") or [],
+            "grooming_list": content.get("grooming_list") or [],
+            "attractiveness_comment": attractiveness_comment,
+            "good_features_list": content.get("positive_features_list") or [],
+            "bad_features_list": content.get("features_to_improve_list") or [],
+            "neutral_features_list": content.get("other_observations_list") or [],
+        }, inline_css=inline_css)
+
         print("✅ HTML report generated successfully")
         return html_report
-        
+
     except Exception as e:
         raise RuntimeError(f"Failed to generate HTML report: {str(e)}")
 
@@ -733,7 +433,7 @@ def main(json_path: str, feature_json_path: str, image_path: str, output_html: s
         
         # Step 2: Load JSON files
         print("\nStep 2: Loading data files...")
-        data = load_json_file(json_path)
+        data = Prediction.from_dict(load_json_file(json_path))
         feature_descriptions = load_json_file(feature_json_path)
         
         # Step 3: Validate image path
@@ -754,7 +454,7 @@ def main(json_path: str, feature_json_path: str, image_path: str, output_html: s
         
         # Step 6: Generate HTML
         print("\nStep 6: Compiling HTML report...")
-        html_report = generate_html_report(data, summary, content, image_path)
+        html_report = generate_html_report(data, summary, content, image_path, inline_css=True)
         
         # Step 7: Save file
         print("\nStep 7: Saving HTML file...")
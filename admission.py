@@ -0,0 +1,123 @@
+"""
+Admission control for expensive endpoints.
+
+Requests that cannot start right away wait in a bounded FIFO queue instead of
+piling up inside the server's thread pool. A request is rejected immediately
+when the queue is full (429) and after `queue_timeout` seconds of waiting
+(503); both carry a Retry-After hint. Besides the concurrency limit, the sum
+of request body sizes currently admitted is capped, since every in-flight
+upload ends up as a decoded image in memory.
+"""
+
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import metrics
+
+_active = metrics.gauge("admission_active_requests", "Requests currently being processed", ["endpoint"])
+_queue_depth = metrics.gauge("admission_queue_depth", "Requests waiting for a processing slot", ["endpoint"])
+_inflight_bytes = metrics.gauge("admission_inflight_bytes", "Request bytes held by admitted requests", ["endpoint"])
+_rejections = metrics.counter("admission_rejections_total", "Requests rejected by admission control", ["endpoint", "reason"])
+_wait_seconds = metrics.histogram(
+    "admission_wait_seconds", "Time spent waiting for admission", ["endpoint"],
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request cannot be admitted; carries the HTTP status and Retry-After."""
+
+    def __init__(self, message: str, status_code: int, retry_after: int):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    def __init__(self, name: str, max_concurrency: int, max_queue: int,
+                 max_inflight_bytes: int, queue_timeout: float):
+        self.name = name
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue = max(0, max_queue)
+        self.max_inflight_bytes = max(1, max_inflight_bytes)
+        self.queue_timeout = queue_timeout
+
+        self._cond = threading.Condition()
+        self._waiters = deque()
+        self._active = 0
+        self._inflight = 0
+        # Smoothed service time, used to estimate Retry-After
+        self._service_ewma = 1.0
+
+    def _fits(self, charge: int) -> bool:
+        return self._active < self.max_concurrency and self._inflight + charge <= self.max_inflight_bytes
+
+    def _retry_after(self) -> int:
+        backlog = len(self._waiters) + self._active
+        return max(1, math.ceil(self._service_ewma * backlog / self.max_concurrency))
+
+    def _update_gauges(self) -> None:
+        _active.set(self._active, endpoint=self.name)
+        _queue_depth.set(len(self._waiters), endpoint=self.name)
+        _inflight_bytes.set(self._inflight, endpoint=self.name)
+
+    def _reject(self, message: str, status_code: int, reason: str) -> AdmissionRejected:
+        _rejections.inc(endpoint=self.name, reason=reason)
+        return AdmissionRejected(message, status_code, self._retry_after())
+
+    @contextmanager
+    def admit(self, nbytes: int = 0):
+        """
+        Hold a processing slot for the duration of the `with` block.
+
+        Args:
+            nbytes (int): Size of the request body; counted against the in-flight budget.
+                Requests larger than the whole budget are charged the full budget so
+                they can still run on their own.
+
+        Raises:
+            AdmissionRejected: If the queue is full or the wait times out.
+        """
+        charge = min(max(0, nbytes), self.max_inflight_bytes)
+        start = time.monotonic()
+
+        with self._cond:
+            if self._waiters or not self._fits(charge):
+                if len(self._waiters) >= self.max_queue:
+                    raise self._reject("Server is busy, please retry shortly.", 429, "queue_full")
+
+                ticket = object()
+                self._waiters.append(ticket)
+                self._update_gauges()
+                deadline = start + self.queue_timeout
+                try:
+                    # FIFO: only the head of the queue may take a freed slot
+                    while self._waiters[0] is not ticket or not self._fits(charge):
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            raise self._reject("Server is overloaded, please retry later.", 503, "queue_timeout")
+                        self._cond.wait(remaining)
+                finally:
+                    self._waiters.remove(ticket)
+                    self._update_gauges()
+                    self._cond.notify_all()
+
+            self._active += 1
+            self._inflight += charge
+            self._update_gauges()
+
+        admitted = time.monotonic()
+        _wait_seconds.observe(admitted - start, endpoint=self.name)
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._active -= 1
+                self._inflight -= charge
+                self._service_ewma = 0.8 * self._service_ewma + 0.2 * (time.monotonic() - admitted)
+                self._update_gauges()
+                self._cond.notify_all()
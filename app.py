@@ -1,10 +1,12 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, abort
+from flask.json.provider import JSONProvider
 from flask_cors import CORS
 import os
 import datetime
 import base64
-import tempfile
-import shutil
+import re
+import uuid
+from pathlib import Path
 from production import (
     init_production,
     ALLOWED_ORIGINS,
@@ -13,6 +15,45 @@ from production import (
     ACCEPTED_DIR,
     REPORTS_DIR,
     DEBUG,
+    PREDICT_MAX_CONCURRENCY,
+    PREDICT_MAX_QUEUE,
+    PREDICT_MAX_INFLIGHT_BYTES,
+    PREDICT_QUEUE_TIMEOUT,
+    UPLOAD_MAX_SIDE,
+    UPLOAD_MAX_PIXELS,
+    DETECTION_TARGET_SIDE,
+    REPORT_MODE,
+    LLM_MODE,
+    LLM_UPGRADE_WORKERS,
+    LLM_UPGRADE_MAX_PENDING,
+    REPORT_DB_PATH,
+    RETENTION_INTERVAL,
+    REPORTS_TTL_SECONDS,
+    CONSENT_DB_PATH,
+    MODEL_REGISTRY_CONFIG,
+    MODEL_REGISTRY_POLL_INTERVAL,
+    INFERENCE_TTA,
+    MULTI_FACE_MIN_SIZE,
+    MULTI_FACE_MAX_FACES,
+    LLM_CACHE_ENABLED,
+    LLM_CACHE_DB_PATH,
+    LLM_CACHE_TTL_SECONDS,
+    LLM_CACHE_MAX_ENTRIES,
+    LLM_CACHE_BUCKETS,
+    GEMINI_RATE_PER_MINUTE,
+    GEMINI_BURST,
+    GEMINI_MAX_WAIT,
+    GEMINI_TIMEOUT,
+    GEMINI_MAX_RETRIES,
+    GEMINI_BREAKER_FAILURES,
+    GEMINI_BREAKER_RESET,
+    JSON_BACKEND,
+    RESPONSE_INLINE_CROP,
+    CROP_FORMAT,
+    CROP_QUALITY,
+    DISPLAY_MAX_SIDE,
+    KEEP_FULL_RESOLUTION,
+    PENDING_CROPS_DIR,
 )
 
 # Initialize production settings
@@ -34,15 +75,40 @@ if not ensure_model_loader_exists():
     print("   Please configure MODEL_LOADER_URL in backend/.env")
     sys.exit(1)
 
-from model_loader import predict_attributes_from_bytes, load_model
 from Gemini import (
     configure_gemini,
+    configure_client as gemini_configure_client,
+    configure_response_cache as gemini_configure_response_cache,
     generate_summary as gemini_generate_summary,
     generate_content as gemini_generate_content,
+    generate_local_first as gemini_generate_local_first,
+    generate_with_llm as gemini_generate_with_llm,
+    llm_available as gemini_llm_available,
     generate_html_report as gemini_generate_html_report,
-    load_json_file as gemini_load_json_file,
+    get_formatted_timestamp as gemini_formatted_timestamp,
 )
-from temp import crop_face
+from temp import face_regions
+from image_upload import read_image_upload, decode_image, InvalidImage, ImageTooLarge
+from admission import AdmissionController, AdmissionRejected
+from model_registry import ModelRegistry, RegistryWatcher
+from report_store import ReportStore, RenderCache
+from consent_store import ConsentIndex
+from llm_cache import ResponseCache
+from llm_resilience import ResilientClient
+from llm_upgrade import ReportUpgrader
+import resources
+import serialization
+from media import ETagCache, hashed_filename, send_media, conditional_response
+from crop_encoding import BYTE_BUCKETS, CropEncoder, full_resolution_name
+from retention import (
+    RetentionService,
+    default_policies,
+    consent_protection,
+    shard_path,
+    resolve_path,
+    relative_url_path,
+)
+import metrics
 
 BASE_DIR = STATIC_DIR.parent
 STATIC_DIR_PATH = STATIC_DIR
@@ -50,18 +116,122 @@ USER_IMAGES_DIR_PATH = USER_IMAGES_DIR
 ACCEPTED_DIR_PATH = ACCEPTED_DIR
 REPORTS_DIR_PATH = REPORTS_DIR
 
+
+class ServiceJSONProvider(JSONProvider):
+    """Flask JSON provider backed by serialization: jsonify() responses are compact and use the fast encoder."""
+
+    mimetype = "application/json"
+
+    def dumps(self, obj, **kwargs):
+        return serialization.dumps_str(obj)
+
+    def loads(self, s, **kwargs):
+        return serialization.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(serialization.dumps(obj) + b"\n", mimetype=self.mimetype)
+
+
 app = Flask(__name__, static_folder=str(STATIC_DIR_PATH), static_url_path="/static")
 app.config["MAX_CONTENT_LENGTH"] = 10 * 1024 * 1024  # 10 MB upload limit
+# Compact jsonify() responses through orjson when available
+print(f"✅ JSON backend: {serialization.configure(JSON_BACKEND)}")
+app.json = ServiceJSONProvider(app)
 
 cors_origins = set(ALLOWED_ORIGINS)
 cors_origins.update({"http://localhost:3000", "http://127.0.0.1:3000"})
 CORS(app, origins=list(cors_origins), supports_credentials=True)
 
-# Load the model when the app starts
+# Load the model versions when the app starts
 print("Loading AI model...")
-model = load_model()
+model_registry = ModelRegistry(MODEL_REGISTRY_CONFIG, tta=INFERENCE_TTA)
+if not model_registry.reload():
+    print("❌ CRITICAL: no model version could be loaded")
+    sys.exit(1)
 print("Model loaded successfully!")
 
+# Parse the read-only JSON resources once and check them against the served model
+try:
+    for warning in resources.validate(model_registry.attributes(), model_registry.threshold_paths()):
+        print(f"⚠️ {warning}")
+except Exception as e:
+    print(f"❌ CRITICAL: invalid resource file: {str(e)}")
+    sys.exit(1)
+
+if MODEL_REGISTRY_POLL_INTERVAL > 0:
+    registry_watcher = RegistryWatcher(model_registry, MODEL_REGISTRY_POLL_INTERVAL)
+    registry_watcher.start()
+
+predict_admission = AdmissionController(
+    "predict",
+    max_concurrency=PREDICT_MAX_CONCURRENCY,
+    max_queue=PREDICT_MAX_QUEUE,
+    max_inflight_bytes=PREDICT_MAX_INFLIGHT_BYTES,
+    queue_timeout=PREDICT_QUEUE_TIMEOUT,
+)
+
+report_store = ReportStore(REPORT_DB_PATH)
+report_html_cache = RenderCache()
+consent_index = ConsentIndex(CONSENT_DB_PATH, ACCEPTED_DIR_PATH)
+REPORT_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+# Served by /media with content ETags
+MEDIA_ROOTS = {"user_images": USER_IMAGES_DIR_PATH, "reports": REPORTS_DIR_PATH}
+media_etags = ETagCache()
+# One encoding per consumer: model input in memory, display crop on disk and in the response,
+# full resolution kept privately for consent only when KEEP_FULL_RESOLUTION is on
+crop_encoder = CropEncoder(CROP_FORMAT, CROP_QUALITY, DISPLAY_MAX_SIDE, keep_full=KEEP_FULL_RESOLUTION)
+predict_response_bytes = metrics.histogram("predict_response_bytes", "Size of /predict JSON responses",
+                                           buckets=BYTE_BUCKETS)
+
+gemini_configure_client(ResilientClient(
+    rate_per_minute=GEMINI_RATE_PER_MINUTE,
+    burst=GEMINI_BURST,
+    max_wait=GEMINI_MAX_WAIT,
+    timeout=GEMINI_TIMEOUT,
+    max_retries=GEMINI_MAX_RETRIES,
+    failure_threshold=GEMINI_BREAKER_FAILURES,
+    reset_timeout=GEMINI_BREAKER_RESET,
+))
+
+# Local-first text needs the report store to hold the upgraded version
+SPECULATIVE_TEXT = LLM_MODE == "speculative" and REPORT_MODE != "html"
+report_upgrader = None
+if SPECULATIVE_TEXT:
+    report_upgrader = ReportUpgrader(report_store, gemini_generate_with_llm, workers=LLM_UPGRADE_WORKERS,
+                                     max_pending=LLM_UPGRADE_MAX_PENDING)
+
+llm_cache = None
+if LLM_CACHE_ENABLED:
+    llm_cache = ResponseCache(LLM_CACHE_DB_PATH, ttl_seconds=LLM_CACHE_TTL_SECONDS,
+                              max_entries=LLM_CACHE_MAX_ENTRIES, buckets=LLM_CACHE_BUCKETS)
+    gemini_configure_response_cache(llm_cache)
+
+
+def _purge_stored_reports(now: float):
+    if REPORTS_TTL_SECONDS is not None:
+        report_store.delete_older_than(now - REPORTS_TTL_SECONDS)
+    if llm_cache is not None:
+        llm_cache.purge_expired()
+
+
+if RETENTION_INTERVAL > 0:
+    retention_service = RetentionService(
+        default_policies(),
+        consent_protection(ACCEPTED_DIR_PATH, consent_index.is_consented),
+        interval=RETENTION_INTERVAL,
+        on_pass=_purge_stored_reports,
+    )
+    retention_service.start()
+
+
+@app.after_request
+def _add_cache_headers(response):
+    # Stylesheets are referenced with a content-hash query string, so they never go stale
+    if request.path.startswith("/static/css/") and request.args.get("v") and response.status_code == 200:
+        response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+    return response
+
 
 def _error(message: str, status_code: int):
     return jsonify({"detail": message}), status_code
@@ -69,100 +239,203 @@ def _error(message: str, status_code: int):
 
 @app.route("/predict", methods=["POST"])
 def predict():
+    try:
+        with predict_admission.admit(request.content_length or 0):
+            return _predict()
+    except AdmissionRejected as exc:
+        response, status_code = _error(exc.message, exc.status_code)
+        response.headers["Retry-After"] = str(exc.retry_after)
+        return response, status_code
+
+
+def _predict():
     file_storage = request.files.get("file")
     if file_storage is None or file_storage.filename == "":
         return _error("No file uploaded.", 400)
 
-    content_type = file_storage.mimetype or ""
-    if not content_type.startswith("image/"):
-        return _error("Invalid file type. Please upload an image.", 400)
-
-    image_bytes = file_storage.read()
+    # The mimetype is client-controlled; trust the magic bytes instead
+    try:
+        image_info, image_bytes = read_image_upload(
+            file_storage.stream, max_side=UPLOAD_MAX_SIDE, max_pixels=UPLOAD_MAX_PIXELS
+        )
+        image = decode_image(image_bytes, image_info, target_side=DETECTION_TARGET_SIDE)
+    except ImageTooLarge as exc:
+        return _error(str(exc), 413)
+    except InvalidImage as exc:
+        return _error(str(exc), 400)
 
     original_filename = os.path.basename(file_storage.filename or "uploaded.jpg")
     name_root, _ = os.path.splitext(original_filename)
     timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S_%f")
-    output_filename = f"{name_root}_{timestamp}.jpg"
-    output_path = USER_IMAGES_DIR_PATH / output_filename
 
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".jpg") as tmp:
-        tmp.write(image_bytes)
-        tmp_path = tmp.name
+    # multi_face=1 scores every face of a group photo; the report covers the largest one
+    multi_face = (request.form.get("multi_face") or request.args.get("multi_face", "")).lower() in ("1", "true")
+    # inline_crop=0 leaves the base64 crop out of the response (clients load cropped_image_url instead)
+    inline_crop = (request.form.get("inline_crop") or request.args.get("inline_crop", "")).lower()
+    inline_crop = inline_crop in ("1", "true") if inline_crop else RESPONSE_INLINE_CROP
+    # Detection may run on a reduced decode; bounding boxes are reported in upload pixels
+    scale_x, scale_y = image_info.width / image.shape[1], image_info.height / image.shape[0]
 
     try:
-        cropped_path = crop_face(tmp_path, output_path=str(output_path), expand_ratio=0.3)
+        if multi_face:
+            regions = face_regions(image, expand_ratio=0.3, min_size=MULTI_FACE_MIN_SIZE, max_faces=MULTI_FACE_MAX_FACES)
+        else:
+            regions = face_regions(image, expand_ratio=0.3, max_faces=1)
+        full_image = image
+        if crop_encoder.keep_full and (image.shape[1], image.shape[0]) != (image_info.width, image_info.height):
+            # The kept copy is cut from a full-resolution decode, not the reduced detection one
+            full_image = decode_image(image_bytes, image_info, target_side=None)
+        full_y, full_x = full_image.shape[0] / image.shape[0], full_image.shape[1] / image.shape[1]
+        crops = []
+        for region in regions:
+            x1, y1, x2, y2 = region["bbox"]
+            full_crop = full_image[round(y1 * full_y):round(y2 * full_y), round(x1 * full_x):round(x2 * full_x)]
+            crops.append(crop_encoder.encode(region["image"], full_crop))
+    except InvalidImage as exc:
+        return _error(str(exc), 400)
     except ValueError:
         return _error("face is not visible please try again", 400)
     except Exception as exc:
         return _error(f"Cropping failed: {exc}", 500)
     finally:
-        try:
-            os.remove(tmp_path)
-        except OSError:
-            pass
+        del image, image_bytes
+        full_image = full_crop = None
 
+    # Content-hashed names let /media serve the crops as immutable
+    faces = []
     try:
-        with open(cropped_path, "rb") as cropped_file:
-            cropped_bytes = cropped_file.read()
-    except Exception:
-        return _error("Failed to read cropped image.", 500)
+        for index, (region, crop) in enumerate(zip(regions, crops)):
+            stem = f"{name_root}_{timestamp}" if index == 0 else f"{name_root}_{timestamp}_face{index + 1}"
+            crop_path = shard_path(USER_IMAGES_DIR_PATH, hashed_filename(stem, crop.display, crop.suffix))
+            with open(crop_path, "wb") as crop_file:
+                crop_file.write(crop.display)
+            media_etags.prime(crop_path, crop.display)
+            if crop.full is not None:
+                full_path = shard_path(PENDING_CROPS_DIR, full_resolution_name(crop_path.name))
+                with open(full_path, "wb") as full_file:
+                    full_file.write(crop.full)
+            faces.append({"path": str(crop_path), "bbox": region["bbox"]})
+    except OSError:
+        return _error("Failed to store cropped image.", 500)
+    finally:
+        del regions
+    output_path = Path(faces[0]["path"])
+    output_filename = output_path.name
 
-    cropped_image_data_url = "data:image/jpeg;base64," + base64.b64encode(cropped_bytes).decode("utf-8")
+    cropped_image_data_url = None
+    if inline_crop:
+        cropped_image_data_url = f"data:{crops[0].mimetype};base64," + base64.b64encode(crops[0].display).decode("utf-8")
 
     try:
-        prediction = predict_attributes_from_bytes(cropped_bytes)
+        # X-Model-Version pins a loaded version, e.g. to compare versions side by side
+        pinned_version = request.headers.get("X-Model-Version")
+        if multi_face:
+            # All faces go through the model as one batch
+            predictions, model_version = model_registry.predict_batch([c.model_input for c in crops], version=pinned_version)
+        else:
+            prediction, model_version = model_registry.predict(crops[0].model_input, version=pinned_version)
+            predictions = [prediction]
     finally:
         cleanup_after_prediction()
 
-    if isinstance(prediction, dict) and "error" in prediction:
-        return _error(f"Model prediction failed: {prediction['error']}", 500)
+    for prediction in predictions:
+        if isinstance(prediction, dict) and "error" in prediction:
+            return _error(f"Model prediction failed: {prediction['error']}", 500)
+    prediction = predictions[0]
 
     try:
         configure_gemini()
     except Exception as exc:
         return _error(f"Gemini configuration failed: {exc}", 500)
 
-    mapping_path = BASE_DIR / "attribute_mapping.json"
     try:
-        feature_descriptions = gemini_load_json_file(str(mapping_path))
+        feature_descriptions = resources.attribute_mapping()
     except Exception as exc:
         return _error(f"Failed to load attribute mapping: {exc}", 500)
 
-    summary_text = gemini_generate_summary(prediction)
-    content_sections = gemini_generate_content(prediction, feature_descriptions)
-
-    report_filename = f"report_{name_root}_{timestamp}.html"
-    report_path = REPORTS_DIR_PATH / report_filename
-    try:
-        base_url_for_image = request.host_url.rstrip("/")
-        absolute_image_url = f"{base_url_for_image}/static/user_images/{output_filename}"
-        html = gemini_generate_html_report(
-            data=prediction,
-            summary=summary_text,
-            content=content_sections,
-            image_path=absolute_image_url,
-        )
-        with open(report_path, "w", encoding="utf-8") as report_file:
-            report_file.write(html)
-    except Exception as exc:
-        return _error(f"Failed to generate HTML report: {exc}", 500)
+    text_source, upgrading = None, False
+    if SPECULATIVE_TEXT:
+        # Don't wait on Gemini: cached or local text now, the Gemini version later
+        summary_text, content_sections, text_source = gemini_generate_local_first(prediction, feature_descriptions)
+        upgrading = text_source == "local" and gemini_llm_available()
+    else:
+        summary_text = gemini_generate_summary(prediction)
+        content_sections = gemini_generate_content(prediction, feature_descriptions)
 
     base_url = request.host_url.rstrip("/")
-    report_url = f"{base_url}/static/reports/{report_filename}"
-    cropped_image_url = f"{base_url}/static/user_images/{output_filename}"
+    image_url = f"/media/user_images/{relative_url_path(USER_IMAGES_DIR_PATH, output_path)}"
 
-    return jsonify({
+    report_id = None
+    if REPORT_MODE == "html":
+        try:
+            html = gemini_generate_html_report(
+                data=prediction,
+                summary=summary_text,
+                content=content_sections,
+                image_path=f"{base_url}{image_url}",
+            ).encode("utf-8")
+            report_path = shard_path(REPORTS_DIR_PATH, hashed_filename(f"report_{name_root}_{timestamp}", html, ".html"))
+            with open(report_path, "wb") as report_file:
+                report_file.write(html)
+            media_etags.prime(report_path, html)
+        except Exception as exc:
+            return _error(f"Failed to generate HTML report: {exc}", 500)
+        report_url = f"{base_url}/media/reports/{relative_url_path(REPORTS_DIR_PATH, report_path)}"
+    else:
+        report_id = uuid.uuid4().hex
+        try:
+            report_store.put(report_id, {
+                "report_id": report_id,
+                "generated_at": gemini_formatted_timestamp(),
+                "image_url": image_url,
+                "prediction": prediction.as_dict(),
+                "model_version": model_version,
+                "summary": summary_text,
+                "content": content_sections,
+                "source": text_source,
+                "upgrading": upgrading,
+            }, image_filename=output_filename)
+        except Exception as exc:
+            return _error(f"Failed to store report: {exc}", 500)
+        if upgrading and not report_upgrader.submit(report_id, prediction, feature_descriptions):
+            upgrading = False
+            report_store.update(report_id, {"upgrading": False})
+        report_url = f"{base_url}/static/report_viewer.html?id={report_id}"
+
+    cropped_image_url = f"{base_url}{image_url}"
+
+    faces_payload = None
+    if multi_face:
+        faces_payload = []
+        for face, face_prediction in zip(faces, predictions):
+            x1, y1, x2, y2 = (int(round(v * s)) for v, s in zip(face["bbox"], (scale_x, scale_y, scale_x, scale_y)))
+            face_url = f"/media/user_images/{relative_url_path(USER_IMAGES_DIR_PATH, face['path'])}"
+            faces_payload.append({
+                "bbox": {"x": x1, "y": y1, "width": x2 - x1, "height": y2 - y1},
+                "prediction": face_prediction.as_dict(),
+                "cropped_image_url": f"{base_url}{face_url}",
+                "cropped_image_filename": os.path.basename(face["path"]),
+            })
+
+    response = jsonify({
         "success": True,
-        "prediction": prediction,
+        "prediction": prediction.as_dict(),
+        "model_version": model_version,
         "summary": summary_text,
         "skincare_recommendations": content_sections.get("skincare_list", []),
         "grooming_recommendations": content_sections.get("grooming_list", []),
         "grouped_attributes": None,
+        "report_id": report_id,
         "report_url": report_url,
+        "text_source": text_source,
+        "upgrading": upgrading,
         "cropped_image": cropped_image_data_url,
         "cropped_image_url": cropped_image_url,
         "cropped_image_filename": output_filename,
+        "faces": faces_payload,
     })
+    predict_response_bytes.observe(response.content_length or 0)
+    return response
 
 
 @app.route("/health", methods=["GET"])
@@ -170,6 +443,58 @@ def health_check():
     return jsonify({"status": "healthy", "message": "Lumera AI Facial Analysis API is running"})
 
 
+def _load_report(report_id: str):
+    if not REPORT_ID_RE.match(report_id):
+        abort(404)
+    report = report_store.get(report_id)
+    if report is None:
+        abort(404)
+    return report
+
+
+@app.route("/reports/<report_id>.json", methods=["GET"])
+def report_json(report_id):
+    report = _load_report(report_id)
+    # The revision changes when a background upgrade rewrites the report; polling clients get 304 until then
+    body = serialization.dumps({**report["payload"], "revision": report["revision"]})
+    return conditional_response(request, body, "application/json", "report_json")
+
+
+@app.route("/reports/<report_id>.html", methods=["GET"])
+def report_html(report_id):
+    """Materializes a stored report as HTML for clients that cannot run the viewer."""
+    report = _load_report(report_id)
+    payload = report["payload"]
+
+    def render():
+        return gemini_generate_html_report(
+            data=payload["prediction"],
+            summary=payload["summary"],
+            content=payload["content"],
+            image_path=payload["image_url"],
+            timestamp=payload.get("generated_at"),
+        )
+
+    html = report_html_cache.get_or_render(report_id, report["revision"], render)
+    return conditional_response(request, html, "text/html", "report_html")
+
+
+@app.route("/media/<root>/<path:filename>", methods=["GET"])
+def media(root, filename):
+    """User images and HTML report files with content ETags (immutable when the name carries the hash)."""
+    return send_media(MEDIA_ROOTS, root, filename, media_etags)
+
+
+@app.route("/models", methods=["GET"])
+def models_endpoint():
+    return jsonify({"versions": model_registry.describe()})
+
+
+@app.route("/metrics", methods=["GET"])
+def metrics_endpoint():
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+
 @app.route("/consent", methods=["POST"])
 def consent():
     data = request.get_json(silent=True) or {}
@@ -178,18 +503,27 @@ def consent():
         return _error("filename is required", 400)
 
     safe_name = os.path.basename(filename)
-    src_path = USER_IMAGES_DIR_PATH / safe_name
-    if not src_path.exists():
+    src_path = resolve_path(USER_IMAGES_DIR_PATH, safe_name)
+    if src_path is None:
         return _error("Source image not found", 404)
 
-    dst_path = ACCEPTED_DIR_PATH / safe_name
+    # Accept the full-resolution copy when one was kept; the display crop otherwise
+    full_name = full_resolution_name(safe_name)
+    pending_path = resolve_path(PENDING_CROPS_DIR, full_name)
+    accepted_name = full_name if pending_path is not None or consent_index.is_consented(full_name) else safe_name
+    dst_path = shard_path(ACCEPTED_DIR_PATH, accepted_name)
     try:
-        shutil.copy2(src_path, dst_path)
+        entry = consent_index.record(pending_path or src_path, dst_path,
+                                     prediction=report_store.prediction_for_image(safe_name))
     except Exception as exc:
         return _error(f"Failed to record consent: {exc}", 500)
+    if pending_path is not None:
+        # Now in accepted (linked or copied); nothing is left to expire
+        pending_path.unlink(missing_ok=True)
 
     base_url = request.host_url.rstrip("/")
-    return jsonify({"success": True, "accepted_image_url": f"{base_url}/static/accepted/{safe_name}"})
+    accepted_url = f"{base_url}/static/accepted/{entry['path']}"
+    return jsonify({"success": True, "accepted_image_url": accepted_url})
 
 
 if __name__ == "__main__":
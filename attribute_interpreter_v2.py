@@ -1,185 +1,244 @@
 import json
 import argparse
+import collections
+import multiprocessing
 import os
+import sys
+import time
+
+import rule_engine
+import serialization
+from prediction import Prediction
 
 def load_json(path):
     with open(path, 'r', encoding='utf-8') as f:
         return json.load(f)
 
+ATTRIBUTE_GROUPS = {
+    'image_quality': ['image_id', 'blurry_image'],
+    'facial_features': ['attractive', 'sharp_jawline', 'high_cheekbones', 'big_eyes', 'big_lips', 'sharp_nose', 'double chin'],
+    'skin_condition': ['clear_skin', 'dark_circles', 'oily_skin'],
+    'hair_features': ['bald', 'receeding_hairline', 'long_hair', 'curly_hair', 'grey_hair', 'black_hair'],
+    'facial_hair': ['has_beard', 'patchy_beard', 'has_mustache'],
+    'grooming': ['well_groomed', 'has_makeup', 'wearing_glasses', 'wearing_hat', 'thick_eyebrow'],
+    'expression': ['smiling', 'mouth_open'],
+    'demographics': ['adult', 'old', 'male', 'veil']
+}
+
 def group_attributes(model_output):
     """Group related attributes together for better summary generation."""
-    groups = {
-        'image_quality': ['image_id', 'blurry_image'],
-        'facial_features': ['attractive', 'sharp_jawline', 'high_cheekbones', 'big_eyes', 'big_lips', 'sharp_nose', 'double chin'],
-        'skin_condition': ['clear_skin', 'dark_circles', 'oily_skin'],
-        'hair_features': ['bald', 'receeding_hairline', 'long_hair', 'curly_hair', 'grey_hair', 'black_hair'],
-        'facial_hair': ['has_beard', 'patchy_beard', 'has_mustache'],
-        'grooming': ['well_groomed', 'has_makeup', 'wearing_glasses', 'wearing_hat', 'thick_eyebrow'],
-        'expression': ['smiling', 'mouth_open'],
-        'demographics': ['adult', 'old', 'male', 'veil']
-    }
-    
+    if isinstance(model_output, Prediction):
+        # Bitmask lookups; values are 0/1
+        return model_output.groups(ATTRIBUTE_GROUPS)
     grouped_results = {}
-    for group_name, attrs in groups.items():
+    for group_name, attrs in ATTRIBUTE_GROUPS.items():
         group_values = {attr: model_output.get(attr) for attr in attrs if attr in model_output}
         if group_values:
             grouped_results[group_name] = group_values
     return grouped_results
 
 def get_skincare_recommendations(skin_attributes):
-    """Generate specific skincare recommendations based on skin conditions."""
-    recommendations = []
-    
-    if skin_attributes.get('oily_skin') == 1:
-        recommendations.extend([
-            "Use a gentle, oil-free cleanser twice daily",
-            "Apply a non-comedogenic moisturizer",
-            "Consider products with salicylic acid or niacinamide",
-            "Use clay masks weekly to control excess oil"
-        ])
-    
-    if skin_attributes.get('clear_skin') == 0:
-        recommendations.extend([
-            "Establish a consistent cleansing routine",
-            "Use products with soothing ingredients like aloe vera",
-            "Consider adding vitamin C serum for skin clarity"
-        ])
-    
-    if skin_attributes.get('dark_circles') == 1:
-        recommendations.extend([
-            "Apply eye cream with caffeine and vitamin K",
-            "Ensure adequate sleep and hydration",
-            "Consider using a color corrector under eyes"
-        ])
-    
-    return recommendations
+    """Generate specific skincare recommendations based on skin conditions (rules.json)."""
+    return rule_engine.skincare_recommendations(skin_attributes)
 
 def get_grooming_recommendations(attributes):
-    """Generate specific grooming recommendations based on features."""
-    recommendations = []
-    
-    if attributes.get('receeding_hairline') == 1:
-        recommendations.extend([
-            "Use anti-hair loss shampoo with biotin",
-            "Consider minoxidil treatment after consulting a specialist",
-            "Massage scalp regularly to stimulate blood flow"
-        ])
-    
-    if attributes.get('curly_hair') == 1:
-        recommendations.extend([
-            "Use sulfate-free shampoo for curly hair",
-            "Apply leave-in conditioner to maintain moisture",
-            "Style with curl-defining cream for better definition"
-        ])
-    
-    if attributes.get('has_beard') == 1:
-        recommendations.extend([
-            "Apply beard oil daily for softness and shine",
-            "Trim beard regularly to maintain shape",
-            "Use a specialized beard cleanser"
-        ])
-    
-    return recommendations
+    """Generate specific grooming recommendations based on features (rules.json)."""
+    return rule_engine.grooming_recommendations(attributes)
 
 def create_natural_summary(grouped_results, model_output, mapping):
-    """Create a natural, human-like summary with specific recommendations."""
-    parts = []
-    
-    # Facial Analysis
-    facial_features = []
-    if model_output.get('attractive') == 1:
-        facial_features.append("attractive facial features")
-    if model_output.get('sharp_jawline') == 1:
-        facial_features.append("defined jawline")
-    if model_output.get('high_cheekbones') == 1:
-        facial_features.append("high cheekbones")
-    
-    if facial_features:
-        parts.append("Facial Analysis:")
-        parts.append(f"You have {', '.join(facial_features[:-1]) + ' and ' + facial_features[-1] if len(facial_features) > 1 else facial_features[0]}.")
-    
-    # Skin Analysis & Care
-    skin_conditions = []
-    if grouped_results.get('skin_condition'):
-        if model_output.get('clear_skin') == 1:
-            skin_conditions.append("clear complexion")
-        if model_output.get('oily_skin') == 1:
-            skin_conditions.append("oily skin tendencies")
-        if model_output.get('dark_circles') == 1:
-            skin_conditions.append("noticeable dark circles")
-        
-        if skin_conditions:
-            parts.append("\nSkin Analysis:")
-            parts.append(f"Your skin shows {', '.join(skin_conditions)}.")
-            
-            # Add skincare recommendations
-            skincare_tips = get_skincare_recommendations(model_output)
-            if skincare_tips:
-                parts.append("\nSkincare Recommendations:")
-                parts.extend([f"• {tip}" for tip in skincare_tips])
-    
-    # Grooming Analysis & Recommendations
-    grooming_tips = get_grooming_recommendations(model_output)
-    if grooming_tips:
-        parts.append("\nGrooming Recommendations:")
-        parts.extend([f"• {tip}" for tip in grooming_tips])
-    
-    # Additional Tips
-    additional_tips = []
-    if model_output.get('male') == 1:
-        additional_tips.extend([
-            "Use skincare products specifically formulated for men's skin",
-            "Consider a men's facial moisturizer with SPF for daily protection",
-            "Look for products targeting specific male skin concerns"
-        ])
-    
-    if additional_tips:
-        parts.append("\nAdditional Tips:")
-        parts.extend([f"• {tip}" for tip in additional_tips])
-    
-    # Maintenance Advice
-    if model_output.get('well_groomed') == 1:
-        parts.append("\nMaintenance:")
-        parts.append("You're already maintaining good grooming habits. Continue your current routine while incorporating these recommendations for even better results!")
-    else:
-        parts.append("\nGetting Started:")
-        parts.append("Start implementing these recommendations gradually. Begin with the basic skincare routine and add more steps as you become comfortable.")
-    
-    return "\n".join(parts)
-
-def generate_sentences(model_output, mapping):
+    """Create a natural, human-like summary with specific recommendations (rules.json)."""
+    return rule_engine.natural_summary(model_output)
+
+def build_sentence_table(mapping):
+    """Precompute {attr: (sentence for 0, sentence for 1)} from the attribute mapping."""
+    table = {}
+    for attr, texts in mapping.items():
+        if isinstance(texts, dict):
+            table[attr] = (texts.get("0"), texts.get("1"))
+    return table
+
+def to_binary(value):
+    """0/1 for a prediction value: {"predicted": bool}, a bool or a (rounded) number; None otherwise."""
+    if isinstance(value, dict):
+        value = value.get("predicted")
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, (int, float)):
+        return int(round(value))
+    return None
+
+def generate_sentences(model_output, mapping, table=None):
+    if table is None:
+        table = build_sentence_table(mapping)
     sentences = []
     details = {}
     for attr, value in model_output.items():
-        value_str = str(int(round(value)))
-        if attr in mapping and value_str in mapping[attr]:
-            sentence = mapping[attr][value_str]
-        else:
+        entry = table.get(attr)
+        binary = to_binary(value)
+        sentence = entry[binary] if entry is not None and binary in (0, 1) else None
+        if sentence is None:
             sentence = f"For {attr}, value is {value}."
         sentences.append(sentence)
         details[attr] = {"value": value, "sentence": sentence}
     return sentences, details
 
+def interpret(model_output, mapping, table=None):
+    """Summary, sentences and per-attribute details for one prediction."""
+    grouped_results = group_attributes(model_output)
+    sentences, details = generate_sentences(model_output, mapping, table)
+    summary = create_natural_summary(grouped_results, model_output, mapping)
+    return {
+        "summary": summary,
+        "sentences": sentences,
+        "details": details
+    }
+
+# ============================================================
+# BATCH MODE
+# ============================================================
+
+def iter_records(source, offset=0):
+    """
+    Yield (index, name, payload, is_path) for every prediction in a JSON-lines
+    file (one prediction per non-empty line) or a directory of .json files
+    (sorted by name), skipping the first `offset` records.
+    """
+    if os.path.isdir(source):
+        names = sorted(n for n in os.listdir(source) if n.endswith('.json'))
+        for index, name in enumerate(names):
+            if index >= offset:
+                yield index, name, os.path.join(source, name), True
+        return
+    base = os.path.basename(source)
+    index = 0
+    with open(source, 'r', encoding='utf-8') as f:
+        for lineno, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            if index >= offset:
+                yield index, f"{base}:{lineno}", line, False
+            index += 1
+
+def chunked(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+_worker = {}
+
+def _init_worker(mapping_path):
+    # Once per process: parse the mapping and build the sentence table
+    mapping = load_json(mapping_path)
+    _worker['mapping'] = mapping
+    _worker['table'] = build_sentence_table(mapping)
+
+def process_chunk(chunk):
+    """Interpret a chunk of records; returns one NDJSON line per record (errors included)."""
+    mapping, table = _worker['mapping'], _worker['table']
+    lines = []
+    for index, name, payload, is_path in chunk:
+        try:
+            model_output = load_json(payload) if is_path else serialization.loads(payload)
+            record = {"index": index, "source": name, **interpret(model_output, mapping, table)}
+        except Exception as e:
+            record = {"index": index, "source": name, "error": str(e)}
+        lines.append(serialization.dumps_str(record) + "\n")
+    return lines
+
+def resume_offset(out_path, offset=0):
+    """
+    Offset to continue an interrupted batch from: the "index" of the last complete
+    NDJSON line in `out_path` + 1 (a trailing partial line is cut off), or `offset`
+    when nothing has been written yet.
+    """
+    if not os.path.exists(out_path):
+        return offset
+    with open(out_path, 'rb+') as f:
+        data = f.read()
+        end = data.rfind(b"\n") + 1
+        if end != len(data):
+            f.truncate(end)
+    if end == 0:
+        return offset
+    last = data.rfind(b"\n", 0, end - 1) + 1
+    return serialization.loads(data[last:end])["index"] + 1
+
+def run_batch(source, mapping_path, out_path, workers=None, chunk_size=256, offset=0, append=False):
+    """
+    Interpret every prediction in `source`, streaming NDJSON to `out_path` in input order.
+
+    Returns:
+        int: Records written
+    """
+    workers = workers or os.cpu_count() or 1
+    chunks = chunked(iter_records(source, offset), chunk_size)
+    written = 0
+    start = last_report = time.perf_counter()
+    with open(out_path, 'a' if append else 'w', encoding='utf-8') as out:
+        def write(lines):
+            nonlocal written, last_report
+            out.writelines(lines)
+            written += len(lines)
+            now = time.perf_counter()
+            if now - last_report >= 5:
+                last_report = now
+                print(f"Up to record {offset + written} ({written / (now - start):.0f} records/sec)", file=sys.stderr)
+
+        if workers == 1:
+            _init_worker(mapping_path)
+            for chunk in chunks:
+                write(process_chunk(chunk))
+        else:
+            with multiprocessing.Pool(workers, initializer=_init_worker, initargs=(mapping_path,)) as pool:
+                # Bounded window of chunks in flight, written back in submission order
+                pending = collections.deque()
+                for chunk in chunks:
+                    pending.append(pool.apply_async(process_chunk, (chunk,)))
+                    if len(pending) >= workers * 2:
+                        write(pending.popleft().get())
+                while pending:
+                    write(pending.popleft().get())
+
+    elapsed = time.perf_counter() - start
+    rate = written / elapsed if elapsed > 0 else 0.0
+    print(f"✅ {written} records in {elapsed:.1f}s ({rate:.0f} records/sec) written to {out_path}, "
+          f"up to record {offset + written}")
+    return written
+
 def main():
     parser = argparse.ArgumentParser(description="Attribute Interpreter")
-    parser.add_argument('--predictions', required=True, help='Path to predictions JSON file')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--predictions', help='Path to predictions JSON file')
+    source.add_argument('--batch', help='JSON-lines file or directory of prediction JSON files')
     parser.add_argument('--mapping', required=True, help='Path to attribute mapping JSON file')
-    parser.add_argument('--out', required=True, help='Path to output JSON file')
+    parser.add_argument('--out', required=True, help='Path to output JSON file (NDJSON in batch mode)')
+    parser.add_argument('--workers', type=int, help='Batch worker processes (default: CPU count)')
+    parser.add_argument('--chunk-size', type=int, default=256, help='Records per worker task')
+    parser.add_argument('--offset', type=int, default=0, help='Skip the first N records')
+    parser.add_argument('--resume', action='store_true',
+                        help='Continue an interrupted batch: append to --out after the last record it has '
+                             '(--offset only applies when --out is still empty)')
     args = parser.parse_args()
 
+    if args.batch:
+        offset, append = args.offset, False
+        if args.resume:
+            offset, append = resume_offset(args.out, args.offset), True
+            print(f"Resuming at record {offset}")
+        run_batch(args.batch, args.mapping, args.out, args.workers, args.chunk_size, offset, append)
+        return
+
     model_output = load_json(args.predictions)
     mapping = load_json(args.mapping)
-    grouped_results = group_attributes(model_output)
-    sentences, details = generate_sentences(model_output, mapping)
-    summary = create_natural_summary(grouped_results, model_output, mapping)
-    result = {
-        "summary": summary,
-        "sentences": sentences,
-        "details": details
-    }
+    result = interpret(model_output, mapping)
     with open(args.out, 'w', encoding='utf-8') as f:
-        json.dump(result, f, indent=2, ensure_ascii=False)
+        f.write(serialization.dumps_str(result, pretty=True))
     print(f"Output written to {args.out}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
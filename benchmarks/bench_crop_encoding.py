@@ -0,0 +1,104 @@
+"""
+Disk bytes, encode time and response size of a face crop per encoding.
+
+Compares what /predict did before crop_encoding.py (cv2.imwrite of the
+full-resolution crop at default JPEG quality, read back, sent base64 and
+decoded again for the model) with CropEncoder's display formats:
+
+- disk: bytes written to static/user_images (plus the private full-resolution
+  copy, when kept, which only becomes permanent on consent)
+- encode ms: producing every stored encoding of one crop
+- model ms: getting from there to the image inference.preprocess resizes
+  (decode + resize before, resize only now)
+- response: length of the base64 data URL in the /predict response
+
+Usage:
+    python benchmarks/bench_crop_encoding.py [--image face.jpg] [--crop-side 900] [--iterations 50]
+"""
+
+import argparse
+import base64
+import io
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+from PIL import Image
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from crop_encoding import CropEncoder, model_input  # noqa: E402
+
+
+def synthetic_crop(side: int) -> np.ndarray:
+    rng = np.random.default_rng(0)
+    # Low-frequency noise upsampled: compresses like a face crop, not like static
+    small = rng.integers(0, 256, size=(16, 16, 3), dtype=np.uint8)
+    return cv2.resize(small, (side, side), interpolation=cv2.INTER_CUBIC)
+
+
+def timed(fn, iterations: int):
+    result = fn()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return result, (time.perf_counter() - start) / iterations * 1000
+
+
+def data_url_length(data: bytes, mimetype: str) -> int:
+    return len(f"data:{mimetype};base64,") + len(base64.b64encode(data))
+
+
+def legacy(crop: np.ndarray, iterations: int):
+    # cv2.imwrite(path, crop) writes JPEG at its default quality (95)
+    stored, encode_ms = timed(lambda: cv2.imencode(".jpg", crop)[1].tobytes(), iterations)
+
+    def decode_for_model():
+        image = Image.open(io.BytesIO(stored)).convert("RGB")
+        return model_input(cv2.cvtColor(np.asarray(image), cv2.COLOR_RGB2BGR))
+
+    _, model_ms = timed(decode_for_model, iterations)
+    return len(stored), 0, encode_ms, model_ms, data_url_length(stored, "image/jpeg")
+
+
+def encoded(crop: np.ndarray, encoder: CropEncoder, iterations: int):
+    result, encode_ms = timed(lambda: encoder.encode(crop), iterations)
+    # What a registry version with its own transform gets (legacy versions get the JPEG above)
+    _, model_ms = timed(lambda: model_input(crop), iterations)
+    full = len(result.full) if result.full is not None else 0
+    return len(result.display), full, encode_ms, model_ms, data_url_length(result.display, result.mimetype)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Face crop encodings")
+    parser.add_argument("--image", help="Crop to encode (default: synthetic)")
+    parser.add_argument("--crop-side", type=int, default=900, help="Side of the synthetic crop in pixels")
+    parser.add_argument("--quality", type=int, default=80)
+    parser.add_argument("--display-max-side", type=int, default=600)
+    parser.add_argument("--iterations", type=int, default=50)
+    args = parser.parse_args()
+
+    crop = cv2.imread(args.image) if args.image else synthetic_crop(args.crop_side)
+    if crop is None:
+        print(f"❌ Could not read {args.image}")
+        return 1
+
+    cases = {"legacy jpeg": lambda: legacy(crop, args.iterations)}
+    for fmt in ("webp", "jpeg"):
+        for keep_full in (False, True):
+            encoder = CropEncoder(fmt, args.quality, args.display_max_side, keep_full=keep_full)
+            cases[f"{fmt}{' +full' if keep_full else ''}"] = lambda e=encoder: encoded(crop, e, args.iterations)
+
+    height, width = crop.shape[:2]
+    print(f"Crop: {width}x{height}, quality {args.quality}, display max side {args.display_max_side}")
+    print(f"{'encoding':<12} {'disk':>9} {'pending':>9} {'encode ms':>10} {'model ms':>9} {'response':>9}")
+    for name, run in cases.items():
+        disk, pending, encode_ms, model_ms, response = run()
+        print(f"{name:<12} {disk:>9,} {pending:>9,} {encode_ms:>10.2f} {model_ms:>9.2f} {response:>9,}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
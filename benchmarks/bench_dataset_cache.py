@@ -0,0 +1,114 @@
+"""
+Epoch time of the notebook's JPEG FacesDataset against the memory-mapped cache
+from training/dataset_cache.py.
+
+Three loaders are timed over the same rows with the same DataLoader settings:
+    jpeg          FacesDataset + get_transforms(train=True)   (decode every epoch)
+    memmap_pil    MemmapFacesDataset + get_transforms(train=True)
+    memmap_array  MemmapFacesDataset array mode + to_model_input on the device
+
+Without --csv/--data-dir a synthetic set of random JPEGs is generated.
+
+Usage:
+    python benchmarks/bench_dataset_cache.py [--synthetic 2000] [--workers 0] [--epochs 2]
+    python benchmarks/bench_dataset_cache.py --csv attributes.csv --data-dir images --limit 5000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from PIL import Image
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import torch  # noqa: E402
+from torch.utils.data import DataLoader  # noqa: E402
+
+from training.config import ATTRIBUTES, FILENAME_COL  # noqa: E402
+from training.data import FacesDataset, get_transforms, read_csvs  # noqa: E402
+from training.dataset_cache import MemmapFacesDataset, build_cache, to_model_input  # noqa: E402
+
+
+def make_synthetic(directory: Path, count: int, size=(178, 218)) -> pd.DataFrame:
+    """CelebA-sized random JPEGs with random labels."""
+    rng = np.random.default_rng(0)
+    rows = []
+    for i in range(count):
+        name = f"{i:06d}.jpg"
+        pixels = rng.integers(0, 256, size=(size[1], size[0], 3), dtype=np.uint8)
+        Image.fromarray(pixels).save(directory / name, quality=90)
+        rows.append([name] + rng.integers(0, 2, size=len(ATTRIBUTES)).tolist())
+    return pd.DataFrame(rows, columns=[FILENAME_COL] + ATTRIBUTES)
+
+
+def time_epochs(loader, epochs: int, device, array_mode: bool = False) -> float:
+    """Seconds per epoch, consuming every batch on `device`."""
+    times = []
+    for _ in range(epochs):
+        start = time.perf_counter()
+        for imgs, labels in loader:
+            imgs = to_model_input(imgs, device, train=True) if array_mode else imgs.to(device)
+            labels.to(device)
+        if device.type == "cuda":
+            torch.cuda.synchronize()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark JPEG vs memory-mapped dataset epochs")
+    parser.add_argument("--csv", action="append", help="Attribute CSV (repeatable)")
+    parser.add_argument("--data-dir", action="append", help="Image directory (repeatable)")
+    parser.add_argument("--limit", type=int, default=0, help="Only use the first N rows")
+    parser.add_argument("--synthetic", type=int, default=2000, help="Synthetic images when no CSV is given")
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=0)
+    parser.add_argument("--epochs", type=int, default=2)
+    args = parser.parse_args()
+
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        if args.csv:
+            df = read_csvs(args.csv)
+            data_dirs = args.data_dir or []
+        else:
+            (tmp / "images").mkdir()
+            df = make_synthetic(tmp / "images", args.synthetic)
+            data_dirs = [str(tmp / "images")]
+        if args.limit:
+            df = df.iloc[:args.limit]
+
+        print(f"{len(df)} images, batch {args.batch_size}, {args.workers} workers, device {device}\n")
+        start = time.perf_counter()
+        build_cache(df, data_dirs, tmp / "cache", workers=args.workers)
+        build_time = time.perf_counter() - start
+        cache_bytes = os.path.getsize(tmp / "cache" / "images.npy")
+
+        loader_kwargs = dict(batch_size=args.batch_size, shuffle=True, num_workers=args.workers,
+                             pin_memory=device.type == "cuda", persistent_workers=args.workers > 0)
+        datasets = {
+            "jpeg": (FacesDataset(df, data_dirs, ATTRIBUTES, transforms=get_transforms(train=True)), False),
+            "memmap_pil": (MemmapFacesDataset(tmp / "cache", transforms=get_transforms(train=True)), False),
+            "memmap_array": (MemmapFacesDataset(tmp / "cache", random_crop=True), True),
+        }
+
+        print(f"\n{'loader':<14} {'epoch s':>9} {'img/s':>9} {'speedup':>8}")
+        baseline = None
+        for name, (dataset, array_mode) in datasets.items():
+            seconds = time_epochs(DataLoader(dataset, **loader_kwargs), args.epochs, device, array_mode)
+            baseline = baseline or seconds
+            print(f"{name:<14} {seconds:9.2f} {len(dataset) / seconds:9.0f} {baseline / seconds:7.1f}x")
+
+        print(f"\nOne-time cache build: {build_time:.1f}s, {cache_bytes / 1e6:.0f} MB on disk")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+"""
+Compare startup time and memory of the legacy checkpoint loader against the
+memory-mapped loaders in model_weights.py.
+
+Each loader runs in a fresh interpreter so page cache state and allocator
+high-water marks do not leak between measurements. RssAnon is private heap
+memory; RssFile is file-backed and shared between forked workers.
+
+Usage:
+    python benchmarks/bench_model_load.py [--workers 2] [--repeat 3]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+LOADERS = ("torch_load", "torch_mmap", "safetensors")
+
+
+def read_memory():
+    """Returns current RSS breakdown and PSS of this process in MB (Linux only)."""
+    stats = {}
+    with open("/proc/self/status", "r") as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            if key in ("VmRSS", "VmHWM", "RssAnon", "RssFile"):
+                stats[key] = int(value.split()[0]) / 1024
+    try:
+        with open("/proc/self/smaps_rollup", "r") as f:
+            for line in f:
+                if line.startswith("Pss:"):
+                    stats["Pss"] = int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return stats
+
+
+def run_child(loader, workers):
+    import torch
+    import model_weights
+
+    start = time.perf_counter()
+    if loader == "torch_load":
+        state_dict = torch.load(model_weights.MODEL_PATH, map_location="cpu", weights_only=True)
+        model = model_weights.build_model()
+        model.load_state_dict(state_dict)
+        model.eval()
+        del state_dict
+    elif loader == "torch_mmap":
+        model = model_weights.load_model(model_weights.MODEL_PATH)
+    else:
+        model_weights.ensure_safetensors()
+        model = model_weights.load_model(model_weights.SAFETENSORS_PATH)
+    load_ms = (time.perf_counter() - start) * 1000
+    after_load = read_memory()
+
+    dummy = torch.zeros(1, 3, 224, 224)
+    start = time.perf_counter()
+    with torch.inference_mode():
+        model(dummy)
+    first_forward_ms = (time.perf_counter() - start) * 1000
+    after_forward = read_memory()
+
+    # Simulate preload_app: fork workers after loading and sum their PSS
+    worker_pss = 0.0
+    pipes = []
+    for _ in range(workers):
+        r, w = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(r)
+            with torch.inference_mode():
+                model(dummy)
+            os.write(w, json.dumps(read_memory()).encode())
+            os._exit(0)
+        os.close(w)
+        pipes.append((pid, r))
+    for pid, r in pipes:
+        with os.fdopen(r, "rb") as f:
+            worker_pss += json.loads(f.read().decode()).get("Pss", 0.0)
+        os.waitpid(pid, 0)
+
+    print(json.dumps({
+        "loader": loader,
+        "load_ms": load_ms,
+        "first_forward_ms": first_forward_ms,
+        "after_load": after_load,
+        "after_forward": after_forward,
+        "worker_pss_total": worker_pss,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Model loading benchmark")
+    parser.add_argument("--workers", type=int, default=2, help="Forked workers to simulate")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--child", choices=LOADERS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.workers)
+        return
+
+    print(f"{'loader':<12} {'load ms':>9} {'1st fwd ms':>10} {'RSS MB':>8} {'anon MB':>8} {'file MB':>8} {'worker PSS':>11}")
+    for loader in LOADERS:
+        runs = []
+        for _ in range(args.repeat):
+            out = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--child", loader, "--workers", str(args.workers)],
+                capture_output=True, text=True, check=True,
+            )
+            runs.append(json.loads(out.stdout.strip().splitlines()[-1]))
+        best = min(runs, key=lambda r: r["load_ms"])
+        mem = best["after_forward"]
+        print(f"{loader:<12} {best['load_ms']:>9.0f} {best['first_forward_ms']:>10.0f} "
+              f"{mem.get('VmRSS', 0):>8.1f} {mem.get('RssAnon', 0):>8.1f} {mem.get('RssFile', 0):>8.1f} "
+              f"{best['worker_pss_total']:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Allocations and time of the prediction record: nested dicts vs Prediction.
+
+For random sigmoid outputs, both representations go through what /predict
+does with a prediction outside the model itself: building it, the registry's
+metrics walk, the two LLM cache signatures, the local summary and content,
+attribute grouping, the two Gemini prompt JSONs and the JSON for the response
+and the report store.
+
+- retained: memory blocks (allocations still alive) and bytes per prediction
+  while many predictions are held, e.g. queued for a background upgrade
+- peak: traced peak bytes while running the pipeline over the whole batch
+- rate: pipeline runs per second (tracemalloc off)
+
+Usage:
+    python benchmarks/bench_prediction.py [--predictions 5000]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from attribute_interpreter_v2 import group_attributes  # noqa: E402
+from llm_cache import prediction_signature  # noqa: E402
+from prediction import AttributeIndex, Prediction  # noqa: E402
+from rule_engine import RuleEngine, local_content, local_summary  # noqa: E402
+from summarizer import convert_model_output_to_binary  # noqa: E402
+
+ATTRIBUTES_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "attributes.json")
+
+
+def dict_prediction(row, attributes, thresholds):
+    # The per-attribute dict model_loader returns
+    return {attr: {"probability": float(p), "predicted": bool(p >= th)} for attr, p, th in zip(attributes, row, thresholds)}
+
+
+def dict_pipeline(row, attributes, thresholds, engine):
+    prediction = dict_prediction(row, attributes, thresholds)
+    positives = [attr for attr, value in prediction.items() if value["predicted"]]
+    observed = [value["probability"] for value in prediction.values()]
+    signatures = prediction_signature(prediction), prediction_signature(prediction)
+    texts = local_summary(prediction, engine), local_content(prediction, engine)
+    grouped = group_attributes(convert_model_output_to_binary(prediction))
+    prompts = json.dumps(prediction, indent=2), json.dumps(prediction, indent=2)
+    payloads = json.dumps(prediction), json.dumps(prediction)
+    return prediction, positives, observed, signatures, texts, grouped, prompts, payloads
+
+
+def prediction_pipeline(row, index, thresholds, engine):
+    prediction = Prediction.from_probabilities(row, index, thresholds)
+    positives = prediction.predicted_names()
+    observed = prediction.probabilities.tolist()
+    signatures = prediction_signature(prediction), prediction_signature(prediction)
+    texts = local_summary(prediction, engine), local_content(prediction, engine)
+    grouped = group_attributes(prediction)
+    prompts = prediction.to_json(pretty=True), prediction.to_json(pretty=True)
+    payloads = json.dumps(prediction.as_dict()), json.dumps(prediction.as_dict())
+    return prediction, positives, observed, signatures, texts, grouped, prompts, payloads
+
+
+def retained(build, rows):
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    held = [build(row) for row in rows]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    stats = after.compare_to(before, "filename")
+    blocks = sum(s.count_diff for s in stats)
+    size = sum(s.size_diff for s in stats)
+    del held
+    return blocks / len(rows), size / len(rows)
+
+
+def peak(run, rows):
+    tracemalloc.start()
+    for row in rows:
+        run(row)
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak_bytes
+
+
+def rate(run, rows):
+    start = time.perf_counter()
+    for row in rows:
+        run(row)
+    return len(rows) / (time.perf_counter() - start)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Prediction record allocations")
+    parser.add_argument("--predictions", type=int, default=5000)
+    args = parser.parse_args()
+
+    with open(ATTRIBUTES_PATH, "r", encoding="utf-8") as f:
+        attributes = list(json.load(f))
+    index = AttributeIndex.of(attributes)
+    rng = np.random.default_rng(0)
+    rows = rng.random((args.predictions, len(attributes))).astype(np.float32)
+    thresholds = [0.5] * len(attributes)
+    engine = RuleEngine.from_file()
+
+    cases = {
+        "dict": (lambda row: dict_prediction(row, attributes, thresholds),
+                 lambda row: dict_pipeline(row, attributes, thresholds, engine)),
+        "Prediction": (lambda row: Prediction.from_probabilities(row, index, thresholds),
+                       lambda row: prediction_pipeline(row, index, thresholds, engine)),
+    }
+    for _, run in cases.values():
+        run(rows[0])  # warm the memo and the shared index
+
+    print(f"{len(rows)} predictions of {len(attributes)} attributes")
+    print(f"{'record':<12} {'blocks/pred':>12} {'bytes/pred':>11} {'peak KiB':>9} {'pipeline/s':>11}")
+    for name, (build, run) in cases.items():
+        blocks, size = retained(build, rows)
+        print(f"{name:<12} {blocks:>12.1f} {size:>11,.0f} {peak(run, rows) / 1024:>9,.0f} {rate(run, rows):>11,.0f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,90 @@
+"""
+Generations/sec of the rules.json-driven local text generators.
+
+Runs every local generator (Gemini's summary and content fallbacks, and
+attribute_interpreter_v2's recommendations and summary) over random
+predictions in the model_loader format:
+
+- cold: memo cleared before every generation (bitmask build + rule scan)
+- warm: memoized texts, with predictions drawn from a limited pool of
+  attribute combinations, as in production traffic
+
+Usage:
+    python benchmarks/bench_rule_engine.py [--predictions 20000] [--combinations 200]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rule_engine import (  # noqa: E402
+    RuleEngine, grooming_recommendations, local_content, local_summary, natural_summary, skincare_recommendations,
+)
+
+ATTRIBUTES_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "attributes.json")
+
+
+def random_predictions(count: int, combinations: int, seed: int = 0):
+    rng = random.Random(seed)
+    with open(ATTRIBUTES_PATH, "r", encoding="utf-8") as f:
+        attributes = list(json.load(f))
+    pool = [{attr: rng.random() < 0.3 for attr in attributes} for _ in range(combinations)]
+    return [
+        {attr: {"probability": rng.random(), "predicted": flag} for attr, flag in rng.choice(pool).items()}
+        for _ in range(count)
+    ]
+
+
+def generate_all(prediction, engine):
+    local_summary(prediction, engine)
+    local_content(prediction, engine)
+    skincare_recommendations(prediction, engine)
+    grooming_recommendations(prediction, engine)
+    natural_summary(prediction, engine)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Rule engine throughput")
+    parser.add_argument("--predictions", type=int, default=20000)
+    parser.add_argument("--combinations", type=int, default=200, help="Distinct predicted-attribute sets")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    engine = RuleEngine.from_file()
+    compile_ms = (time.perf_counter() - start) * 1000
+    predictions = random_predictions(args.predictions, args.combinations)
+    print(f"Compiled {sum(len(s[0]) for s in engine.sections.values())} rules over {len(engine.bits)} attributes "
+          f"in {compile_ms:.2f} ms")
+
+    start = time.perf_counter()
+    for prediction in predictions:
+        engine.masks(prediction)
+    masks_rate = len(predictions) / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for prediction in predictions:
+        engine.clear_cache()
+        generate_all(prediction, engine)
+    cold_rate = len(predictions) / (time.perf_counter() - start)
+
+    generate_all(predictions[0], engine)
+    start = time.perf_counter()
+    for prediction in predictions:
+        generate_all(prediction, engine)
+    warm_rate = len(predictions) / (time.perf_counter() - start)
+
+    print(f"{'mode':<10} {'generations/s':>14}")
+    print(f"{'masks':<10} {masks_rate:>14,.0f}   (bitmask build only)")
+    print(f"{'cold':<10} {cold_rate:>14,.0f}   (all 5 generators, memo cleared)")
+    print(f"{'warm':<10} {warm_rate:>14,.0f}   (all 5 generators, memoized)")
+    print(f"Memo: {engine._render.cache_info()}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,114 @@
+"""
+Size and encoding time of the /predict response.
+
+Builds a realistic response (prediction, local summary and content, URLs) and
+encodes it with:
+
+- flask: Flask's default provider (stdlib json, sorted keys, compact)
+- json: serialization's stdlib fallback
+- orjson: serialization with orjson (skipped when not installed)
+
+each with the crop inline as a base64 data URL and by URL only
+(RESPONSE_INLINE_CROP=0 / inline_crop=0).
+
+Usage:
+    python benchmarks/bench_serialization.py [--crop-side 400] [--iterations 2000]
+"""
+
+import argparse
+import base64
+import io
+import json
+import os
+import sys
+import time
+
+import numpy as np
+from PIL import Image
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import serialization  # noqa: E402
+from prediction import AttributeIndex, Prediction  # noqa: E402
+from rule_engine import local_content, local_summary  # noqa: E402
+
+ATTRIBUTES_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "attributes.json")
+
+
+def crop_jpeg(side: int) -> bytes:
+    rng = np.random.default_rng(0)
+    # Low-frequency noise upsampled: compresses like a face crop, not like static
+    small = rng.integers(0, 256, size=(16, 16, 3), dtype=np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(small).resize((side, side), Image.BICUBIC).save(buffer, format="JPEG", quality=95)
+    return buffer.getvalue()
+
+
+def response(prediction: Prediction, crop: bytes, inline: bool):
+    content = local_content(prediction)
+    return {
+        "success": True,
+        "prediction": prediction.as_dict(),
+        "model_version": "default",
+        "summary": local_summary(prediction),
+        "skincare_recommendations": content.get("skincare_list", []),
+        "grooming_recommendations": content.get("grooming_list", []),
+        "grouped_attributes": None,
+        "report_id": "0" * 32,
+        "report_url": "https://api.example.com/static/report_viewer.html?id=" + "0" * 32,
+        "text_source": "local",
+        "upgrading": False,
+        "cropped_image": "data:image/jpeg;base64," + base64.b64encode(crop).decode("utf-8") if inline else None,
+        "cropped_image_url": "https://api.example.com/media/user_images/3f/upload_20250101_000000_000000_656507f545e1017e.jpg",
+        "cropped_image_filename": "upload_20250101_000000_000000_656507f545e1017e.jpg",
+        "faces": None,
+    }
+
+
+def flask_default(obj) -> bytes:
+    # flask.json.provider.DefaultJSONProvider outside debug mode
+    return (json.dumps(obj, sort_keys=True, ensure_ascii=True, separators=(",", ":")) + "\n").encode("utf-8")
+
+
+def serialization_dumps(obj) -> bytes:
+    # app.ServiceJSONProvider.response()
+    return serialization.dumps(obj) + b"\n"
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="/predict response encoding")
+    parser.add_argument("--crop-side", type=int, default=400, help="Side of the cropped JPEG in pixels")
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    with open(ATTRIBUTES_PATH, "r", encoding="utf-8") as f:
+        attributes = list(json.load(f))
+    rng = np.random.default_rng(1)
+    prediction = Prediction.from_probabilities(rng.random(len(attributes)), AttributeIndex.of(attributes))
+    crop = crop_jpeg(args.crop_side)
+
+    encoders = {"flask": flask_default, "json": serialization_dumps}
+    if serialization.orjson is not None:
+        encoders["orjson"] = serialization_dumps
+    else:
+        print("orjson is not installed; skipping it")
+
+    print(f"Crop: {args.crop_side}x{args.crop_side} JPEG, {len(crop):,} bytes")
+    print(f"{'encoder':<8} {'crop':<7} {'bytes':>9} {'us/response':>12}")
+    for inline in (True, False):
+        obj = response(prediction, crop, inline)
+        for name, encode in encoders.items():
+            if name != "flask":
+                serialization.configure(name)
+            size = len(encode(obj))
+            start = time.perf_counter()
+            for _ in range(args.iterations):
+                encode(obj)
+            micros = (time.perf_counter() - start) / args.iterations * 1e6
+            print(f"{name:<8} {'inline' if inline else 'url':<7} {size:>9,} {micros:>12.1f}")
+    serialization.configure("auto")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
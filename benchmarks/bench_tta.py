@@ -0,0 +1,144 @@
+"""
+Latency cost and prediction stability of flip test-time augmentation.
+
+Latency: one image per request, comparing a plain forward pass, TTA as one
+batch of 2 (inference.predict_probabilities(tta=True)) and the naive
+alternative of two sequential passes.
+
+Stability: every image is "re-uploaded" several times with the small changes a
+real re-upload brings (JPEG re-encoding at another quality, a few pixels of
+crop shift, slight exposure change). For each (image, attribute) pair we check
+whether the `predicted` flag of the example_predictions.json-style output stays
+the same across all variants, with and without TTA.
+
+Usage:
+    python benchmarks/bench_tta.py --images static/accepted --limit 50 [--checkpoint model/....pth]
+    (without --images, smooth synthetic images are used: latency is meaningful,
+     stability numbers are not)
+"""
+
+import argparse
+import io
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+from PIL import Image, ImageEnhance
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import torch  # noqa: E402
+
+from inference import predict_probabilities, to_batch  # noqa: E402
+from model_weights import load_model  # noqa: E402
+from prediction import AttributeIndex, Prediction  # noqa: E402
+
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".webp"}
+
+
+def load_images(directory, limit):
+    if directory is None:
+        rng = np.random.default_rng(0)
+        images = []
+        for _ in range(limit):
+            # Low-frequency noise upsampled: face-crop sized, not pure static
+            small = rng.integers(0, 256, size=(8, 8, 3), dtype=np.uint8)
+            images.append(Image.fromarray(small).resize((320, 320), Image.BICUBIC))
+        return images
+    paths = sorted(p for p in Path(directory).rglob("*") if p.suffix.lower() in IMAGE_SUFFIXES)[:limit]
+    return [Image.open(p).convert("RGB") for p in paths]
+
+
+def reupload_variants(image: Image.Image, count: int, rng: np.random.Generator):
+    """Encoded bytes of `count` slightly different copies of `image`."""
+    variants = []
+    width, height = image.size
+    for _ in range(count):
+        dx, dy = (rng.integers(-3, 4, size=2) * max(1, min(width, height) // 100))
+        box = (max(0, dx), max(0, dy), min(width, width + dx), min(height, height + dy))
+        variant = ImageEnhance.Brightness(image.crop(box)).enhance(float(rng.uniform(0.97, 1.03)))
+        buf = io.BytesIO()
+        variant.save(buf, format="JPEG", quality=int(rng.integers(75, 96)))
+        variants.append(buf.getvalue())
+    return variants
+
+
+def latency_ms(fn, runs: int, warmup: int = 5):
+    for _ in range(warmup):
+        fn()
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return np.percentile(timings, 50), np.percentile(timings, 95)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Flip TTA latency and stability benchmark")
+    parser.add_argument("--images", help="Directory of face crops")
+    parser.add_argument("--limit", type=int, default=30, help="Images to use")
+    parser.add_argument("--variants", type=int, default=6, help="Re-uploads simulated per image")
+    parser.add_argument("--checkpoint", help="Weights file (defaults to the bundled model)")
+    parser.add_argument("--threads", type=int, default=1, help="torch CPU threads")
+    parser.add_argument("--runs", type=int, default=30, help="Timed runs per latency mode")
+    args = parser.parse_args()
+
+    torch.set_num_threads(args.threads)
+    model = load_model(args.checkpoint)
+    info = model.checkpoint_info
+    attributes, thresholds, img_size = info["attributes"], info["thresholds"], info["img_size"]
+    images = load_images(args.images, args.limit)
+    if not images:
+        print("❌ No images found")
+        return 1
+
+    batch = to_batch([images[0]], img_size)
+
+    def sequential():
+        a = predict_probabilities(model, batch)
+        b = predict_probabilities(model, batch.flip(-1))
+        return (a + b) / 2
+
+    print(f"Latency, 1 image, {args.threads} thread(s):")
+    print(f"{'mode':<22} {'p50 ms':>8} {'p95 ms':>8}")
+    base_p50 = None
+    for name, fn in (("plain", lambda: predict_probabilities(model, batch)),
+                     ("tta batch of 2", lambda: predict_probabilities(model, batch, tta=True)),
+                     ("tta 2 sequential", sequential)):
+        p50, p95 = latency_ms(fn, args.runs)
+        base_p50 = base_p50 or p50
+        print(f"{name:<22} {p50:8.1f} {p95:8.1f}   (+{(p50 / base_p50 - 1) * 100:.0f}%)")
+
+    rng = np.random.default_rng(0)
+    index = AttributeIndex.of(attributes)
+    th = np.full(len(attributes), 0.5) if thresholds is None else np.asarray(thresholds)
+    results = {}
+    for tta in (False, True):
+        unstable = borderline = total = 0
+        spread = []
+        for image in images:
+            variants = reupload_variants(image, args.variants, np.random.default_rng(rng.integers(1 << 32)))
+            probs = predict_probabilities(model, to_batch(variants, img_size), tta=tta)
+            outputs = [p.as_dict() for p in Prediction.from_batch(probs, index, thresholds)]
+            flags = np.array([[out[a]["predicted"] for a in attributes] for out in outputs])
+            unstable += int((flags.any(axis=0) & ~flags.all(axis=0)).sum())
+            borderline += int((np.abs(probs.mean(axis=0) - th) < 0.05).sum())
+            spread.append(probs.std(axis=0).mean())
+            total += len(attributes)
+        results[tta] = (unstable / total, borderline / total, float(np.mean(spread)))
+
+    print(f"\nStability over {len(images)} images x {args.variants} re-uploads:")
+    print(f"{'mode':<8} {'flipping attrs':>15} {'borderline':>11} {'prob std':>9}")
+    for tta, (flip_rate, border_rate, std) in results.items():
+        print(f"{'tta' if tta else 'plain':<8} {flip_rate:>14.2%} {border_rate:>10.2%} {std:>9.4f}")
+    plain, tta = results[False][0], results[True][0]
+    if plain:
+        print(f"\nTTA removes {(1 - tta / plain) * 100:.0f}% of label flips between re-uploads")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
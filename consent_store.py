@@ -0,0 +1,222 @@
+"""
+Consent recording without full file copies.
+
+/consent used to duplicate the crop from user_images into accepted. Both
+directories live on the same filesystem, so the accepted entry is now a hard
+link (or a reflink where hard links are not possible), with a plain copy as
+the last resort. Every consent is also recorded in an index with its content
+hash, so accepted images can be enumerated and exported without walking the
+directory tree.
+
+Usage:
+    python consent_store.py list
+    python consent_store.py export --format csv --out consents.csv
+    python consent_store.py backfill      # index files accepted before the index existed
+"""
+
+import argparse
+import csv
+import errno
+import hashlib
+import os
+import shutil
+import sqlite3
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+
+import serialization
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS consents (
+    filename TEXT PRIMARY KEY,
+    accepted_at REAL NOT NULL,
+    sha256 TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    path TEXT NOT NULL,
+    method TEXT NOT NULL,
+    prediction TEXT
+);
+"""
+
+FICLONE = 0x40049409  # linux/fs.h: _IOW(0x94, 9, int)
+
+
+def _reflink(src: Path, dst: Path) -> bool:
+    """Copy-on-write clone (btrfs, XFS, ...). Returns False where unsupported."""
+    try:
+        import fcntl
+    except ImportError:
+        return False
+    with open(src, "rb") as fsrc:
+        fd = os.open(dst, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+        try:
+            fcntl.ioctl(fd, FICLONE, fsrc.fileno())
+        except OSError:
+            os.close(fd)
+            os.unlink(dst)
+            return False
+        os.close(fd)
+    shutil.copystat(src, dst)
+    return True
+
+
+def link_or_copy(src: Path, dst: Path) -> str:
+    """
+    Make `dst` share `src`'s data if the filesystem allows it.
+
+    Returns:
+        str: "hardlink", "reflink" or "copy"
+    """
+    try:
+        os.link(src, dst)
+        return "hardlink"
+    except OSError as e:
+        if e.errno == errno.EEXIST:
+            raise
+    if _reflink(src, dst):
+        return "reflink"
+    shutil.copy2(src, dst)
+    return "copy"
+
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ConsentIndex:
+    def __init__(self, db_path: str, accepted_dir: Path):
+        self.db_path = str(db_path)
+        self.accepted_dir = Path(accepted_dir)
+        self._local = threading.local()
+        conn = self._connect()
+        conn.executescript(_SCHEMA)
+        columns = {row["name"] for row in conn.execute("PRAGMA table_info(consents)")}
+        if "prediction" not in columns:  # index created before predictions were recorded
+            conn.execute("ALTER TABLE consents ADD COLUMN prediction TEXT")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def record(self, src_path: Path, dst_path: Path, prediction: Optional[Dict] = None) -> Dict:
+        """
+        Accept `src_path` into `dst_path` and index it. Idempotent per filename.
+
+        Args:
+            src_path (Path): The crop in user_images
+            dst_path (Path): Where the accepted entry goes
+            prediction (dict, optional): Model output for the crop, kept as pseudo-labels
+                for retraining since stored reports expire
+
+        Returns:
+            dict: The index entry
+        """
+        existing = self.get(dst_path.name)
+        if existing is not None and (self.accepted_dir / existing["path"]).exists():
+            return existing
+
+        try:
+            method = "existing" if dst_path.exists() else link_or_copy(src_path, dst_path)
+        except FileExistsError:  # accepted concurrently
+            method = "existing"
+        entry = {
+            "filename": dst_path.name,
+            "accepted_at": time.time(),
+            "sha256": file_sha256(dst_path),
+            "size": dst_path.stat().st_size,
+            "path": dst_path.relative_to(self.accepted_dir).as_posix(),
+            "method": method,
+            "prediction": serialization.dumps_str(prediction) if prediction is not None else None,
+        }
+        self._connect().execute(
+            "INSERT OR REPLACE INTO consents (filename, accepted_at, sha256, size, path, method, prediction) "
+            "VALUES (:filename, :accepted_at, :sha256, :size, :path, :method, :prediction)",
+            entry,
+        )
+        return entry
+
+    def get(self, filename: str) -> Optional[Dict]:
+        row = self._connect().execute("SELECT * FROM consents WHERE filename = ?", (filename,)).fetchone()
+        return dict(row) if row is not None else None
+
+    def is_consented(self, filename: str) -> bool:
+        return self._connect().execute(
+            "SELECT 1 FROM consents WHERE filename = ?", (filename,)
+        ).fetchone() is not None
+
+    def iter_entries(self, since: float = 0.0) -> Iterator[Dict]:
+        """All consents accepted at or after `since`, oldest first."""
+        for row in self._connect().execute(
+            "SELECT * FROM consents WHERE accepted_at >= ? ORDER BY accepted_at", (since,)
+        ):
+            yield dict(row)
+
+    def backfill(self) -> int:
+        """Index files already in the accepted directory. Returns the number added."""
+        added = 0
+        for path in sorted(self.accepted_dir.rglob("*")):
+            if path.is_file() and not self.is_consented(path.name):
+                self.record(path, path)
+                added += 1
+        return added
+
+
+def default_index() -> ConsentIndex:
+    from production import ACCEPTED_DIR, CONSENT_DB_PATH
+    return ConsentIndex(CONSENT_DB_PATH, ACCEPTED_DIR)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Consent index utilities")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("list", help="Print accepted images")
+    export = sub.add_parser("export", help="Export the index")
+    export.add_argument("--format", choices=("csv", "jsonl"), default="jsonl")
+    export.add_argument("--out", required=True)
+    export.add_argument("--since", type=float, default=0.0, help="Only consents after this epoch time")
+    sub.add_parser("backfill", help="Index files accepted before the index existed")
+    args = parser.parse_args()
+
+    index = default_index()
+
+    if args.command == "backfill":
+        print(f"✅ Indexed {index.backfill()} existing files")
+        return 0
+
+    if args.command == "list":
+        for entry in index.iter_entries():
+            print(f"{entry['accepted_at']:.0f}  {entry['sha256'][:12]}  {entry['size']:>9,} B  {entry['path']}")
+        return 0
+
+    count = 0
+    with open(args.out, "w", encoding="utf-8", newline="") as f:
+        if args.format == "csv":
+            writer = csv.DictWriter(f, fieldnames=["filename", "accepted_at", "sha256", "size", "path", "method"],
+                                    extrasaction="ignore")
+            writer.writeheader()
+            for entry in index.iter_entries(args.since):
+                writer.writerow(entry)
+                count += 1
+        else:
+            for entry in index.iter_entries(args.since):
+                f.write(serialization.dumps_str(entry) + "\n")
+                count += 1
+    print(f"✅ Exported {count} consents to {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
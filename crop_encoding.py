@@ -0,0 +1,170 @@
+"""
+Encoding stage for face crops.
+
+A crop used to be written with cv2.imwrite at full resolution and default
+JPEG quality, read back, sent base64 in the response and decoded again by the
+model. The model only looks at img_size (224) pixels and the UI shows the crop
+at most 300px wide, so each consumer now gets its own encoding of the crop:
+
+- model: the crop itself, handed to the registry in memory (ModelInput).
+  Versions that own their transform get an RGB image already resized to its
+  working size (short side int(img_size * 1.14)), with no JPEG round trip;
+  legacy model_loader versions get the JPEG bytes cv2.imwrite used to write
+- display: WebP or JPEG at CROP_QUALITY, at most DISPLAY_MAX_SIDE pixels per
+  side; stored in static/user_images and used for the response
+- full (KEEP_FULL_RESOLUTION=1 only): the full-resolution crop (JPEG quality
+  95, what cv2.imwrite wrote), kept in a private pending directory and moved
+  into accepted when the user gives consent; retention removes the rest.
+  Off by default, so nothing beyond the display crop is kept without consent
+"""
+
+import os
+import time
+from typing import Dict, NamedTuple, Optional, Tuple
+
+import cv2
+import numpy as np
+from PIL import Image
+
+import metrics
+
+FORMATS = {
+    "webp": (".webp", "image/webp", cv2.IMWRITE_WEBP_QUALITY),
+    "jpeg": (".jpg", "image/jpeg", cv2.IMWRITE_JPEG_QUALITY),
+}
+FULL_SUFFIX = ".jpg"
+FULL_QUALITY = 95  # cv2.imwrite's default
+BYTE_BUCKETS = (4096, 8192, 16384, 32768, 65536, 131072, 262144, 524288, 1048576, 4194304)
+
+_encode_seconds = metrics.histogram("crop_encode_seconds", "Time to encode one face crop per output", ["output"],
+                                    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5))
+_encoded_bytes = metrics.histogram("crop_encoded_bytes", "Encoded size of one face crop per output", ["output"],
+                                   buckets=BYTE_BUCKETS)
+
+
+def fit(width: int, height: int, max_side: int) -> Tuple[int, int]:
+    """(width, height) scaled down so neither side exceeds max_side; never scaled up."""
+    scale = min(1.0, max_side / max(width, height))
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def full_resolution_name(display_name: str) -> str:
+    """Name of the full-resolution copy kept for a display crop (same stem, JPEG)."""
+    return os.path.splitext(os.path.basename(display_name))[0] + FULL_SUFFIX
+
+
+def model_input(crop: np.ndarray, img_size: int = 224) -> Image.Image:
+    """
+    RGB image for inference.preprocess, resized the way its eval transform would.
+
+    Args:
+        crop (numpy.ndarray): BGR crop
+        img_size (int): Model input side
+
+    Returns:
+        PIL.Image.Image: Short side int(img_size * 1.14) (smaller crops are left for preprocess to upscale)
+    """
+    image = Image.fromarray(cv2.cvtColor(crop, cv2.COLOR_BGR2RGB))
+    resize_to = int(img_size * 1.14)
+    width, height = image.size
+    scale = resize_to / min(width, height)
+    if scale < 1:
+        # Same size and filter as inference.preprocess, so its own resize is a no-op
+        size = max(resize_to, round(width * scale)), max(resize_to, round(height * scale))
+        image = image.resize(size, Image.BILINEAR)
+    return image
+
+
+def encode_image(image: np.ndarray, suffix: str, flag: int, quality: int) -> bytes:
+    ok, buffer = cv2.imencode(suffix, image, [flag, int(quality)])
+    if not ok:
+        raise ValueError(f"Could not encode crop as {suffix}")
+    return buffer.tobytes()
+
+
+class ModelInput:
+    """A crop on its way to the model; each representation is produced on first use."""
+
+    __slots__ = ("crop", "_prepared", "_encoded")
+
+    def __init__(self, crop: np.ndarray):
+        self.crop = crop
+        self._prepared: Dict[int, Image.Image] = {}
+        self._encoded: Optional[bytes] = None
+
+    def prepared(self, img_size: int) -> Image.Image:
+        """model_input() for a version's input side (registry versions that own their transform)."""
+        image = self._prepared.get(img_size)
+        if image is None:
+            start = time.perf_counter()
+            image = self._prepared[img_size] = model_input(self.crop, img_size)
+            _encode_seconds.observe(time.perf_counter() - start, output="model")
+        return image
+
+    def encoded(self) -> bytes:
+        """JPEG of the crop at cv2.imwrite's default quality (what legacy model_loader versions were given)."""
+        if self._encoded is None:
+            start = time.perf_counter()
+            self._encoded = encode_image(self.crop, FULL_SUFFIX, cv2.IMWRITE_JPEG_QUALITY, FULL_QUALITY)
+            _encode_seconds.observe(time.perf_counter() - start, output="model")
+        return self._encoded
+
+
+class EncodedCrop(NamedTuple):
+    display: bytes
+    suffix: str
+    mimetype: str
+    model_input: ModelInput
+    full: Optional[bytes]  # None unless full-resolution copies are kept
+
+
+class CropEncoder:
+    def __init__(self, fmt: str = "webp", quality: int = 80, display_max_side: int = 600,
+                 keep_full: bool = False):
+        """
+        Args:
+            fmt (str): Display format, "webp" or "jpeg"
+            quality (int): Display quality (1-100)
+            display_max_side (int): Longest side of the display image in pixels
+            keep_full (bool): Also encode the full-resolution crop (kept for consent)
+
+        Raises:
+            ValueError: If the format is unknown
+        """
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown crop format '{fmt}' (expected one of {', '.join(FORMATS)})")
+        self.suffix, self.mimetype, self._flag = FORMATS[fmt]
+        self.quality = quality
+        self.display_max_side = display_max_side
+        self.keep_full = keep_full
+
+    def encode(self, crop: np.ndarray, full_crop: Optional[np.ndarray] = None) -> EncodedCrop:
+        """
+        Encodes one BGR crop for display and (optionally) at full resolution; the model input is prepared lazily.
+
+        Args:
+            crop (numpy.ndarray): BGR crop from the (possibly reduced) detection decode
+            full_crop (numpy.ndarray, optional): The same region from a full-resolution decode;
+                the full copy is encoded from it when given, from `crop` otherwise
+
+        Returns:
+            EncodedCrop: The encodings
+        """
+        start = time.perf_counter()
+        height, width = crop.shape[:2]
+        size = fit(width, height, self.display_max_side)
+        display_image = crop if size == (width, height) else cv2.resize(crop, size, interpolation=cv2.INTER_AREA)
+        display = encode_image(display_image, self.suffix, self._flag, self.quality)
+        now = time.perf_counter()
+        _encode_seconds.observe(now - start, output="display")
+        _encoded_bytes.observe(len(display), output="display")
+
+        full = None
+        if self.keep_full:
+            start = now
+            source = full_crop if full_crop is not None else crop
+            full = encode_image(source, FULL_SUFFIX, cv2.IMWRITE_JPEG_QUALITY, FULL_QUALITY)
+            _encode_seconds.observe(time.perf_counter() - start, output="full")
+            _encoded_bytes.observe(len(full), output="full")
+
+        return EncodedCrop(display, self.suffix, self.mimetype, ModelInput(crop), full)
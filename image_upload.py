@@ -0,0 +1,219 @@
+"""
+Upload validation from image headers.
+
+The client-supplied mimetype says nothing about the payload, so uploads are
+identified by their magic bytes and the pixel dimensions are read straight
+from the container header. Non-images and images with absurd dimensions are
+rejected before the body is read in full or handed to OpenCV, and large JPEGs
+are decoded at a reduced scale (DCT scaling) when face detection does not need
+the full resolution.
+"""
+
+import struct
+from typing import BinaryIO, NamedTuple, Optional
+
+import cv2
+import numpy as np
+
+HEADER_CHUNK = 64 * 1024
+# JPEG SOF markers can sit behind large EXIF/ICC segments
+MAX_HEADER_BYTES = 1024 * 1024
+
+_REDUCED_FLAGS = (
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2),
+)
+
+
+class InvalidImage(ValueError):
+    """The upload is not a supported image."""
+
+
+class ImageTooLarge(ValueError):
+    """The image dimensions exceed the configured limits."""
+
+
+class ImageInfo(NamedTuple):
+    format: str
+    width: int  # as decoded: JPEG dimensions are swapped for EXIF orientations 5-8
+    height: int
+
+
+def _exif_orientation(segment: bytes) -> int:
+    """Orientation tag (1-8) from an APP1 segment body; 1 when absent or unreadable."""
+    if segment[:6] != b"Exif\x00\x00" or len(segment) < 14:
+        return 1
+    tiff = segment[6:]
+    order = {b"II": "<", b"MM": ">"}.get(tiff[:2])
+    if order is None:
+        return 1
+    (ifd,) = struct.unpack(order + "I", tiff[4:8])
+    if ifd + 2 > len(tiff):
+        return 1
+    (count,) = struct.unpack(order + "H", tiff[ifd:ifd + 2])
+    for entry in range(ifd + 2, min(ifd + 2 + 12 * count, len(tiff) - 11), 12):
+        tag, _, _, value = struct.unpack(order + "HHIH", tiff[entry:entry + 10])
+        if tag == 0x0112:
+            return value if 1 <= value <= 8 else 1
+    return 1
+
+
+def _jpeg_size(data: bytes) -> Optional[tuple]:
+    i = 2
+    n = len(data)
+    orientation = 1
+    while i + 4 <= n:
+        if data[i] != 0xFF:
+            raise InvalidImage("Corrupt JPEG header.")
+        marker = data[i + 1]
+        if marker == 0xFF:  # fill byte
+            i += 1
+            continue
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:  # standalone markers
+            i += 2
+            continue
+        (length,) = struct.unpack(">H", data[i + 2:i + 4])
+        if marker == 0xE1 and orientation == 1:
+            if i + 2 + length > n:
+                return None  # read the whole EXIF segment first
+            orientation = _exif_orientation(data[i + 4:i + 2 + length])
+        # SOF0..SOF15, excluding DHT (C4), JPG (C8) and DAC (CC)
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            if i + 9 > n:
+                return None
+            height, width = struct.unpack(">HH", data[i + 5:i + 9])
+            # OpenCV applies the EXIF orientation when decoding; 5-8 turn the image by 90 degrees
+            return (height, width) if orientation >= 5 else (width, height)
+        if marker == 0xDA:  # start of scan before any frame header
+            raise InvalidImage("Corrupt JPEG header.")
+        i += 2 + length
+    return None
+
+
+def _webp_size(data: bytes) -> Optional[tuple]:
+    if len(data) < 30:
+        return None
+    chunk = data[12:16]
+    if chunk == b"VP8 ":
+        if data[23:26] != b"\x9d\x01\x2a":
+            raise InvalidImage("Corrupt WebP header.")
+        width, height = struct.unpack("<HH", data[26:30])
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk == b"VP8L":
+        if data[20] != 0x2F:
+            raise InvalidImage("Corrupt WebP header.")
+        bits = int.from_bytes(data[21:25], "little")
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b"VP8X":
+        width = int.from_bytes(data[24:27], "little") + 1
+        height = int.from_bytes(data[27:30], "little") + 1
+        return width, height
+    raise InvalidImage("Unsupported WebP variant.")
+
+
+def sniff_image(header: bytes) -> Optional[ImageInfo]:
+    """
+    Identify an image from its leading bytes.
+
+    Args:
+        header (bytes): The first bytes of the file
+
+    Returns:
+        ImageInfo or None: None if more bytes are needed to find the dimensions
+
+    Raises:
+        InvalidImage: If the bytes do not start a supported image format
+    """
+    if header[:3] == b"\xff\xd8\xff":
+        size = _jpeg_size(header)
+        fmt = "jpeg"
+    elif header[:8] == b"\x89PNG\r\n\x1a\n":
+        if len(header) < 24:
+            return None
+        if header[12:16] != b"IHDR":
+            raise InvalidImage("Corrupt PNG header.")
+        size = struct.unpack(">II", header[16:24])
+        fmt = "png"
+    elif header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        size = _webp_size(header)
+        fmt = "webp"
+    elif header[:2] == b"BM":
+        if len(header) < 26:
+            return None
+        width, height = struct.unpack("<ii", header[18:26])
+        size = (abs(width), abs(height))
+        fmt = "bmp"
+    else:
+        raise InvalidImage("Invalid file type. Please upload an image.")
+
+    if size is None:
+        return None
+    width, height = size
+    if width <= 0 or height <= 0:
+        raise InvalidImage("Image has invalid dimensions.")
+    return ImageInfo(fmt, int(width), int(height))
+
+
+def read_image_upload(stream: BinaryIO, max_side: int, max_pixels: int):
+    """
+    Validate an upload from its header, then read the rest of it.
+
+    Args:
+        stream: File-like object positioned at the start of the upload
+        max_side (int): Largest allowed width or height
+        max_pixels (int): Largest allowed width * height
+
+    Returns:
+        tuple: (ImageInfo, bytes)
+
+    Raises:
+        InvalidImage: If the payload is not a supported image
+        ImageTooLarge: If the dimensions exceed the limits
+    """
+    header = stream.read(HEADER_CHUNK)
+    if not header:
+        raise InvalidImage("Uploaded file is empty.")
+
+    info = sniff_image(header)
+    while info is None:
+        chunk = stream.read(HEADER_CHUNK)
+        if not chunk or len(header) >= MAX_HEADER_BYTES:
+            raise InvalidImage("Could not read image dimensions.")
+        header += chunk
+        info = sniff_image(header)
+
+    if info.width > max_side or info.height > max_side or info.width * info.height > max_pixels:
+        raise ImageTooLarge(
+            f"Image is too large ({info.width}x{info.height}). "
+            f"Please upload an image up to {max_side}px per side."
+        )
+
+    return info, header + stream.read()
+
+
+def reduction_factor(info: ImageInfo, target_side: int) -> int:
+    """Largest decode scale (1, 2, 4 or 8) that keeps the short side >= target_side."""
+    short_side = min(info.width, info.height)
+    for factor, _ in _REDUCED_FLAGS:
+        if short_side // factor >= target_side:
+            return factor
+    return 1
+
+
+def decode_image(data: bytes, info: ImageInfo, target_side: Optional[int]) -> np.ndarray:
+    """
+    Decode an upload to a BGR array, reduced in scale when it is far larger than needed.
+
+    For JPEG the reduced flags use DCT scaling, so the full-resolution bitmap is
+    never materialized. target_side=None decodes at full resolution.
+
+    Raises:
+        InvalidImage: If OpenCV cannot decode the payload
+    """
+    factor = reduction_factor(info, target_side) if target_side else 1
+    flag = dict(_REDUCED_FLAGS).get(factor, cv2.IMREAD_COLOR)
+    image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), flag)
+    if image is None:
+        raise InvalidImage("The image could not be decoded.")
+    return image
@@ -0,0 +1,65 @@
+"""
+In-repo inference for models loaded through model_weights.
+
+Reproduces the notebook's eval transform (resize the short side to
+int(img_size * 1.14), center crop, ImageNet normalization) with PIL and NumPy
+and returns sigmoid outputs; prediction.Prediction turns them into responses.
+"""
+
+import io
+from typing import Sequence, Union
+
+import numpy as np
+import torch
+from PIL import Image
+
+IMAGENET_MEAN = np.array([0.485, 0.456, 0.406], dtype=np.float32)
+IMAGENET_STD = np.array([0.229, 0.224, 0.225], dtype=np.float32)
+
+
+def preprocess(image: Union[bytes, Image.Image], img_size: int = 224) -> np.ndarray:
+    """
+    Eval transform for one image.
+
+    Args:
+        image: Encoded image bytes or a PIL image
+        img_size (int): Model input side
+
+    Returns:
+        ndarray: float32 array of shape (3, img_size, img_size)
+    """
+    if isinstance(image, (bytes, bytearray, memoryview)):
+        image = Image.open(io.BytesIO(image))
+    image = image.convert("RGB")
+
+    resize_to = int(img_size * 1.14)
+    width, height = image.size
+    scale = resize_to / min(width, height)
+    new_w, new_h = max(resize_to, round(width * scale)), max(resize_to, round(height * scale))
+    image = image.resize((new_w, new_h), Image.BILINEAR)
+    left, top = (new_w - img_size) // 2, (new_h - img_size) // 2
+    image = image.crop((left, top, left + img_size, top + img_size))
+
+    array = np.asarray(image, dtype=np.float32) / 255.0
+    array = (array - IMAGENET_MEAN) / IMAGENET_STD
+    return np.ascontiguousarray(array.transpose(2, 0, 1))
+
+
+def to_batch(images: Sequence[Union[bytes, Image.Image]], img_size: int = 224) -> torch.Tensor:
+    return torch.from_numpy(np.stack([preprocess(image, img_size) for image in images]))
+
+
+@torch.inference_mode()
+def predict_probabilities(model, batch: torch.Tensor, tta: bool = False) -> np.ndarray:
+    """
+    Sigmoid outputs, shape (batch, n_attributes).
+
+    With `tta`, every image is stacked with its horizontal flip and both go
+    through a single forward pass of twice the batch size; their probabilities
+    are averaged. This steadies attributes that sit close to their threshold.
+    """
+    if not tta:
+        return torch.sigmoid(model(batch).float()).numpy()
+    n = batch.shape[0]
+    probs = torch.sigmoid(model(torch.cat([batch, batch.flip(-1)])).float())
+    return ((probs[:n] + probs[n:]) / 2).numpy()
@@ -0,0 +1,182 @@
+"""
+Persistent cache of Gemini responses, keyed on the prediction's signature.
+
+Gemini's output depends only on the prediction dict, and predictions fall into
+a limited set of common combinations. The cache key is a canonical signature:
+the sorted set of predicted-true attributes plus every probability rounded
+into one of a few coarse buckets. Two uploads with the same signature reuse
+the same summary and content sections instead of calling the API again.
+
+Entries live in SQLite (survives restarts, shared by threads), expire after a
+TTL and are evicted least-recently-used beyond a maximum count. Only real
+Gemini responses are stored; the local fallbacks are cheap and not cached.
+
+Usage:
+    python llm_cache.py stats
+    python llm_cache.py clear
+"""
+
+import argparse
+import hashlib
+import json
+import sqlite3
+import sys
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import metrics
+import serialization
+from prediction import Prediction
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_cache (
+    key TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    latency REAL NOT NULL,
+    value TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS llm_cache_accessed_at ON llm_cache (accessed_at);
+"""
+
+_lookups = metrics.counter("llm_cache_lookups_total", "LLM response cache lookups", ["function", "result"])
+_saved_seconds = metrics.counter("llm_cache_saved_seconds_total",
+                                 "Generation time avoided by cache hits (latency of the cached call)", ["function"])
+_generation_seconds = metrics.histogram("llm_generation_seconds", "Time spent in Gemini calls that were cached",
+                                        ["function"])
+
+
+def prediction_signature(data: Dict[str, Any], buckets: int = 4) -> str:
+    """
+    Canonical signature of a prediction dict.
+
+    Args:
+        data (Prediction or dict): {attr: {"probability": float, "predicted": bool}} (plain values are accepted)
+        buckets (int): Number of equal-width probability buckets
+
+    Returns:
+        str: e.g. "big_eyes,male|attractive=2,big_eyes=3,male=3,..."
+    """
+    if isinstance(data, Prediction):
+        return data.signature(buckets)
+    positives, levels = [], []
+    for attr in sorted(data):
+        value = data[attr]
+        if isinstance(value, dict):
+            predicted, probability = value.get("predicted"), value.get("probability")
+        else:
+            predicted, probability = value, None
+        if predicted is True:
+            positives.append(attr)
+        if isinstance(probability, (int, float)):
+            levels.append(f"{attr}={min(int(probability * buckets), buckets - 1)}")
+    return ",".join(positives) + "|" + ",".join(levels)
+
+
+def cache_key(kind: str, signature: str, *context: str) -> str:
+    """Key of one cached call: function, prediction signature and anything else the prompt depends on."""
+    raw = "\x1f".join((kind, signature) + context)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    def __init__(self, db_path: str, ttl_seconds: Optional[float] = 7 * 24 * 3600, max_entries: int = 5000,
+                 buckets: int = 4):
+        """
+        Args:
+            db_path (str): SQLite file
+            ttl_seconds (float, optional): Entry lifetime; None keeps entries until evicted
+            max_entries (int): LRU limit on the number of entries
+            buckets (int): Probability buckets used for the signature
+        """
+        self.db_path = str(db_path)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.buckets = buckets
+        self._local = threading.local()
+        self._connect().executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        # sqlite3 connections are not shared across threads; keep one per thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def key_for(self, kind: str, data: Dict[str, Any], *context: str) -> str:
+        return cache_key(kind, prediction_signature(data, self.buckets), *context)
+
+    def get(self, kind: str, key: str) -> Optional[Any]:
+        """Cached value, or None on a miss or an expired entry. Hits refresh the entry's LRU position."""
+        conn = self._connect()
+        now = time.time()
+        row = conn.execute("SELECT created_at, latency, value FROM llm_cache WHERE key = ?", (key,)).fetchone()
+        if row is not None and self.ttl_seconds is not None and now - row[0] > self.ttl_seconds:
+            conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+            row = None
+        if row is None:
+            _lookups.inc(function=kind, result="miss")
+            return None
+        conn.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key))
+        _lookups.inc(function=kind, result="hit")
+        _saved_seconds.inc(row[1], function=kind)
+        return serialization.loads(row[2])
+
+    def put(self, kind: str, key: str, value: Any, latency: float) -> None:
+        """Store a generated value with the time it took to generate."""
+        now = time.time()
+        conn = self._connect()
+        conn.execute(
+            "INSERT OR REPLACE INTO llm_cache (key, kind, created_at, accessed_at, latency, value) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (key, kind, now, now, latency, serialization.dumps_str(value)),
+        )
+        _generation_seconds.observe(latency, function=kind)
+        # Evict least recently used entries beyond the limit
+        conn.execute(
+            "DELETE FROM llm_cache WHERE key IN "
+            "(SELECT key FROM llm_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+    def purge_expired(self) -> int:
+        """Remove expired entries. Returns the number removed."""
+        if self.ttl_seconds is None:
+            return 0
+        return self._connect().execute(
+            "DELETE FROM llm_cache WHERE created_at < ?", (time.time() - self.ttl_seconds,)
+        ).rowcount
+
+    def stats(self) -> Dict[str, Any]:
+        rows = self._connect().execute(
+            "SELECT kind, COUNT(*), AVG(latency) FROM llm_cache GROUP BY kind"
+        ).fetchall()
+        return {kind: {"entries": count, "mean_latency_s": round(latency or 0.0, 3)} for kind, count, latency in rows}
+
+    def clear(self) -> int:
+        return self._connect().execute("DELETE FROM llm_cache").rowcount
+
+
+def main() -> int:
+    from production import LLM_CACHE_DB_PATH
+
+    parser = argparse.ArgumentParser(description="Inspect the LLM response cache")
+    parser.add_argument("command", choices=("stats", "clear"))
+    parser.add_argument("--db", default=str(LLM_CACHE_DB_PATH))
+    args = parser.parse_args()
+
+    cache = ResponseCache(args.db)
+    if args.command == "stats":
+        print(json.dumps(cache.stats(), indent=2))
+    else:
+        print(f"🧹 Removed {cache.clear()} cached responses")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,213 @@
+"""
+Rate limiting, retries and a circuit breaker around Gemini calls.
+
+Without these, a throttled or degraded API ties up request threads for the
+SDK's full timeout before generate_summary/generate_content fall back to the
+local generators. ResilientClient.call() wraps a single API request:
+
+- a token bucket sized to the quota; a call that would wait longer than
+  `max_wait` for a token fails at once instead of queueing
+- a per-attempt timeout and bounded retries with full-jitter exponential
+  backoff, for transient errors only (429, 5xx, timeouts)
+- a circuit breaker that opens after `failure_threshold` consecutive failed
+  calls; while open every call fails immediately (callers serve the local
+  fallback), and after `reset_timeout` one half-open probe decides whether it
+  closes again
+
+Any failure surfaces as an exception, so the existing fallback paths apply.
+"""
+
+import random
+import threading
+import time
+from typing import Callable, Optional, TypeVar
+
+import metrics
+
+T = TypeVar("T")
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+_STATE_VALUES = {CLOSED: 0, OPEN: 1, HALF_OPEN: 2}
+
+# google.api_core exception names (and builtins) that are worth another attempt
+TRANSIENT_ERRORS = {
+    "ResourceExhausted", "TooManyRequests", "ServiceUnavailable", "InternalServerError", "DeadlineExceeded",
+    "GatewayTimeout", "BadGateway", "TimeoutError", "ConnectionError", "RetryError",
+}
+TRANSIENT_CODES = {429, 500, 502, 503, 504}
+
+_calls = metrics.counter("llm_calls_total", "LLM calls by outcome", ["function", "result"])
+_retries = metrics.counter("llm_retries_total", "LLM call retries after transient errors", ["function"])
+_breaker_state = metrics.gauge("llm_circuit_state", "Circuit breaker state (0 closed, 1 open, 2 half-open)", ["name"])
+_breaker_transitions = metrics.counter("llm_circuit_transitions_total", "Circuit breaker state changes",
+                                       ["name", "state"])
+
+
+class CircuitOpen(RuntimeError):
+    """The breaker is open; the call was not attempted."""
+
+
+class RateLimited(RuntimeError):
+    """No token became available within the allowed wait."""
+
+
+def is_transient(exc: BaseException) -> bool:
+    code = getattr(exc, "code", None)
+    if isinstance(code, int) and code in TRANSIENT_CODES:
+        return True
+    return any(cls.__name__ in TRANSIENT_ERRORS for cls in type(exc).__mro__)
+
+
+class TokenBucket:
+    """Thread-safe token bucket; tokens refill continuously at `rate` per second up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: float, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self._clock = clock
+        self._tokens = capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def reserve(self, max_wait: float) -> Optional[float]:
+        """
+        Take a token, possibly ahead of time.
+
+        Returns:
+            float or None: Seconds to wait before using the token, or None if
+            that would exceed `max_wait` (no token is taken)
+        """
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            wait = 0.0 if self._tokens >= 1 else (1 - self._tokens) / self.rate
+            if wait > max_wait:
+                return None
+            self._tokens -= 1
+            return wait
+
+    def acquire(self, max_wait: float) -> bool:
+        wait = self.reserve(max_wait)
+        if wait is None:
+            return False
+        if wait > 0:
+            time.sleep(wait)
+        return True
+
+
+class CircuitBreaker:
+    def __init__(self, name: str = "gemini", failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            failure_threshold (int): Consecutive failed calls that open the circuit
+            reset_timeout (float): Seconds open before a half-open probe is let through
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        _breaker_state.set(0, name=name)
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    def _transition(self, state: str) -> None:
+        if state != self._state:
+            self._state = state
+            _breaker_state.set(_STATE_VALUES[state], name=self.name)
+            _breaker_transitions.inc(name=self.name, state=state)
+            print(f"⚠️ {self.name} circuit {state}" if state != CLOSED else f"✅ {self.name} circuit closed")
+
+    def allow(self) -> bool:
+        """Whether a call may go ahead. In half-open state only a single probe is allowed."""
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+            if self._state == OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+                self._transition(HALF_OPEN)
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._transition(CLOSED)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                self._opened_at = self._clock()
+                self._transition(OPEN)
+
+
+class ResilientClient:
+    def __init__(self, rate_per_minute: float = 15, burst: float = 3, max_wait: float = 2.0,
+                 timeout: float = 15.0, max_retries: int = 2, backoff_base: float = 0.5, backoff_max: float = 4.0,
+                 failure_threshold: int = 5, reset_timeout: float = 30.0, name: str = "gemini"):
+        """
+        Args:
+            rate_per_minute (float): Sustained request rate (the API quota)
+            burst (float): Requests allowed back to back
+            max_wait (float): Longest wait for a token before failing the call
+            timeout (float): Per-attempt timeout handed to the request
+            max_retries (int): Extra attempts after a transient error
+            backoff_base, backoff_max (float): Full-jitter backoff bounds in seconds
+            failure_threshold (int): Consecutive failures that open the circuit
+            reset_timeout (float): Seconds before a half-open probe
+        """
+        self.bucket = TokenBucket(rate_per_minute / 60.0, burst)
+        self.breaker = CircuitBreaker(name, failure_threshold, reset_timeout)
+        self.max_wait = max_wait
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._rng = random.Random()
+
+    def backoff(self, attempt: int) -> float:
+        return self._rng.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def call(self, function: str, request: Callable[[float], T]) -> T:
+        """
+        Run `request(timeout)` under the rate limit, retry policy and breaker.
+
+        Raises:
+            CircuitOpen: The breaker is open
+            RateLimited: The quota is exhausted for longer than `max_wait`
+            Exception: The last error of a failed call
+        """
+        if not self.breaker.allow():
+            _calls.inc(function=function, result="short_circuit")
+            raise CircuitOpen(f"{self.breaker.name} circuit is open")
+
+        attempt = 0
+        while True:
+            if not self.bucket.acquire(self.max_wait):
+                # Our own quota, not a service failure: leave the breaker alone, but
+                # a half-open probe that never ran must not keep the circuit stuck
+                if self.breaker.state == HALF_OPEN:
+                    self.breaker.record_failure()
+                _calls.inc(function=function, result="rate_limited")
+                raise RateLimited(f"{self.breaker.name} rate limit reached")
+            try:
+                result = request(self.timeout)
+            except Exception as exc:
+                if attempt < self.max_retries and is_transient(exc) and self.breaker.state != HALF_OPEN:
+                    attempt += 1
+                    _retries.inc(function=function)
+                    time.sleep(self.backoff(attempt))
+                    continue
+                self.breaker.record_failure()
+                _calls.inc(function=function, result="error")
+                raise
+            self.breaker.record_success()
+            _calls.inc(function=function, result="ok")
+            return result
@@ -0,0 +1,84 @@
+"""
+Background upgrade of local-first reports to Gemini text.
+
+With LLM_MODE=speculative, /predict answers with the local generators' summary
+and content (or Gemini text already in the response cache) and stores the
+report with "source": "local" and "upgrading": true. ReportUpgrader then calls
+Gemini off the request path and rewrites the stored payload in one
+transaction, bumping its revision; the Gemini text also lands in the response
+cache for later predictions with the same signature. Clients re-fetch
+/reports/<id>.json until "upgrading" is false.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Tuple
+
+import metrics
+from prediction import PredictionData
+
+_upgrades = metrics.counter("llm_report_upgrades_total", "Background Gemini upgrades of stored reports", ["result"])
+_upgrade_seconds = metrics.histogram("llm_report_upgrade_seconds", "Time to upgrade a report to Gemini text")
+_pending_gauge = metrics.gauge("llm_report_upgrades_pending", "Report upgrades queued or running")
+
+
+class ReportUpgrader:
+    def __init__(self, store, generate: Callable[[PredictionData, Dict[str, Any]], Tuple[str, Dict[str, Any]]],
+                 workers: int = 1, max_pending: int = 32):
+        """
+        Args:
+            store (ReportStore): Where the reports live
+            generate (callable): (prediction, feature_descriptions) -> (summary, content);
+                raises when Gemini is unavailable
+            workers (int): Upgrades run at once
+            max_pending (int): Queued + running upgrades; beyond this reports keep the local text
+        """
+        self.store = store
+        self.max_pending = max_pending
+        self._generate = generate
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="llm-upgrade")
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def submit(self, report_id: str, prediction: PredictionData, feature_descriptions: Dict[str, Any]) -> bool:
+        """
+        Queue an upgrade for a stored report.
+
+        Returns:
+            bool: False if the queue is full (the report keeps its local text)
+        """
+        with self._lock:
+            if self._pending >= self.max_pending:
+                _upgrades.inc(result="skipped")
+                return False
+            self._pending += 1
+            _pending_gauge.set(self._pending)
+        self._executor.submit(self._run, report_id, prediction, feature_descriptions)
+        return True
+
+    def _run(self, report_id: str, prediction: PredictionData, feature_descriptions: Dict[str, Any]) -> None:
+        start = time.perf_counter()
+        try:
+            try:
+                summary, content = self._generate(prediction, feature_descriptions)
+                changes = {"summary": summary, "content": content, "source": "gemini", "upgrading": False}
+                result = "ok"
+            except Exception as e:
+                print(f"⚠️ Report {report_id} keeps local text: {str(e)}")
+                changes = {"upgrading": False}
+                result = "failed"
+            if self.store.update(report_id, changes) is None:
+                result = "expired"
+        except Exception as e:
+            print(f"⚠️ Failed to upgrade report {report_id}: {str(e)}")
+            result = "failed"
+        finally:
+            with self._lock:
+                self._pending -= 1
+                _pending_gauge.set(self._pending)
+        _upgrades.inc(result=result)
+        _upgrade_seconds.observe(time.perf_counter() - start)
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait)
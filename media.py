@@ -0,0 +1,130 @@
+"""
+Cacheable serving of user images and rendered reports.
+
+Files under static/user_images and static/reports are written once and never
+modified, so /media serves them with a strong ETag (SHA-256 of the content)
+and answers If-None-Match with 304. New files carry a content hash in their
+name (hashed_filename()); when the name's hash matches the content the
+response is marked immutable, so browsers and CDNs never revalidate it. Other
+files (written before hashed names) get "no-cache" and revalidate with the
+ETag.
+
+Stored reports (/reports/<id>.json and .html) change when a background
+upgrade rewrites them, so conditional_response() gives them a content ETag and
+"no-cache": polling viewers get a 304 until the revision changes.
+
+Content hashes are cached per (path, mtime, size), so a file is hashed at
+most once (or never, when /predict primes the cache with the bytes it wrote).
+"""
+
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional, Tuple, Union
+
+from flask import Request, Response, abort, send_file
+from werkzeug.security import safe_join
+
+import metrics
+
+HASH_LENGTH = 16
+HASHED_NAME_RE = re.compile(r"_([0-9a-f]{%d})\.[A-Za-z0-9]+$" % HASH_LENGTH)
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+_responses = metrics.counter("media_responses_total", "Media and report responses", ["kind", "status"])
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def hashed_filename(stem: str, data: bytes, suffix: str) -> str:
+    """`{stem}_{first 16 hex digits of the SHA-256 of data}{suffix}`."""
+    return f"{stem}_{content_hash(data)[:HASH_LENGTH]}{suffix}"
+
+
+class ETagCache:
+    """LRU of content hashes keyed by (path, mtime_ns, size)."""
+
+    def __init__(self, max_entries: int = 4096):
+        self.max_entries = max_entries
+        self._items: "OrderedDict[Tuple[str, int, int], str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(path: Union[str, Path]) -> Tuple[str, int, int]:
+        stat = os.stat(path)
+        return str(path), stat.st_mtime_ns, stat.st_size
+
+    def _put(self, key: Tuple[str, int, int], digest: str) -> None:
+        with self._lock:
+            self._items[key] = digest
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+
+    def prime(self, path: Union[str, Path], data: bytes) -> str:
+        """Record the hash of a file just written with `data` (saves reading it back)."""
+        digest = content_hash(data)
+        self._put(self._key(path), digest)
+        return digest
+
+    def get(self, path: Union[str, Path]) -> str:
+        """
+        SHA-256 of a file's content.
+
+        Raises:
+            OSError: If the file cannot be read
+        """
+        key = self._key(path)
+        with self._lock:
+            digest = self._items.get(key)
+            if digest is not None:
+                self._items.move_to_end(key)
+                return digest
+        hasher = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                hasher.update(block)
+        digest = hasher.hexdigest()
+        self._put(key, digest)
+        return digest
+
+
+def send_media(roots: Dict[str, Path], root: str, filename: str, etags: ETagCache) -> Response:
+    """
+    A file from one of `roots` with a strong content ETag; 304 on a matching If-None-Match.
+
+    Raises:
+        NotFound: Unknown root, unsafe path or missing file
+    """
+    base_dir = roots.get(root)
+    path = safe_join(str(base_dir), filename) if base_dir is not None else None
+    if path is None or not os.path.isfile(path):
+        abort(404)
+    try:
+        digest = etags.get(path)
+    except OSError:
+        abort(404)
+
+    response = send_file(path, etag=digest, conditional=True, max_age=None)
+    match = HASHED_NAME_RE.search(os.path.basename(path))
+    response.headers["Cache-Control"] = IMMUTABLE if match and digest.startswith(match.group(1)) else REVALIDATE
+    _responses.inc(kind=root, status=str(response.status_code))
+    return response
+
+
+def conditional_response(request: Request, body: Union[str, bytes], mimetype: str, kind: str,
+                         etag: Optional[str] = None) -> Response:
+    """A response for changing content (stored reports): content ETag, revalidated on every use."""
+    data = body.encode("utf-8") if isinstance(body, str) else body
+    response = Response(data, mimetype=mimetype)
+    response.set_etag(etag or content_hash(data))
+    response.headers["Cache-Control"] = REVALIDATE
+    response.make_conditional(request)
+    _responses.inc(kind=kind, status=str(response.status_code))
+    return response
@@ -0,0 +1,387 @@
+"""
+Registry of model versions with hot reload and weighted A/B routing.
+
+Versions are declared in a JSON file (MODEL_REGISTRY_CONFIG):
+
+    {
+      "versions": [
+        {"name": "fp32", "path": "model/convnext_tiny_celeb.safetensors",
+         "thresholds": "model/thresholds.json", "weight": 80},
+        {"name": "int8", "path": "model/convnext_tiny_celeb.safetensors", "quantize": "dynamic", "weight": 10},
+        {"name": "student", "path": "model/mobilenetv3_celeb_bundle.pth", "weight": 10}
+      ]
+    }
+
+`weight` is the share of /predict traffic a version receives; `"tta": true`
+averages each prediction with its horizontally flipped input (the registry-wide
+default comes from INFERENCE_TTA). A version with
+`"loader": "legacy"` serves through model_loader.predict_attributes_from_bytes
+(one image per call, so batches are predicted face by face); without a config
+file that is the only version. Thresholds come from the
+`thresholds` file, else from the checkpoint bundle, else 0.5.
+
+The routing table is immutable and replaced with a single assignment, so a
+reload never blocks requests: requests that already picked a version finish on
+it, new requests see the new table. New versions are fully loaded before the
+swap; a config that fails to load leaves the current table in place. Versions
+whose spec and files are unchanged are reused across reloads.
+"""
+
+import hashlib
+import io
+import json
+import os
+import random
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+from PIL import Image
+
+import metrics
+import resources
+from crop_encoding import ModelInput
+from prediction import AttributeIndex, Prediction
+
+PROBABILITY_BUCKETS = (0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0)
+LEGACY_CONFIG = {"versions": [{"name": "default", "loader": "legacy", "weight": 100}]}
+
+# Encoded image bytes, a decoded RGB image, or a crop_encoding.ModelInput (prepared per version)
+ImageInput = Union[bytes, Image.Image, ModelInput]
+
+_inference_seconds = metrics.histogram("model_inference_seconds", "Model inference time per version", ["version"])
+_predictions = metrics.counter("model_predictions_total", "Predictions served per version", ["version"])
+_errors = metrics.counter("model_prediction_errors_total", "Failed predictions per version", ["version"])
+_positives = metrics.counter("model_attribute_positive_total", "Positive predictions per version and attribute",
+                             ["version", "attribute"])
+_probabilities = metrics.histogram("model_attribute_probability", "Distribution of attribute probabilities per version",
+                                   ["version"], buckets=PROBABILITY_BUCKETS)
+_weights = metrics.gauge("model_version_weight", "Routing weight per loaded version", ["version"])
+_reloads = metrics.counter("model_registry_reloads_total", "Registry reloads", ["result"])
+
+
+class ModelVersion:
+    """A loaded model version. Immutable once built; shared by concurrent requests."""
+
+    def __init__(self, spec: Dict, predict_fn: Callable[[ImageInput], Dict], fingerprint: str, model=None,
+                 attributes: Optional[List[str]] = None, thresholds: Optional[Sequence[float]] = None,
+                 img_size: int = 224, predict_batch_fn: Optional[Callable[[List[ImageInput]], List[Dict]]] = None):
+        self.spec = spec
+        self.name = spec["name"]
+        self.weight = float(spec.get("weight", 0))
+        self.fingerprint = fingerprint
+        self.model = model
+        self.attributes = attributes
+        self.thresholds = thresholds
+        self.img_size = img_size
+        self._predict_fn = predict_fn
+        self._predict_batch_fn = predict_batch_fn
+
+    def predict(self, image: ImageInput) -> Prediction:
+        start = time.perf_counter()
+        try:
+            prediction = self._predict_fn(image)
+        except Exception:
+            _errors.inc(version=self.name)
+            raise
+        _inference_seconds.observe(time.perf_counter() - start, version=self.name)
+        return self._record(prediction)
+
+    def predict_batch(self, images: List[ImageInput]) -> List[Prediction]:
+        """Predictions for several images, in one forward pass when the version supports it."""
+        start = time.perf_counter()
+        try:
+            if self._predict_batch_fn is not None:
+                predictions = self._predict_batch_fn(images)
+            else:
+                predictions = [self._predict_fn(image) for image in images]
+        except Exception:
+            _errors.inc(version=self.name)
+            raise
+        _inference_seconds.observe(time.perf_counter() - start, version=self.name)
+        return [self._record(prediction) for prediction in predictions]
+
+    def _record(self, prediction) -> Prediction:
+        if isinstance(prediction, dict) and "error" in prediction:
+            _errors.inc(version=self.name)
+            return prediction
+        if not isinstance(prediction, Prediction):
+            # Legacy loader output
+            prediction = Prediction.from_dict(prediction)
+        _predictions.inc(version=self.name)
+        for probability in prediction.probabilities.tolist():
+            if probability == probability:  # NaN: the loader gave no probability
+                _probabilities.observe(probability, version=self.name)
+        for attr in prediction.predicted_names():
+            _positives.inc(version=self.name, attribute=attr)
+        return prediction
+
+    def describe(self) -> Dict:
+        return {
+            "name": self.name,
+            "weight": self.weight,
+            "loader": self.spec.get("loader", "weights"),
+            "path": self.spec.get("path"),
+            "quantize": self.spec.get("quantize"),
+            "tta": bool(self.spec.get("tta")) and self.model is not None,
+            "thresholds": "tuned" if self.thresholds is not None else "default",
+        }
+
+
+def _resolve(base_dir: str, path: Optional[str]) -> Optional[str]:
+    if path is None:
+        return None
+    return path if os.path.isabs(path) else os.path.join(base_dir, path)
+
+
+def _mtime(path: Optional[str]) -> float:
+    try:
+        return os.path.getmtime(path) if path else 0.0
+    except OSError:
+        return 0.0
+
+
+def _fingerprint(spec: Dict, base_dir: str) -> str:
+    """Identity of a version: its spec (minus routing weight) and the mtimes of its files."""
+    body = {k: v for k, v in spec.items() if k != "weight"}
+    files = [_resolve(base_dir, spec.get(key)) for key in ("path", "thresholds")]
+    raw = json.dumps(body, sort_keys=True) + "|" + "|".join(f"{f}:{_mtime(f)}" for f in files if f)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def load_thresholds(path: str, attributes: List[str]) -> List[float]:
+    """Thresholds JSON ({"thresholds": {attr: th}} or {attr: th}) in `attributes` order."""
+    by_name = resources.thresholds(path)
+    return [by_name.get(attr, 0.5) for attr in attributes]
+
+
+def _as_bytes(image: ImageInput) -> bytes:
+    # model_loader only takes encoded images and does its own resizing: give it the whole crop
+    if isinstance(image, ModelInput):
+        return image.encoded()
+    if isinstance(image, Image.Image):
+        buffer = io.BytesIO()
+        image.save(buffer, format="JPEG", quality=95)
+        return buffer.getvalue()
+    return image
+
+
+def _as_image(image: ImageInput, img_size: int) -> Union[bytes, Image.Image]:
+    # Versions built here own their transform, so crops arrive pre-resized for it
+    return image.prepared(img_size) if isinstance(image, ModelInput) else image
+
+
+def load_version(spec: Dict, base_dir: str) -> ModelVersion:
+    """Build a ModelVersion from its config entry."""
+    fingerprint = _fingerprint(spec, base_dir)
+    if spec.get("loader") == "legacy":
+        from model_loader import load_model, predict_attributes_from_bytes
+        load_model()
+        return ModelVersion(spec, lambda image: predict_attributes_from_bytes(_as_bytes(image)), fingerprint)
+
+    import torch
+    from inference import predict_probabilities, to_batch
+    from model_weights import load_model
+
+    model = load_model(_resolve(base_dir, spec["path"]))
+    info = model.checkpoint_info
+    if spec.get("quantize") == "dynamic":
+        # int8 weights for the Linear layers (the bulk of ConvNeXt's MLP blocks)
+        model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    elif spec.get("quantize"):
+        raise ValueError(f"Unsupported quantization '{spec['quantize']}' for version {spec['name']}")
+
+    attributes = list(info["attributes"])
+    thresholds = info["thresholds"]
+    if spec.get("thresholds"):
+        thresholds = load_thresholds(_resolve(base_dir, spec["thresholds"]), attributes)
+    img_size = int(info.get("img_size") or 224)
+    tta = bool(spec.get("tta"))
+
+    index = AttributeIndex.of(attributes)
+
+    def predict_batch_fn(images: List[ImageInput]) -> List[Prediction]:
+        probs = predict_probabilities(model, to_batch([_as_image(image, img_size) for image in images], img_size), tta=tta)
+        return Prediction.from_batch(probs, index, thresholds)
+
+    def predict_fn(image: ImageInput) -> Prediction:
+        return predict_batch_fn([image])[0]
+
+    return ModelVersion(spec, predict_fn, fingerprint, model, attributes, thresholds, img_size, predict_batch_fn)
+
+
+class RoutingTable:
+    """Immutable set of versions with cumulative weights for weighted random choice."""
+
+    def __init__(self, versions: Sequence[ModelVersion]):
+        self.versions = tuple(versions)
+        self.by_name = {v.name: v for v in self.versions}
+        total = 0.0
+        self.cumulative = []
+        for version in self.versions:
+            total += max(version.weight, 0.0)
+            self.cumulative.append(total)
+        self.total = total
+
+    def choose(self, rng: random.Random) -> ModelVersion:
+        if self.total <= 0:
+            return self.versions[0]
+        point = rng.random() * self.total
+        for version, bound in zip(self.versions, self.cumulative):
+            if point < bound:
+                return version
+        return self.versions[-1]
+
+
+class ModelRegistry:
+    def __init__(self, config_path: str, base_dir: Optional[str] = None,
+                 loader: Callable[[Dict, str], ModelVersion] = load_version, tta: bool = False):
+        """
+        Args:
+            config_path (str): Registry JSON; missing file = legacy loader only
+            base_dir (str, optional): Relative model paths resolve against this
+                (defaults to the app directory)
+            loader (callable): (spec, base_dir) -> ModelVersion
+            tta (bool): Flip TTA for versions that do not set "tta" themselves
+        """
+        self.config_path = str(config_path)
+        self.base_dir = base_dir or os.path.dirname(os.path.abspath(__file__))
+        self.defaults = {"tta": tta}
+        self._loader = loader
+        self._reload_lock = threading.Lock()
+        self._rng = random.Random()
+        self._table: Optional[RoutingTable] = None
+        self._fingerprint: Tuple = ()
+
+    def _read_config(self) -> Dict:
+        if not os.path.exists(self.config_path):
+            return LEGACY_CONFIG
+        with open(self.config_path, "r", encoding="utf-8") as f:
+            config = json.load(f)
+        versions = config.get("versions")
+        if not versions:
+            raise ValueError("Registry config has no versions")
+        names = [v.get("name") for v in versions]
+        if None in names or len(set(names)) != len(names):
+            raise ValueError("Every version needs a unique name")
+        return config
+
+    def files_fingerprint(self) -> Tuple:
+        """mtimes of the config and every file it references, for change detection."""
+        paths = [self.config_path]
+        if self._table is not None:
+            for version in self._table.versions:
+                paths.extend(_resolve(self.base_dir, version.spec.get(k)) for k in ("path", "thresholds"))
+        return tuple((p, _mtime(p)) for p in paths if p)
+
+    def reload(self) -> bool:
+        """
+        Load the config and swap in the new routing table.
+
+        Returns:
+            bool: True if the table was replaced, False if loading failed
+        """
+        with self._reload_lock:
+            try:
+                config = self._read_config()
+                current = self._table.by_name if self._table is not None else {}
+                versions = []
+                for spec in config["versions"]:
+                    spec = {**self.defaults, **spec}
+                    existing = current.get(spec["name"])
+                    if existing is not None and existing.fingerprint == _fingerprint(spec, self.base_dir):
+                        # Same model files: reuse the loaded model, pick up the new weight
+                        version = ModelVersion(spec, existing._predict_fn, existing.fingerprint, existing.model,
+                                               existing.attributes, existing.thresholds, existing.img_size,
+                                               existing._predict_batch_fn)
+                    else:
+                        version = self._loader(spec, self.base_dir)
+                    versions.append(version)
+                table = RoutingTable(versions)
+            except Exception as e:
+                _reloads.inc(result="error")
+                # Remember the broken state so the watcher only retries after the next change
+                self._fingerprint = self.files_fingerprint()
+                print(f"⚠️ Model registry reload failed, keeping current versions: {str(e)}")
+                return False
+
+            removed = set(current) - set(table.by_name)
+            self._table = table  # atomic swap; in-flight requests keep their version
+            self._fingerprint = self.files_fingerprint()
+            for name in removed:
+                _weights.set(0, version=name)
+            for version in table.versions:
+                _weights.set(version.weight, version=version.name)
+            _reloads.inc(result="ok")
+            print("✅ Model versions: " + ", ".join(f"{v.name} ({v.weight:g})" for v in table.versions))
+            return True
+
+    def check_for_changes(self) -> bool:
+        """Reload if the config or any referenced file changed. Returns True if reloaded."""
+        if self.files_fingerprint() == self._fingerprint:
+            return False
+        return self.reload()
+
+    def route(self, version: Optional[str] = None) -> ModelVersion:
+        """Pick a version by weight, or a specific one by name if it is loaded."""
+        table = self._table
+        if table is None:
+            raise RuntimeError("Model registry has not been loaded")
+        if version is not None and version in table.by_name:
+            return table.by_name[version]
+        return table.choose(self._rng)
+
+    def predict(self, image: ImageInput, version: Optional[str] = None) -> Tuple[Prediction, str]:
+        """
+        Returns:
+            tuple: (Prediction, or the legacy loader's {"error": ...} dict; name of the version that served it)
+        """
+        chosen = self.route(version)
+        return chosen.predict(image), chosen.name
+
+    def predict_batch(self, images: List[ImageInput], version: Optional[str] = None) -> Tuple[List[Prediction], str]:
+        """
+        Several images (e.g. every face of a group photo) served by one version.
+
+        Returns:
+            tuple: (Predictions in input order, name of the version that served them)
+        """
+        chosen = self.route(version)
+        return chosen.predict_batch(images), chosen.name
+
+    def attributes(self) -> Optional[List[str]]:
+        """Attribute list of the loaded versions that declare one (legacy versions do not)."""
+        table = self._table
+        for version in table.versions if table is not None else ():
+            if version.attributes:
+                return version.attributes
+        return None
+
+    def threshold_paths(self) -> List[str]:
+        table = self._table
+        versions = table.versions if table is not None else ()
+        return [_resolve(self.base_dir, v.spec["thresholds"]) for v in versions if v.spec.get("thresholds")]
+
+    def describe(self) -> List[Dict]:
+        table = self._table
+        return [v.describe() for v in table.versions] if table is not None else []
+
+
+class RegistryWatcher(threading.Thread):
+    """Daemon thread that hot-reloads the registry when its files change."""
+
+    def __init__(self, registry: ModelRegistry, interval: float):
+        super().__init__(name="model-registry", daemon=True)
+        self.registry = registry
+        self.interval = interval
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.registry.check_for_changes()
+            except Exception as e:
+                print(f"⚠️ Model registry check failed: {str(e)}")
+
+    def stop(self) -> None:
+        self._stop_event.set()
@@ -0,0 +1,213 @@
+"""
+Memory-mapped, lazily loaded model weights.
+
+`torch.load()` on the training checkpoint copies every tensor into anonymous heap
+memory. Loading from a safetensors file (or `torch.load(mmap=True)` as a fallback)
+maps the file instead: pages are faulted in on first use and, because the mapping
+is file-backed, forked gunicorn workers share them through the page cache.
+
+Usage:
+    python model_weights.py convert            # .pth -> .safetensors (run once at build time)
+    python model_weights.py info               # show which file load_model() would use
+"""
+
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import torch
+
+# Paths
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_DIR = os.path.join(BASE_DIR, "model")
+MODEL_PATH = os.path.join(MODEL_DIR, "convnext_tiny_celeb.pth")
+SAFETENSORS_PATH = os.path.join(MODEL_DIR, "convnext_tiny_celeb.safetensors")
+
+# Architecture (must match model/convnext_tiny_celeb.ipynb)
+BACKBONE = "convnext_tiny"
+ATTRIBUTES = [
+    "attractive", "blurry_image", "sharp_jawline", "high_cheekbones", "smiling", "bald", "receeding_hairline", "long_hair", "curly_hair", "grey_hair",
+    "black_hair", "has_beard", "patchy_beard", "has_mustache", "well_groomed", "has_makeup", "wearing_glasses", "wearing_hat", "clear_skin",
+    "dark_circles", "oily_skin", "thick_eyebrow", "big_eyes", "big_lips", "sharp_nose", "adult", "old", "mouth_open", "male", "double_chin", "veil",
+    "dry_skin", "freckle", "wrinkle", "chubby"
+]
+
+
+def convert_to_safetensors(src_path: str = MODEL_PATH, dst_path: str = SAFETENSORS_PATH) -> str:
+    """
+    Convert a PyTorch state_dict checkpoint into a safetensors file.
+
+    Args:
+        src_path (str): Path to the .pth checkpoint
+        dst_path (str): Path of the .safetensors file to write
+
+    Returns:
+        str: Path to the written file
+    """
+    from safetensors.torch import save_file
+
+    state_dict, info = _unpack(torch.load(src_path, map_location="cpu", weights_only=True))
+    # safetensors refuses non-contiguous or storage-sharing tensors
+    tensors = {name: tensor.detach().contiguous().clone() for name, tensor in state_dict.items()}
+    # safetensors metadata values must be strings
+    metadata = {"format": "pt", **{key: json.dumps(value) for key, value in info.items()}}
+
+    tmp_path = dst_path + ".tmp"
+    save_file(tensors, tmp_path, metadata=metadata)
+    os.replace(tmp_path, dst_path)
+    print(f"✅ Converted {os.path.basename(src_path)} -> {os.path.basename(dst_path)}")
+    return dst_path
+
+
+def ensure_safetensors(src_path: str = MODEL_PATH, dst_path: str = SAFETENSORS_PATH) -> bool:
+    """
+    Make sure an up-to-date safetensors copy of the checkpoint exists.
+
+    Returns:
+        bool: True if the safetensors file is usable, False otherwise
+    """
+    if os.path.exists(dst_path) and (
+        not os.path.exists(src_path) or os.path.getmtime(dst_path) >= os.path.getmtime(src_path)
+    ):
+        return True
+    if not os.path.exists(src_path):
+        return False
+    try:
+        convert_to_safetensors(src_path, dst_path)
+        return True
+    except ImportError:
+        print("⚠️ safetensors not installed; falling back to torch.load(mmap=True)")
+    except Exception as e:
+        print(f"⚠️ Could not convert checkpoint to safetensors: {str(e)}")
+    return False
+
+
+def _default_info() -> Dict[str, Any]:
+    return {"backbone": BACKBONE, "attributes": ATTRIBUTES, "img_size": 224, "thresholds": None}
+
+
+def _unpack(checkpoint) -> Tuple[Dict[str, torch.Tensor], Dict[str, Any]]:
+    """
+    Split a checkpoint into (state_dict, info).
+
+    Plain state_dicts (the notebook's checkpoints) get the module defaults;
+    bundles written by training.checkpoint carry their own backbone, attributes,
+    image size and tuned thresholds.
+    """
+    info = _default_info()
+    if isinstance(checkpoint, dict) and isinstance(checkpoint.get("state_dict"), dict):
+        info.update({key: checkpoint[key] for key in info if checkpoint.get(key) is not None})
+        return checkpoint["state_dict"], info
+    return checkpoint, info
+
+
+def load_checkpoint(path: Optional[str] = None) -> Tuple[Dict[str, torch.Tensor], Dict[str, Any]]:
+    """
+    Load a checkpoint whose tensors are backed by a read-only file mapping.
+
+    Args:
+        path (str, optional): .safetensors or .pth file. Defaults to the safetensors
+            copy of the bundled checkpoint, converting it on first use.
+
+    Returns:
+        tuple: (state_dict, info) where state_dict maps parameter names to tensors
+            (lazily paged in from disk) and info holds backbone, attributes,
+            img_size and thresholds (None when the checkpoint has none)
+    """
+    if path is None:
+        path = SAFETENSORS_PATH if ensure_safetensors() else MODEL_PATH
+
+    if path.endswith(".safetensors"):
+        from safetensors import safe_open
+        from safetensors.torch import load_file
+        with safe_open(path, framework="pt") as f:
+            metadata = f.metadata() or {}
+        info = _default_info()
+        for key in info:
+            if key in metadata:
+                try:
+                    info[key] = json.loads(metadata[key])
+                except ValueError:
+                    # Files converted before metadata was JSON-encoded store the backbone as a bare string
+                    info[key] = metadata[key]
+        return load_file(path, device="cpu"), info
+
+    # Zip-format checkpoints (the torch.save default) can be mapped directly
+    return _unpack(torch.load(path, map_location="cpu", weights_only=True, mmap=True))
+
+
+def load_state_dict(path: Optional[str] = None) -> Dict[str, torch.Tensor]:
+    """State dict of a checkpoint (see load_checkpoint)."""
+    return load_checkpoint(path)[0]
+
+
+def build_model(num_classes: int = len(ATTRIBUTES), backbone: str = BACKBONE, device: str = "cpu"):
+    """Creates the (untrained) timm backbone used by the training notebook."""
+    import timm
+    with torch.device(device):
+        return timm.create_model(backbone, pretrained=False, num_classes=num_classes)
+
+
+def load_model(path: Optional[str] = None):
+    """
+    Build the model and attach memory-mapped weights without copying them.
+
+    The module is constructed on the meta device so no parameter memory is
+    allocated up front; `load_state_dict(assign=True)` then adopts the mapped
+    tensors as the parameters themselves.
+
+    The architecture comes from the checkpoint when it is a training bundle,
+    whose info is also attached as `model.checkpoint_info`.
+
+    Returns:
+        torch.nn.Module: Model in eval mode
+    """
+    start = time.perf_counter()
+    state_dict, info = load_checkpoint(path)
+    num_classes = len(info["attributes"])
+
+    model = build_model(num_classes, info["backbone"], device="meta")
+    model.load_state_dict(state_dict, strict=True, assign=True)
+
+    # Anything the checkpoint does not carry (non-persistent buffers) would still be on meta
+    if any(t.is_meta for t in itertools.chain(model.parameters(), model.buffers())):
+        print("⚠️ Model has tensors missing from the checkpoint; loading with copies")
+        model = build_model(num_classes, info["backbone"])
+        model.load_state_dict(state_dict, strict=True)
+
+    model.eval()
+    model.checkpoint_info = info
+    print(f"✅ Model weights mapped in {(time.perf_counter() - start) * 1000:.0f} ms")
+    return model
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Model weight utilities")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    convert = sub.add_parser("convert", help="Convert the .pth checkpoint to safetensors")
+    convert.add_argument("--src", default=MODEL_PATH)
+    convert.add_argument("--dst", default=SAFETENSORS_PATH)
+
+    sub.add_parser("info", help="Show which weight file load_model() would use")
+
+    args = parser.parse_args()
+    if args.command == "convert":
+        convert_to_safetensors(args.src, args.dst)
+        return 0
+
+    for path in (SAFETENSORS_PATH, MODEL_PATH):
+        state = f"{os.path.getsize(path) / (1024 * 1024):.1f} MB" if os.path.exists(path) else "missing"
+        print(f"{os.path.relpath(path, BASE_DIR)}: {state}")
+    _, info = load_checkpoint()
+    print(f"backbone: {info['backbone']}, {len(info['attributes'])} attributes, "
+          f"img_size {info['img_size']}, thresholds: {'tuned' if info['thresholds'] else 'default 0.5'}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
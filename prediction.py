@@ -0,0 +1,252 @@
+"""
+Compact prediction record.
+
+A prediction used to travel as {attr: {"probability": float, "predicted": bool}}
+and every layer (the registry's metrics, the LLM cache signature, the rule
+engine, summarizer, attribute_interpreter_v2) walked and re-copied it. A
+Prediction holds the same data as a float32 probability array and an integer
+bitmask of predicted attributes over a shared AttributeIndex, so those
+consumers answer their questions with array and bit operations.
+
+The dict and JSON forms are built lazily, once, for the API response, report
+storage and Gemini prompts; as_dict() is exactly the old prediction dict. For
+records built from a dict (legacy model_loader output, stored reports) that
+means the source's float64 probabilities, which are kept for the view rather
+than widened back from float32.
+Prediction is read-only, like the dicts it replaces were treated.
+"""
+
+import threading
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+import serialization
+
+
+class AttributeIndex:
+    """Attribute name -> position (and bit) for one model's attribute order. Shared, never mutated."""
+
+    __slots__ = ("names", "positions", "sort_order", "_masks")
+
+    _instances: Dict[Tuple[str, ...], "AttributeIndex"] = {}
+    _lock = threading.Lock()
+
+    def __init__(self, names: Sequence[str]):
+        self.names = tuple(names)
+        self.positions = {name: i for i, name in enumerate(self.names)}
+        # Positions in attribute-name order, for order-independent output (cache signatures)
+        self.sort_order = tuple(sorted(range(len(self.names)), key=self.names.__getitem__))
+        self._masks: Dict[Tuple[str, ...], int] = {}
+
+    @classmethod
+    def of(cls, names: Iterable[str]) -> "AttributeIndex":
+        """The shared index for an attribute order (one instance per order)."""
+        names = tuple(names)
+        index = cls._instances.get(names)
+        if index is None:
+            with cls._lock:
+                index = cls._instances.setdefault(names, cls(names))
+        return index
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def bit(self, name: str) -> int:
+        position = self.positions.get(name)
+        return 0 if position is None else 1 << position
+
+    def mask(self, names: Iterable[str]) -> int:
+        """Bitmask of `names` (attributes not in the index are ignored)."""
+        names = tuple(names)
+        mask = self._masks.get(names)
+        if mask is None:
+            mask = 0
+            for name in names:
+                mask |= self.bit(name)
+            self._masks[names] = mask
+        return mask
+
+
+def default_index() -> AttributeIndex:
+    """Index of the serving model's attributes (attributes.json order)."""
+    import resources
+    return AttributeIndex.of(resources.model_attributes())
+
+
+def _pack(flags: np.ndarray) -> List[int]:
+    """Rows of booleans -> one int bitmask per row (bit i = column i)."""
+    packed = np.packbits(flags, axis=-1, bitorder="little")
+    return [int.from_bytes(row.tobytes(), "little") for row in packed.reshape(len(flags), -1)]
+
+
+class Prediction:
+    """One model output: float32 probabilities and a predicted-attribute bitmask over an AttributeIndex."""
+
+    __slots__ = ("index", "probabilities", "mask", "_dict", "_json")
+
+    def __init__(self, index: AttributeIndex, probabilities: np.ndarray, mask: int):
+        """
+        Args:
+            index (AttributeIndex): Attribute order of `probabilities`
+            probabilities (ndarray): float32 array of shape (len(index),)
+            mask (int): Bit i set when attribute i is predicted
+        """
+        self.index = index
+        self.probabilities = probabilities
+        self.mask = mask
+        self._dict: Optional[Dict[str, Dict[str, Any]]] = None
+        self._json: Dict[bool, str] = {}
+
+    # ---- construction ----
+
+    @classmethod
+    def from_batch(cls, probs: np.ndarray, index: AttributeIndex,
+                   thresholds: Optional[Sequence[float]] = None) -> List["Prediction"]:
+        """
+        Predictions for a (batch, n_attributes) array of sigmoid outputs.
+
+        Args:
+            probs (ndarray): Probabilities in `index` order
+            index (AttributeIndex): The model's attributes
+            thresholds (list, optional): Per-attribute thresholds; 0.5 when omitted
+        """
+        probs = np.asarray(probs, dtype=np.float32).reshape(-1, len(index))
+        thresholds = np.full(len(index), 0.5) if thresholds is None else np.asarray(thresholds, dtype=np.float64)
+        masks = _pack(probs >= thresholds)
+        return [cls(index, row, mask) for row, mask in zip(probs, masks)]
+
+    @classmethod
+    def from_probabilities(cls, probs: np.ndarray, index: AttributeIndex,
+                           thresholds: Optional[Sequence[float]] = None) -> "Prediction":
+        return cls.from_batch(probs, index, thresholds)[0]
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any]) -> "Prediction":
+        """
+        Prediction from the dict format ({attr: {"probability", "predicted"}});
+        plain 0/1 or boolean values are taken as both probability and prediction.
+        """
+        index = AttributeIndex.of(data)
+        probabilities = np.empty(len(index), dtype=np.float32)
+        mask = 0
+        view: Optional[Dict[str, Dict[str, Any]]] = {}
+        for i, (name, value) in enumerate(data.items()):
+            if isinstance(value, dict):
+                probability, predicted = value.get("probability"), value.get("predicted")
+            else:
+                probability = predicted = value
+                view = None
+            if isinstance(predicted, (int, float)) and round(predicted) == 1:
+                mask |= 1 << i
+            if isinstance(probability, (int, float)):
+                probabilities[i] = float(probability)
+                if view is not None:
+                    view[name] = {"probability": float(probability), "predicted": bool(mask >> i & 1)}
+            else:
+                probabilities[i] = np.nan
+                view = None
+        record = cls(index, probabilities, mask)
+        # Probabilities as given (float64), not as stored (float32)
+        record._dict = view
+        return record
+
+    @classmethod
+    def coerce(cls, data: Any) -> "Prediction":
+        """`data` as a Prediction (dicts are converted)."""
+        return data if isinstance(data, cls) else cls.from_dict(data)
+
+    # ---- queries ----
+
+    def probability(self, attr: str, default: float = 0.0) -> float:
+        position = self.index.positions.get(attr)
+        return default if position is None else float(self.probabilities[position])
+
+    def is_predicted(self, attr: str) -> bool:
+        return bool(self.mask & self.index.bit(attr))
+
+    def any_of(self, names: Iterable[str]) -> bool:
+        return bool(self.mask & self.index.mask(names))
+
+    def all_of(self, names: Iterable[str]) -> bool:
+        mask = self.index.mask(names)
+        return self.mask & mask == mask
+
+    def predicted_names(self) -> List[str]:
+        mask, names = self.mask, self.index.names
+        return [names[i] for i in range(len(names)) if mask >> i & 1]
+
+    def binary(self) -> Dict[str, int]:
+        """{attr: 1 or 0}, attribute_interpreter_v2's input format."""
+        mask = self.mask
+        return {name: mask >> i & 1 for i, name in enumerate(self.index.names)}
+
+    def groups(self, groups: Mapping[str, Sequence[str]]) -> Dict[str, Dict[str, int]]:
+        """{group: {attr: 1 or 0}} for the attributes of each group this prediction has; empty groups are left out."""
+        positions, mask = self.index.positions, self.mask
+        grouped = {}
+        for group, attrs in groups.items():
+            values = {attr: mask >> positions[attr] & 1 for attr in attrs if attr in positions}
+            if values:
+                grouped[group] = values
+        return grouped
+
+    def signature(self, buckets: int = 4) -> str:
+        """llm_cache.prediction_signature() of the dict form, from the arrays."""
+        names, mask = self.index.names, self.mask
+        probs = self.probabilities.astype(np.float64)
+        known = (~np.isnan(probs)).tolist()
+        levels = np.minimum((np.nan_to_num(probs) * buckets).astype(np.int64), buckets - 1).tolist()
+        order = self.index.sort_order
+        positives = ",".join(names[i] for i in order if mask >> i & 1)
+        return positives + "|" + ",".join(f"{names[i]}={levels[i]}" for i in order if known[i])
+
+    # ---- dict / JSON views ----
+
+    def as_dict(self) -> Dict[str, Dict[str, Any]]:
+        """{attr: {"probability": float, "predicted": bool}}, built once (treat as read-only)."""
+        if self._dict is None:
+            mask = self.mask
+            self._dict = {
+                name: {"probability": p, "predicted": bool(mask >> i & 1)}
+                for i, (name, p) in enumerate(zip(self.index.names, self.probabilities.tolist()))
+            }
+        return self._dict
+
+    def to_json(self, pretty: bool = False) -> str:
+        """JSON of as_dict() (serialization.dumps_str), built once per format."""
+        text = self._json.get(pretty)
+        if text is None:
+            text = self._json[pretty] = serialization.dumps_str(self.as_dict(), pretty)
+        return text
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.index.names)
+
+    def __contains__(self, attr: object) -> bool:
+        return attr in self.index.positions
+
+    def __getitem__(self, attr: str) -> Dict[str, Any]:
+        return self.as_dict()[attr]
+
+    def get(self, attr: str, default: Any = None) -> Any:
+        return self.as_dict().get(attr, default)
+
+    def keys(self):
+        return self.as_dict().keys()
+
+    def items(self):
+        return self.as_dict().items()
+
+    def values(self):
+        return self.as_dict().values()
+
+    def __repr__(self) -> str:
+        return f"Prediction({', '.join(self.predicted_names()) or 'no attributes predicted'})"
+
+
+# A Prediction, or its dict form (CLI inputs, stored reports)
+PredictionData = Union[Prediction, Dict[str, Any]]
@@ -11,14 +11,98 @@ STATIC_DIR = BASE_DIR / "static"
 USER_IMAGES_DIR = STATIC_DIR / "user_images"
 ACCEPTED_DIR = STATIC_DIR / "accepted"
 REPORTS_DIR = STATIC_DIR / "reports"
+DATA_DIR = BASE_DIR / "data"  # private, not served
+PENDING_CROPS_DIR = DATA_DIR / "pending_crops"  # full-resolution crops awaiting consent
 
 # Ensure directories exist
 USER_IMAGES_DIR.mkdir(parents=True, exist_ok=True)
 ACCEPTED_DIR.mkdir(parents=True, exist_ok=True)
 REPORTS_DIR.mkdir(parents=True, exist_ok=True)
+DATA_DIR.mkdir(parents=True, exist_ok=True)
+PENDING_CROPS_DIR.mkdir(parents=True, exist_ok=True)
+
+# Reports: "json" stores the payload and serves a client-side viewer,
+# "html" writes a rendered file to static/reports (legacy)
+REPORT_MODE = os.getenv("REPORT_MODE", "json").lower()
+# Report text: "sync" waits for Gemini; "speculative" answers with the local text at once and
+# upgrades the stored report to Gemini text in the background (REPORT_MODE=json only)
+LLM_MODE = os.getenv("LLM_MODE", "sync").lower()
+LLM_UPGRADE_WORKERS = int(os.getenv("LLM_UPGRADE_WORKERS", "1"))
+LLM_UPGRADE_MAX_PENDING = int(os.getenv("LLM_UPGRADE_MAX_PENDING", "32"))
+REPORT_DB_PATH = DATA_DIR / "reports.sqlite3"
+CONSENT_DB_PATH = DATA_DIR / "consent.sqlite3"
+
+# Gemini response cache (see llm_cache.py); entries are keyed on the prediction signature
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "1") == "1"
+LLM_CACHE_DB_PATH = DATA_DIR / "llm_cache.sqlite3"
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_HOURS", "168")) * 3600 or None  # 0 = no expiry
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "5000"))
+LLM_CACHE_BUCKETS = int(os.getenv("LLM_CACHE_BUCKETS", "4"))  # probability buckets in the signature
+
+# Gemini call protection (see llm_resilience.py)
+GEMINI_RATE_PER_MINUTE = float(os.getenv("GEMINI_RATE_PER_MINUTE", "15"))  # API quota
+GEMINI_BURST = float(os.getenv("GEMINI_BURST", "3"))
+GEMINI_MAX_WAIT = float(os.getenv("GEMINI_MAX_WAIT", "2"))  # seconds to wait for quota before falling back
+GEMINI_TIMEOUT = float(os.getenv("GEMINI_TIMEOUT", "15"))  # seconds per attempt
+GEMINI_MAX_RETRIES = int(os.getenv("GEMINI_MAX_RETRIES", "2"))
+GEMINI_BREAKER_FAILURES = int(os.getenv("GEMINI_BREAKER_FAILURES", "5"))  # consecutive failures that open it
+GEMINI_BREAKER_RESET = float(os.getenv("GEMINI_BREAKER_RESET", "30"))  # seconds open before a probe
 
 # Model settings
 MODEL_TIMEOUT = 300  # seconds
+# Model versions and traffic split (see model_registry.py); without the file only model_loader is used
+MODEL_REGISTRY_CONFIG = Path(os.getenv("MODEL_REGISTRY_CONFIG", str(BASE_DIR / "model" / "registry.json")))
+MODEL_REGISTRY_POLL_INTERVAL = float(os.getenv("MODEL_REGISTRY_POLL_INTERVAL", "10"))  # seconds, 0 = no hot reload
+# Average each prediction with its horizontal flip (one batched forward pass of 2)
+INFERENCE_TTA = os.getenv("INFERENCE_TTA", "0") == "1"
+
+# Retention (0 disables a limit); consented images are always kept
+def _hours(name, default):
+    value = float(os.getenv(name, default))
+    return value * 3600 if value > 0 else None
+
+
+def _megabytes(name, default):
+    value = float(os.getenv(name, default))
+    return int(value * 1024 * 1024) if value > 0 else None
+
+
+RETENTION_INTERVAL = float(os.getenv("RETENTION_INTERVAL", "3600"))  # seconds between passes, 0 = off
+USER_IMAGES_TTL_SECONDS = _hours("USER_IMAGES_TTL_HOURS", "72")
+USER_IMAGES_MAX_BYTES = _megabytes("USER_IMAGES_MAX_MB", "1024")
+REPORTS_TTL_SECONDS = _hours("REPORTS_TTL_HOURS", "72")
+REPORTS_MAX_BYTES = _megabytes("REPORTS_MAX_MB", "256")
+PENDING_CROPS_TTL_SECONDS = _hours("PENDING_CROPS_TTL_HOURS", "72")
+PENDING_CROPS_MAX_BYTES = _megabytes("PENDING_CROPS_MAX_MB", "2048")
+
+# Upload limits
+UPLOAD_MAX_SIDE = int(os.getenv("UPLOAD_MAX_SIDE", "12000"))  # pixels
+UPLOAD_MAX_PIXELS = int(float(os.getenv("UPLOAD_MAX_MEGAPIXELS", "50")) * 1_000_000)
+DETECTION_TARGET_SIDE = int(os.getenv("DETECTION_TARGET_SIDE", "1024"))  # decode large images down to ~this short side
+
+# Multi-face /predict (multi_face=1)
+MULTI_FACE_MIN_SIZE = int(os.getenv("MULTI_FACE_MIN_SIZE", "80"))  # pixels of the decoded image, per side
+MULTI_FACE_MAX_FACES = int(os.getenv("MULTI_FACE_MAX_FACES", "8"))
+
+# /predict response encoding: JSON_BACKEND is "auto" (orjson when installed), "orjson" or "json";
+# RESPONSE_INLINE_CROP=0 returns the crop by URL only instead of a base64 data URL (inline_crop overrides per request)
+JSON_BACKEND = os.getenv("JSON_BACKEND", "auto").lower()
+RESPONSE_INLINE_CROP = os.getenv("RESPONSE_INLINE_CROP", "1") == "1"
+
+# Crop encoding (see crop_encoding.py): the stored and returned crop is CROP_FORMAT ("webp" or "jpeg")
+# at CROP_QUALITY, at most DISPLAY_MAX_SIDE pixels per side; the model gets its input in memory.
+# KEEP_FULL_RESOLUTION=1 (opt-in) also keeps the full-resolution crop privately, for up to
+# PENDING_CROPS_TTL_HOURS, so /consent can accept it instead of the display crop.
+CROP_FORMAT = os.getenv("CROP_FORMAT", "webp").lower()
+CROP_QUALITY = int(os.getenv("CROP_QUALITY", "80"))
+DISPLAY_MAX_SIDE = int(os.getenv("DISPLAY_MAX_SIDE", "600"))  # pixels; the UI shows the crop at most 300px wide
+KEEP_FULL_RESOLUTION = os.getenv("KEEP_FULL_RESOLUTION", "0") == "1"
+
+# Admission control for /predict
+PREDICT_MAX_CONCURRENCY = int(os.getenv("PREDICT_MAX_CONCURRENCY", "2"))
+PREDICT_MAX_QUEUE = int(os.getenv("PREDICT_MAX_QUEUE", "8"))
+PREDICT_MAX_INFLIGHT_BYTES = int(float(os.getenv("PREDICT_MAX_INFLIGHT_MB", "40")) * 1024 * 1024)
+PREDICT_QUEUE_TIMEOUT = float(os.getenv("PREDICT_QUEUE_TIMEOUT", "30"))  # seconds
 
 # CORS settings
 ALLOWED_ORIGINS = [
@@ -0,0 +1,52 @@
+"""
+Compiled Jinja2 renderer for the HTML facial analysis report.
+
+The template is parsed and compiled once when this module is imported and
+autoescapes everything, so LLM output cannot inject markup into reports. The
+styles live in one static stylesheet whose URL carries a content hash; the
+app serves it with long-lived cache headers, so report files only contain
+their dynamic content.
+"""
+
+import hashlib
+import os
+from typing import Any, Dict
+
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+TEMPLATES_DIR = os.path.join(BASE_DIR, "templates")
+STYLESHEET_PATH = os.path.join(BASE_DIR, "static", "css", "report.css")
+
+
+def _stylesheet_version(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()[:12]
+
+
+_env = Environment(
+    loader=FileSystemLoader(TEMPLATES_DIR),
+    autoescape=select_autoescape(["html"]),
+    auto_reload=False,
+)
+REPORT_TEMPLATE = _env.get_template("report.html")
+STYLESHEET_URL = f"/static/css/report.css?v={_stylesheet_version(STYLESHEET_PATH)}"
+
+
+def render_report(context: Dict[str, Any], inline_css: bool = False) -> str:
+    """
+    Render the report template.
+
+    Args:
+        context (dict): Template variables (see templates/report.html)
+        inline_css (bool): Embed the stylesheet instead of linking it, for
+            standalone files opened outside the app
+
+    Returns:
+        str: The rendered HTML
+    """
+    css = None
+    if inline_css:
+        with open(STYLESHEET_PATH, "r", encoding="utf-8") as f:
+            css = f.read()
+    return REPORT_TEMPLATE.render(stylesheet_url=STYLESHEET_URL, inline_css=css, **context)
@@ -0,0 +1,134 @@
+"""
+Embedded store for report payloads.
+
+Instead of rendering and writing an HTML file per request, /predict stores the
+compact report payload (prediction, summary, content lists, image URL) here,
+keyed by report ID. The static viewer page fetches it as JSON and renders it
+in the browser; HTML is only materialized on demand for old clients.
+"""
+
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+import serialization
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS reports (
+    report_id TEXT PRIMARY KEY,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    revision INTEGER NOT NULL DEFAULT 1,
+    image_filename TEXT,
+    payload TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS reports_created_at ON reports (created_at);
+CREATE INDEX IF NOT EXISTS reports_image_filename ON reports (image_filename);
+"""
+
+
+class ReportStore:
+    def __init__(self, db_path: str):
+        self.db_path = str(db_path)
+        self._local = threading.local()
+        self._connect().executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        # sqlite3 connections are not shared across threads; keep one per thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def put(self, report_id: str, payload: Dict[str, Any], image_filename: Optional[str] = None) -> None:
+        """Insert a new report."""
+        now = time.time()
+        self._connect().execute(
+            "INSERT INTO reports (report_id, created_at, updated_at, revision, image_filename, payload) "
+            "VALUES (?, ?, ?, 1, ?, ?)",
+            (report_id, now, now, image_filename, serialization.dumps_str(payload)),
+        )
+
+    def update(self, report_id: str, changes: Dict[str, Any]) -> Optional[int]:
+        """
+        Merge `changes` into a stored payload and bump its revision, atomically.
+
+        Returns:
+            int or None: The new revision, or None if the report no longer exists
+        """
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT payload, revision FROM reports WHERE report_id = ?", (report_id,)).fetchone()
+            if row is None:
+                conn.execute("ROLLBACK")
+                return None
+            payload = {**serialization.loads(row[0]), **changes}
+            conn.execute(
+                "UPDATE reports SET payload = ?, updated_at = ?, revision = ? WHERE report_id = ?",
+                (serialization.dumps_str(payload), time.time(), row[1] + 1, report_id),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return row[1] + 1
+
+    def get(self, report_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Fetch a report.
+
+        Returns:
+            dict or None: {"payload", "revision", "created_at", "updated_at"}
+        """
+        row = self._connect().execute(
+            "SELECT payload, revision, created_at, updated_at FROM reports WHERE report_id = ?",
+            (report_id,),
+        ).fetchone()
+        if row is None:
+            return None
+        return {"payload": serialization.loads(row[0]), "revision": row[1], "created_at": row[2], "updated_at": row[3]}
+
+    def prediction_for_image(self, image_filename: str) -> Optional[Dict[str, Any]]:
+        """Prediction of the most recent report for a cropped image, if still stored."""
+        row = self._connect().execute(
+            "SELECT payload FROM reports WHERE image_filename = ? ORDER BY created_at DESC LIMIT 1",
+            (image_filename,),
+        ).fetchone()
+        return serialization.loads(row[0]).get("prediction") if row is not None else None
+
+    def count_older_than(self, cutoff: float) -> int:
+        return self._connect().execute("SELECT COUNT(*) FROM reports WHERE created_at < ?", (cutoff,)).fetchone()[0]
+
+    def delete_older_than(self, cutoff: float) -> int:
+        """Remove reports created before `cutoff` (epoch seconds). Returns the number removed."""
+        return self._connect().execute("DELETE FROM reports WHERE created_at < ?", (cutoff,)).rowcount
+
+
+class RenderCache:
+    """Small LRU of rendered reports, keyed by (report_id, revision)."""
+
+    def __init__(self, max_entries: int = 64):
+        self.max_entries = max_entries
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_render(self, report_id: str, revision: int, render: Callable[[], str]) -> str:
+        key = (report_id, revision)
+        with self._lock:
+            html = self._items.get(key)
+            if html is not None:
+                self._items.move_to_end(key)
+                return html
+        html = render()
+        with self._lock:
+            self._items[key] = html
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+        return html
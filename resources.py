@@ -0,0 +1,184 @@
+"""
+Read-only JSON resources, loaded once and reloaded only when the file changes.
+
+attribute_mapping.json used to be opened and parsed on every /predict. Each
+resource here is parsed once into a frozen structure and shared by all
+requests; a request only compares the file's mtime (at most every
+`check_interval` seconds) and the file is re-parsed when it changed. A reload
+that fails to parse or validate keeps the previous version.
+
+- attribute_mapping.json: {attribute: {"0": text, "1": text}}
+- attributes.json: a reference model output; its keys are the model's attributes
+- thresholds files: {"thresholds": {attribute: th}} or {attribute: th}
+
+validate() checks them against the model's attribute list at startup.
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Generic, List, Optional, Sequence, Tuple, TypeVar
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ATTRIBUTE_MAPPING_PATH = os.path.join(BASE_DIR, "attribute_mapping.json")
+ATTRIBUTES_PATH = os.path.join(BASE_DIR, "attributes.json")
+
+T = TypeVar("T")
+
+
+class FrozenDict(dict):
+    """dict that refuses mutation; still a dict, so json.dumps and lookups work unchanged."""
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("resource data is read-only")
+
+    __setitem__ = __delitem__ = __ior__ = clear = pop = popitem = setdefault = update = _readonly
+
+
+def freeze(value: Any) -> Any:
+    """Deep-freeze parsed JSON: dicts -> FrozenDict, lists -> tuples."""
+    if isinstance(value, dict):
+        return FrozenDict((k, freeze(v)) for k, v in value.items())
+    if isinstance(value, list):
+        return tuple(freeze(v) for v in value)
+    return value
+
+
+class FileResource(Generic[T]):
+    """A JSON file parsed by `build`, cached until its mtime changes."""
+
+    def __init__(self, path: str, build: Callable[[Any], T], check_interval: float = 2.0):
+        self.path = str(path)
+        self.check_interval = check_interval
+        self._build = build
+        self._lock = threading.Lock()
+        self._value: Optional[T] = None
+        self._mtime: Optional[float] = None
+        self._checked_at = 0.0
+
+    def _load(self, mtime: float) -> None:
+        with open(self.path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        self._value = self._build(data)
+        self._mtime = mtime
+        print(f"✅ Loaded {os.path.basename(self.path)}")
+
+    def get(self) -> T:
+        """
+        The current value.
+
+        Raises:
+            FileNotFoundError, ValueError: If the file has never loaded successfully
+        """
+        now = time.monotonic()
+        if self._value is not None and now - self._checked_at < self.check_interval:
+            return self._value
+        with self._lock:
+            self._checked_at = now
+            try:
+                mtime = os.path.getmtime(self.path)
+            except OSError:
+                if self._value is None:
+                    raise FileNotFoundError(f"JSON file not found: {self.path}")
+                return self._value
+            if mtime != self._mtime:
+                try:
+                    self._load(mtime)
+                except Exception as e:
+                    if self._value is None:
+                        raise ValueError(f"Error loading JSON file {self.path}: {str(e)}")
+                    # Keep serving the last good version; retry after the next change
+                    self._mtime = mtime
+                    print(f"⚠️ Reload of {self.path} failed, keeping previous version: {str(e)}")
+            return self._value
+
+
+def _build_mapping(data: Any) -> FrozenDict:
+    if not isinstance(data, dict):
+        raise ValueError("attribute mapping must be an object")
+    for attr, texts in data.items():
+        if not isinstance(texts, dict) or not all(isinstance(texts.get(k), str) for k in ("0", "1")):
+            raise ValueError(f"attribute mapping entry '{attr}' needs \"0\" and \"1\" texts")
+    return freeze(data)
+
+
+def _build_attributes(data: Any) -> Tuple[str, ...]:
+    if not isinstance(data, dict) or not data:
+        raise ValueError("attributes.json must be a non-empty object")
+    return tuple(data)
+
+
+def _build_thresholds(data: Any) -> FrozenDict:
+    by_name = data.get("thresholds", data) if isinstance(data, dict) else None
+    if not isinstance(by_name, dict):
+        raise ValueError("thresholds must be an object of attribute -> threshold")
+    try:
+        return FrozenDict((attr, float(th)) for attr, th in by_name.items())
+    except (TypeError, ValueError):
+        raise ValueError("thresholds must be numbers")
+
+
+attribute_mapping_resource = FileResource(ATTRIBUTE_MAPPING_PATH, _build_mapping)
+attributes_resource = FileResource(ATTRIBUTES_PATH, _build_attributes)
+_thresholds: Dict[str, FileResource] = {}
+_thresholds_lock = threading.Lock()
+
+
+def attribute_mapping() -> FrozenDict:
+    """attribute_mapping.json as {attribute: {"0": text, "1": text}} (read-only)."""
+    return attribute_mapping_resource.get()
+
+
+def model_attributes() -> Tuple[str, ...]:
+    """Attribute names of the reference model output (attributes.json), in model order."""
+    return attributes_resource.get()
+
+
+def thresholds(path: str) -> FrozenDict:
+    """Thresholds file as {attribute: threshold} (read-only)."""
+    path = os.path.abspath(path)
+    with _thresholds_lock:
+        resource = _thresholds.get(path)
+        if resource is None:
+            # Only read when a model version loads, so always check the mtime
+            resource = _thresholds[path] = FileResource(path, _build_thresholds, check_interval=0)
+    return resource.get()
+
+
+def validate(attributes: Optional[Sequence[str]] = None, threshold_paths: Sequence[str] = ()) -> List[str]:
+    """
+    Load every resource and check it against the model's attribute list.
+
+    Args:
+        attributes (list, optional): The serving model's attributes; defaults to attributes.json
+        threshold_paths (list): Thresholds files in use
+
+    Returns:
+        list: Warnings (coverage gaps); structural errors raise instead
+
+    Raises:
+        FileNotFoundError, ValueError: If a resource is missing or malformed
+    """
+    reference = model_attributes()
+    attributes = tuple(attributes) if attributes else reference
+    known = set(attributes)
+    warnings = []
+
+    if set(reference) != known:
+        warnings.append("attributes.json differs from the model's attributes: "
+                        + ", ".join(sorted(set(reference) ^ known)))
+
+    mapping = attribute_mapping()
+    missing = [attr for attr in attributes if attr not in mapping]
+    if missing:
+        warnings.append("attribute_mapping.json has no description for: " + ", ".join(missing))
+    extra = [attr for attr in mapping if attr not in known]
+    if extra:
+        warnings.append("attribute_mapping.json describes attributes the model does not output: " + ", ".join(extra))
+
+    for path in threshold_paths:
+        unknown = [attr for attr in thresholds(path) if attr not in known]
+        if unknown:
+            warnings.append(f"{os.path.basename(path)} has thresholds for unknown attributes: " + ", ".join(unknown))
+    return warnings
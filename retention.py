@@ -0,0 +1,289 @@
+"""
+Retention and compaction for the directories /predict writes into.
+
+Every request leaves a crop in static/user_images. With KEEP_FULL_RESOLUTION
+it also leaves the full-resolution copy in data/pending_crops, and in legacy
+HTML mode a report in static/reports. This module fans new files out into
+hash-prefixed shard directories so no single directory grows huge, and runs a
+background service that evicts files past a per-directory TTL, then the oldest
+files until the directory fits its size quota. Images recorded through
+/consent are never evicted.
+
+Usage:
+    python retention.py --dry-run     # show what would be evicted
+    python retention.py               # evict now
+"""
+
+import argparse
+import hashlib
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional
+
+import metrics
+from crop_encoding import full_resolution_name
+
+SHARD_CHARS = 2
+
+_evicted_files = metrics.counter("retention_evicted_files_total", "Files removed by retention", ["directory", "reason"])
+_evicted_bytes = metrics.counter("retention_evicted_bytes_total", "Bytes removed by retention", ["directory"])
+_directory_bytes = metrics.gauge("retention_directory_bytes", "Bytes stored per managed directory", ["directory"])
+
+
+def shard_name(filename: str) -> str:
+    """Hash-prefix shard for a filename (e.g. "3f")."""
+    return hashlib.sha1(filename.encode("utf-8")).hexdigest()[:SHARD_CHARS]
+
+
+def shard_path(base_dir: Path, filename: str) -> Path:
+    """Path for a new file inside its shard directory, creating the shard if needed."""
+    directory = Path(base_dir) / shard_name(filename)
+    directory.mkdir(parents=True, exist_ok=True)
+    return directory / filename
+
+
+def resolve_path(base_dir: Path, filename: str) -> Optional[Path]:
+    """Locate an existing file, sharded or (for files written before sharding) flat."""
+    for candidate in (Path(base_dir) / shard_name(filename) / filename, Path(base_dir) / filename):
+        if candidate.is_file():
+            return candidate
+    return None
+
+
+def relative_url_path(base_dir: Path, path: Path) -> str:
+    """URL path of a stored file relative to its managed directory."""
+    return Path(path).relative_to(base_dir).as_posix()
+
+
+class RetentionPolicy(NamedTuple):
+    name: str
+    directory: Path
+    ttl_seconds: Optional[float]  # None = no age limit
+    max_bytes: Optional[int]      # None = no size quota
+
+
+class Candidate(NamedTuple):
+    path: Path
+    size: int
+    age_seconds: float
+    reason: str
+
+
+def _scan(directory: Path) -> Iterable[os.DirEntry]:
+    """Files directly in `directory` and one level of shard subdirectories."""
+    try:
+        entries = list(os.scandir(directory))
+    except FileNotFoundError:
+        return
+    for entry in entries:
+        if entry.is_file(follow_symlinks=False):
+            yield entry
+        elif entry.is_dir(follow_symlinks=False):
+            try:
+                for sub in os.scandir(entry.path):
+                    if sub.is_file(follow_symlinks=False):
+                        yield sub
+            except FileNotFoundError:
+                continue
+
+
+def plan(policies: List[RetentionPolicy], is_protected: Callable[[str, Path], bool],
+         now: Optional[float] = None) -> Dict[str, Dict]:
+    """
+    Work out what a retention pass would evict, without touching anything.
+
+    Args:
+        policies (list): One policy per managed directory
+        is_protected (callable): (policy name, path) -> True if the file must be kept
+        now (float, optional): Reference time, defaults to time.time()
+
+    Returns:
+        dict: Per policy name: file/byte totals before and after, and the candidates
+    """
+    now = time.time() if now is None else now
+    report = {}
+    for policy in policies:
+        files = []
+        file_count = 0
+        protected_bytes = 0
+        total_bytes = 0
+        for entry in _scan(policy.directory):
+            stat = entry.stat(follow_symlinks=False)
+            file_count += 1
+            total_bytes += stat.st_size
+            path = Path(entry.path)
+            if is_protected(policy.name, path):
+                protected_bytes += stat.st_size
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+
+        files.sort()  # oldest first
+        candidates = []
+        remaining = []
+        for mtime, size, path in files:
+            age = now - mtime
+            if policy.ttl_seconds is not None and age > policy.ttl_seconds:
+                candidates.append(Candidate(path, size, age, "ttl"))
+            else:
+                remaining.append((mtime, size, path))
+
+        kept_bytes = protected_bytes + sum(size for _, size, _ in remaining)
+        if policy.max_bytes is not None:
+            for mtime, size, path in remaining:
+                if kept_bytes <= policy.max_bytes:
+                    break
+                candidates.append(Candidate(path, size, now - mtime, "quota"))
+                kept_bytes -= size
+
+        report[policy.name] = {
+            "directory": str(policy.directory),
+            "files": file_count,
+            "bytes": total_bytes,
+            "bytes_after": kept_bytes,
+            "protected_bytes": protected_bytes,
+            "candidates": candidates,
+        }
+    return report
+
+
+def apply(report: Dict[str, Dict]) -> int:
+    """Delete the candidates of a plan. Returns the number of files removed."""
+    removed = 0
+    for name, section in report.items():
+        shard_dirs = set()
+        for candidate in section["candidates"]:
+            try:
+                candidate.path.unlink()
+            except FileNotFoundError:
+                continue
+            removed += 1
+            _evicted_files.inc(directory=name, reason=candidate.reason)
+            _evicted_bytes.inc(candidate.size, directory=name)
+            if candidate.path.parent != Path(section["directory"]):
+                shard_dirs.add(candidate.path.parent)
+        for shard in shard_dirs:
+            try:
+                shard.rmdir()  # only succeeds once the shard is empty
+            except OSError:
+                pass
+        _directory_bytes.set(section["bytes_after"], directory=name)
+    return removed
+
+
+class RetentionService(threading.Thread):
+    """Daemon thread that runs a retention pass every `interval` seconds."""
+
+    def __init__(self, policies: List[RetentionPolicy], is_protected: Callable[[str, Path], bool],
+                 interval: float, on_pass: Optional[Callable[[float], None]] = None):
+        super().__init__(name="retention", daemon=True)
+        self.policies = policies
+        self.is_protected = is_protected
+        self.interval = interval
+        self.on_pass = on_pass
+        self._stop_event = threading.Event()
+
+    def run_once(self) -> int:
+        now = time.time()
+        removed = apply(plan(self.policies, self.is_protected, now))
+        if self.on_pass is not None:
+            self.on_pass(now)
+        return removed
+
+    def run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            try:
+                removed = self.run_once()
+                if removed:
+                    print(f"🧹 Retention removed {removed} files")
+            except Exception as e:
+                print(f"⚠️ Retention pass failed: {str(e)}")
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+
+def default_policies() -> List[RetentionPolicy]:
+    """Policies for the app's directories, from production settings."""
+    from production import (
+        USER_IMAGES_DIR, ACCEPTED_DIR, REPORTS_DIR, PENDING_CROPS_DIR,
+        USER_IMAGES_TTL_SECONDS, USER_IMAGES_MAX_BYTES, REPORTS_TTL_SECONDS, REPORTS_MAX_BYTES,
+        PENDING_CROPS_TTL_SECONDS, PENDING_CROPS_MAX_BYTES,
+    )
+    return [
+        RetentionPolicy("user_images", USER_IMAGES_DIR, USER_IMAGES_TTL_SECONDS, USER_IMAGES_MAX_BYTES),
+        RetentionPolicy("reports", REPORTS_DIR, REPORTS_TTL_SECONDS, REPORTS_MAX_BYTES),
+        # Full-resolution crops are moved to accepted on consent; the rest expire here
+        RetentionPolicy("pending_crops", PENDING_CROPS_DIR, PENDING_CROPS_TTL_SECONDS, PENDING_CROPS_MAX_BYTES),
+        # Consented images are kept indefinitely; listed so they show up in reports
+        RetentionPolicy("accepted", ACCEPTED_DIR, None, None),
+    ]
+
+
+def consent_protection(accepted_dir: Path, is_consented: Optional[Callable[[str], bool]] = None) -> Callable[[str, Path], bool]:
+    """
+    Protects user images that were accepted through /consent.
+
+    Args:
+        accepted_dir (Path): Directory holding accepted copies
+        is_consented (callable, optional): Consent index lookup by filename; files
+            accepted before the index existed are found in `accepted_dir` instead
+    """
+    def is_protected(policy_name: str, path: Path) -> bool:
+        if policy_name == "accepted":
+            return True
+        if policy_name == "user_images":
+            # Consent accepts the crop's full-resolution copy when one was kept
+            if is_consented is not None and (is_consented(path.name) or is_consented(full_resolution_name(path.name))):
+                return True
+            return resolve_path(accepted_dir, path.name) is not None
+        return False
+    return is_protected
+
+
+def _format_bytes(n: float) -> str:
+    return f"{n / (1024 * 1024):.1f} MB"
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Retention for user images and reports")
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would be evicted")
+    parser.add_argument("--verbose", action="store_true", help="List every candidate file")
+    args = parser.parse_args()
+
+    from production import ACCEPTED_DIR, REPORT_DB_PATH, REPORTS_TTL_SECONDS, CONSENT_DB_PATH
+    from report_store import ReportStore
+    from consent_store import ConsentIndex
+
+    consents = ConsentIndex(CONSENT_DB_PATH, ACCEPTED_DIR)
+    report = plan(default_policies(), consent_protection(ACCEPTED_DIR, consents.is_consented))
+    store = ReportStore(REPORT_DB_PATH)
+    cutoff = time.time() - REPORTS_TTL_SECONDS if REPORTS_TTL_SECONDS is not None else None
+
+    for name, section in report.items():
+        candidates = section["candidates"]
+        freed = sum(c.size for c in candidates)
+        print(f"{name}: {section['files']} files, {_format_bytes(section['bytes'])} "
+              f"-> evict {len(candidates)} ({_format_bytes(freed)}), "
+              f"{_format_bytes(section['protected_bytes'])} protected")
+        if args.verbose:
+            for c in candidates:
+                print(f"   {c.reason:<5} {c.age_seconds / 3600:8.1f}h {c.size:>10,} B  {c.path}")
+
+    if cutoff is not None:
+        print(f"stored reports: evict {store.count_older_than(cutoff)}")
+
+    if args.dry_run:
+        print("\nDry run: nothing was deleted.")
+        return 0
+
+    removed = apply(report)
+    purged = store.delete_older_than(cutoff) if cutoff is not None else 0
+    print(f"\n✅ Removed {removed} files and {purged} stored reports")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,267 @@
+"""
+Table-driven text rules for the local (non-LLM) generators.
+
+The attribute -> text rules used by Gemini's local fallbacks and by
+attribute_interpreter_v2 live in rules.json, next to attribute_mapping.json.
+Each section is an ordered list of rules:
+
+    {"if": "oily_skin", "text": "..."}              predicted true
+    {"if_not": "clear_skin", "text": ["...", ...]}  present and predicted false
+    {"if": ["male", "has_beard"], "text": "..."}    all of them
+    {"text": "..."}                                 always
+
+with optional "limit" (keep the first N texts), "default" (used when nothing
+matched) and "first_match" (stop at the first matching rule).
+
+At load time every attribute a rule mentions gets a bit, and each rule becomes
+a (required-true mask, required-false mask, texts) triple. A prediction is
+turned into two bitmasks once; every section is then a pass of integer tests.
+Each generator's output is memoized per bitmask pair, since predictions fall
+into a limited set of combinations.
+
+Usage:
+    python rule_engine.py --predictions example_predictions.json
+"""
+
+import argparse
+import json
+import os
+import sys
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from prediction import AttributeIndex, Prediction, PredictionData
+
+RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "rules.json")
+
+CONTENT_SECTIONS = (
+    "skincare_list", "grooming_list", "positive_features_list", "features_to_improve_list", "other_observations_list",
+)
+
+
+def join_phrases(phrases: Sequence[str]) -> str:
+    """"a", "a and b", "a, b and c"."""
+    if len(phrases) <= 1:
+        return "".join(phrases)
+    return ", ".join(phrases[:-1]) + " and " + phrases[-1]
+
+
+def _names(value) -> List[str]:
+    if value is None:
+        return []
+    return [value] if isinstance(value, str) else list(value)
+
+
+class RuleEngine:
+    def __init__(self, rules: Dict[str, Any]):
+        """
+        Args:
+            rules (dict): Parsed rules.json
+
+        Raises:
+            ValueError: If a section or rule is malformed
+        """
+        self.templates = dict(rules.get("templates", {}))
+        self.bits: Dict[str, int] = {}
+        self.sections: Dict[str, Tuple] = {}
+        for name, section in rules.get("sections", {}).items():
+            compiled = []
+            for rule in section.get("rules", []):
+                if "text" not in rule:
+                    raise ValueError(f"Rule without text in section '{name}'")
+                unknown = set(rule) - {"if", "if_not", "text"}
+                if unknown:
+                    raise ValueError(f"Unknown rule keys {sorted(unknown)} in section '{name}'")
+                texts = tuple(_names(rule["text"]))
+                compiled.append((self._mask(_names(rule.get("if"))), self._mask(_names(rule.get("if_not"))), texts))
+            self.sections[name] = (
+                tuple(compiled),
+                section.get("limit"),
+                tuple(section.get("default", ())),
+                bool(section.get("first_match")),
+            )
+        self._render = lru_cache(maxsize=4096)(self._build)
+        # AttributeIndex -> ((prediction bit, rule bit), ...) for the attributes both know
+        self._remaps: Dict[AttributeIndex, Tuple[Tuple[int, int], ...]] = {}
+
+    @classmethod
+    def from_file(cls, path: str = RULES_PATH) -> "RuleEngine":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def _mask(self, names: List[str]) -> int:
+        mask = 0
+        for name in names:
+            if name not in self.bits:
+                self.bits[name] = 1 << len(self.bits)
+            mask |= self.bits[name]
+        return mask
+
+    def masks(self, prediction: PredictionData) -> Tuple[int, int]:
+        """(predicted-true bitmask, present-and-false bitmask) over the attributes the rules use."""
+        true_mask = false_mask = 0
+        if isinstance(prediction, Prediction):
+            # Every attribute of a Prediction is present: translate its bitmask
+            remap = self._remaps.get(prediction.index)
+            if remap is None:
+                remap = self._remaps[prediction.index] = tuple(
+                    (prediction.index.bit(name), bit) for name, bit in self.bits.items() if name in prediction.index.positions
+                )
+            predicted = prediction.mask
+            for source, bit in remap:
+                if predicted & source:
+                    true_mask |= bit
+                else:
+                    false_mask |= bit
+            return true_mask, false_mask
+        for name, bit in self.bits.items():
+            value = prediction.get(name)
+            if isinstance(value, dict):
+                value = value.get("predicted")
+            # 1/True = predicted, 0/False = present but not predicted
+            if value is None:
+                continue
+            if value == 1:
+                true_mask |= bit
+            elif value == 0:
+                false_mask |= bit
+        return true_mask, false_mask
+
+    def texts(self, section: str, masks: Tuple[int, int]) -> Tuple[str, ...]:
+        """Texts of every matching rule in `section`, in rule order."""
+        true_mask, false_mask = masks
+        rules, limit, default, first_match = self.sections[section]
+        out = []
+        for need_true, need_false, texts in rules:
+            if need_true & true_mask == need_true and need_false & false_mask == need_false:
+                out.extend(texts)
+                if first_match:
+                    break
+        if limit is not None:
+            out = out[:limit]
+        return tuple(out) or default
+
+    def _build(self, generator: str, true_mask: int, false_mask: int):
+        return _GENERATORS[generator](self, (true_mask, false_mask))
+
+    def render(self, generator: str, prediction: PredictionData):
+        """Output of a generator for a prediction, memoized per bitmask pair (treat as read-only)."""
+        return self._render(generator, *self.masks(prediction))
+
+    def clear_cache(self) -> None:
+        self._render.cache_clear()
+
+
+_default_engine: Optional[RuleEngine] = None
+
+
+def default_engine() -> RuleEngine:
+    """The engine for rules.json, compiled on first use."""
+    global _default_engine
+    if _default_engine is None:
+        _default_engine = RuleEngine.from_file()
+    return _default_engine
+
+
+# ============================================================
+# GENERATORS
+# ============================================================
+
+def _summary(engine: RuleEngine, masks: Tuple[int, int]) -> str:
+    traits = engine.texts("summary_traits", masks)
+    if traits:
+        core = engine.templates["summary"].format(traits=join_phrases(traits))
+    else:
+        core = engine.templates["summary_empty"]
+    return (core + " " + " ".join(engine.texts("summary_extras", masks))).strip()
+
+
+def _content(engine: RuleEngine, masks: Tuple[int, int]) -> Tuple[Tuple[str, Tuple[str, ...]], ...]:
+    return tuple((name, engine.texts(name, masks)) for name in CONTENT_SECTIONS)
+
+
+def _natural_summary(engine: RuleEngine, masks: Tuple[int, int]) -> str:
+    parts = []
+
+    features = engine.texts("facial_features", masks)
+    if features:
+        parts.append("Facial Analysis:")
+        parts.append(engine.templates["facial_features"].format(features=join_phrases(features)))
+
+    conditions = engine.texts("skin_conditions", masks)
+    if conditions:
+        parts.append("\nSkin Analysis:")
+        parts.append(engine.templates["skin_conditions"].format(conditions=", ".join(conditions)))
+        skincare_tips = engine.texts("skincare_recommendations", masks)
+        if skincare_tips:
+            parts.append("\nSkincare Recommendations:")
+            parts.extend(f"• {tip}" for tip in skincare_tips)
+
+    grooming_tips = engine.texts("grooming_recommendations", masks)
+    if grooming_tips:
+        parts.append("\nGrooming Recommendations:")
+        parts.extend(f"• {tip}" for tip in grooming_tips)
+
+    additional_tips = engine.texts("additional_tips", masks)
+    if additional_tips:
+        parts.append("\nAdditional Tips:")
+        parts.extend(f"• {tip}" for tip in additional_tips)
+
+    parts.extend(engine.texts("maintenance", masks))
+    return "\n".join(parts)
+
+
+_GENERATORS = {
+    "summary": _summary,
+    "content": _content,
+    "natural_summary": _natural_summary,
+    "skincare": lambda engine, masks: engine.texts("skincare_recommendations", masks),
+    "grooming": lambda engine, masks: engine.texts("grooming_recommendations", masks),
+}
+
+
+def local_summary(prediction: PredictionData, engine: Optional[RuleEngine] = None) -> str:
+    """Short summary used when Gemini is unavailable."""
+    return (engine or default_engine()).render("summary", prediction)
+
+
+def local_content(prediction: PredictionData, engine: Optional[RuleEngine] = None) -> Dict[str, Any]:
+    """Report content sections used when Gemini is unavailable."""
+    sections = (engine or default_engine()).render("content", prediction)
+    content: Dict[str, Any] = {name: list(texts) for name, texts in sections}
+    content["attractiveness_comment"] = ""
+    return content
+
+
+def skincare_recommendations(prediction: PredictionData, engine: Optional[RuleEngine] = None) -> List[str]:
+    return list((engine or default_engine()).render("skincare", prediction))
+
+
+def grooming_recommendations(prediction: PredictionData, engine: Optional[RuleEngine] = None) -> List[str]:
+    return list((engine or default_engine()).render("grooming", prediction))
+
+
+def natural_summary(prediction: PredictionData, engine: Optional[RuleEngine] = None) -> str:
+    """attribute_interpreter_v2's sectioned summary with recommendations."""
+    return (engine or default_engine()).render("natural_summary", prediction)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Run the local text rules on a prediction")
+    parser.add_argument("--predictions", required=True, help="Prediction JSON (model_loader format or 0/1 values)")
+    parser.add_argument("--rules", default=RULES_PATH)
+    args = parser.parse_args()
+
+    engine = RuleEngine.from_file(args.rules)
+    with open(args.predictions, "r", encoding="utf-8") as f:
+        prediction = json.load(f)
+    print(json.dumps({
+        "summary": local_summary(prediction, engine),
+        "content": local_content(prediction, engine),
+        "natural_summary": natural_summary(prediction, engine),
+    }, indent=2, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
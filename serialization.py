@@ -0,0 +1,85 @@
+"""
+JSON encoding for API responses and stored artifacts.
+
+Every JSON the service writes (Flask responses, report and consent payloads,
+cached Gemini text, prompts, analysis files) goes through dumps()/loads() here.
+The module has no web dependency; app.py adapts it to Flask (ServiceJSONProvider).
+With orjson installed they use it (several times faster than the standard
+library, UTF-8 bytes out); otherwise the standard library with the same
+output: compact separators, non-ASCII kept as is. configure() switches the
+backend at runtime (JSON_BACKEND).
+
+Values the encoders don't know natively are converted by _default: anything
+with an as_dict() (prediction.Prediction) and NumPy scalars/arrays.
+"""
+
+import json
+from typing import Any, Union
+
+try:
+    import orjson  # type: ignore
+except ImportError:
+    orjson = None
+
+BACKENDS = ("orjson", "json")
+_backend = "orjson" if orjson is not None else "json"
+
+
+def configure(backend: str = "auto") -> str:
+    """
+    Select the encoder.
+
+    Args:
+        backend (str): "orjson", "json" or "auto" (orjson when installed)
+
+    Returns:
+        str: The backend in use
+    """
+    global _backend
+    if backend == "auto":
+        backend = "orjson" if orjson is not None else "json"
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown JSON backend '{backend}' (expected one of {', '.join(BACKENDS)} or auto)")
+    if backend == "orjson" and orjson is None:
+        print("⚠️ orjson is not installed; using the standard json module")
+        backend = "json"
+    _backend = backend
+    return _backend
+
+
+def backend() -> str:
+    return _backend
+
+
+def _default(obj: Any) -> Any:
+    if hasattr(obj, "as_dict"):
+        return obj.as_dict()
+    if hasattr(obj, "tolist"):
+        # NumPy arrays and scalars
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(obj: Any, pretty: bool = False) -> bytes:
+    """UTF-8 JSON; compact unless `pretty` (2-space indent)."""
+    if _backend == "orjson":
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=_default, option=option)
+    return dumps_str(obj, pretty).encode("utf-8")
+
+
+def dumps_str(obj: Any, pretty: bool = False) -> str:
+    """dumps() as text (for SQLite columns, prompts and text files)."""
+    if _backend == "orjson":
+        return dumps(obj, pretty).decode("utf-8")
+    if pretty:
+        return json.dumps(obj, indent=2, ensure_ascii=False, default=_default)
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False, default=_default)
+
+
+def loads(data: Union[str, bytes, bytearray, memoryview]) -> Any:
+    if _backend == "orjson":
+        return orjson.loads(data)
+    return json.loads(data)
@@ -0,0 +1,81 @@
+// Renders a stored report payload (GET /reports/<id>.json) into report_viewer.html.
+// All text goes through textContent, so LLM output is never interpreted as HTML.
+(function () {
+    "use strict";
+
+    var EMPTY_ITEM = "No specific recommendations at this time";
+
+    function fillList(id, items) {
+        var list = document.getElementById(id);
+        list.textContent = "";
+        var cleaned = (items || []).map(function (item) { return String(item).trim(); })
+            .filter(function (item) { return item.length > 0; });
+        if (cleaned.length === 0) {
+            cleaned = [EMPTY_ITEM];
+        }
+        cleaned.forEach(function (text) {
+            var li = document.createElement("li");
+            li.textContent = text;
+            list.appendChild(li);
+        });
+    }
+
+    function render(report) {
+        var content = report.content || {};
+        var attractive = (report.prediction || {}).attractive || {};
+        var showAttractiveness = (attractive.probability || 0) > 0.7;
+
+        document.getElementById("timestamp").textContent = report.generated_at || "";
+        document.getElementById("subject-image").src = report.image_url || "";
+        document.getElementById("summary-text").textContent = report.summary || "";
+        document.getElementById("attractiveness-comment").textContent =
+            showAttractiveness ? (content.attractiveness_comment || "") : "";
+        fillList("skincare-list", content.skincare_list);
+        fillList("grooming-list", content.grooming_list);
+        fillList("good-features-list", content.positive_features_list);
+        fillList("bad-features-list", content.features_to_improve_list);
+        fillList("neutral-features-list", content.other_observations_list);
+
+        document.getElementById("status").hidden = true;
+        document.getElementById("report").hidden = false;
+    }
+
+    function showError(message) {
+        document.getElementById("status").textContent = message;
+    }
+
+    var reportId = new URLSearchParams(window.location.search).get("id");
+    if (!reportId) {
+        showError("No report specified.");
+        return;
+    }
+
+    // Reports stored with local text are rewritten once the Gemini version is ready
+    var UPGRADE_POLL_MS = 3000;
+    var UPGRADE_MAX_POLLS = 20;
+
+    function load(poll) {
+        // "no-cache" revalidates with If-None-Match: unchanged polls are 304s served from the HTTP cache
+        fetch("/reports/" + encodeURIComponent(reportId) + ".json", { cache: "no-cache" })
+            .then(function (response) {
+                if (!response.ok) {
+                    throw new Error(response.status === 404 ? "Report not found." : "Failed to load report.");
+                }
+                return response.json();
+            })
+            .then(function (report) {
+                render(report);
+                if (report.upgrading && poll < UPGRADE_MAX_POLLS) {
+                    setTimeout(function () { load(poll + 1); }, UPGRADE_POLL_MS);
+                }
+            })
+            .catch(function (err) {
+                // A failed re-poll keeps the report already on screen
+                if (poll === 0) {
+                    showError(err.message);
+                }
+            });
+    }
+
+    load(0);
+})();
@@ -1,5 +1,6 @@
-import json
 import os
+import serialization
+from prediction import Prediction
 from attribute_interpreter_v2 import group_attributes, create_natural_summary, get_skincare_recommendations, get_grooming_recommendations
 
 def convert_model_output_to_binary(model_output):
@@ -7,6 +8,8 @@ def convert_model_output_to_binary(model_output):
     Convert model output with probability/predicted format to simple binary format
     for the attribute interpreter.
     """
+    if isinstance(model_output, Prediction):
+        return model_output.binary()
     binary_output = {}
     for attr, data in model_output.items():
         if isinstance(data, dict) and "predicted" in data:
@@ -20,31 +23,32 @@ def generate_summary(model_output):
     Generate a natural language summary from model predictions.
     
     Args:
-        model_output (dict): Model predictions with probability/predicted format
+        model_output (Prediction or dict): Model predictions with probability/predicted format
         
     Returns:
         dict: Contains summary, grouped results, and recommendations
     """
+    raw_predictions = model_output.as_dict() if isinstance(model_output, Prediction) else model_output
     try:
-        # Convert to binary format for the interpreter
-        binary_output = convert_model_output_to_binary(model_output)
+        # The interpreter reads the predicted bitmask directly; no binary copy needed
+        prediction = Prediction.coerce(model_output)
         
         # Group attributes for better organization
-        grouped_results = group_attributes(binary_output)
+        grouped_results = group_attributes(prediction)
         
         # Create natural summary
-        summary = create_natural_summary(grouped_results, binary_output, {})
+        summary = create_natural_summary(grouped_results, prediction, {})
         
         # Extract specific recommendations
-        skincare_tips = get_skincare_recommendations(binary_output)
-        grooming_tips = get_grooming_recommendations(binary_output)
+        skincare_tips = get_skincare_recommendations(prediction)
+        grooming_tips = get_grooming_recommendations(prediction)
         
         return {
             "summary": summary,
             "grouped_attributes": grouped_results,
             "skincare_recommendations": skincare_tips,
             "grooming_recommendations": grooming_tips,
-            "raw_predictions": model_output
+            "raw_predictions": raw_predictions
         }
         
     except Exception as e:
@@ -53,7 +57,7 @@ def generate_summary(model_output):
             "grouped_attributes": {},
             "skincare_recommendations": [],
             "grooming_recommendations": [],
-            "raw_predictions": model_output
+            "raw_predictions": raw_predictions
         }
 
 def save_analysis_to_file(analysis_data, filename="analysis_output.json"):
@@ -70,7 +74,7 @@ def save_analysis_to_file(analysis_data, filename="analysis_output.json"):
     try:
         output_path = os.path.join(os.path.dirname(__file__), filename)
         with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(analysis_data, f, indent=2, ensure_ascii=False)
+            f.write(serialization.dumps_str(analysis_data, pretty=True))
         return output_path
     except Exception as e:
         print(f"Error saving analysis: {str(e)}")
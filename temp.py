@@ -1,6 +1,7 @@
 import cv2
 import os
 import sys
+import threading
 
 def crop_face(image_path, output_path="cropped_face.jpg", expand_ratio=0.3):
     """
@@ -18,37 +19,71 @@ def crop_face(image_path, output_path="cropped_face.jpg", expand_ratio=0.3):
 
     # Load the image
     image = cv2.imread(image_path)
-    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
 
-    # Load OpenCV's Haar cascade
-    face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
+    # Choose the largest detected face (most likely the main subject)
+    cropped_face = face_regions(image, expand_ratio=expand_ratio, max_faces=1)[0]["image"]
+
+    # Save cropped face
+    cv2.imwrite(output_path, cropped_face)
+
+    print(f"✅ Face cropped (with hair/chin) and saved as: {output_path}")
+    return output_path
+
 
-    # Detect faces
-    faces = face_cascade.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=5, minSize=(80, 80))
+def face_regions(image, expand_ratio=0.3, min_size=80, max_faces=None):
+    """
+    Expanded face crops in memory, largest first (nothing is written).
+
+    Args:
+        image (numpy.ndarray): Decoded BGR image.
+        expand_ratio (float): Fraction by which to expand each face bounding box.
+        min_size (int): Ignore faces smaller than this (pixels per side).
+        max_faces (int, optional): Keep at most this many faces.
 
+    Returns:
+        list: One dict per face with "image" (a view into `image`) and "bbox" (x1, y1, x2, y2)
+    """
+    faces = detect_faces(image, min_size=min_size)
     if len(faces) == 0:
         raise ValueError("No face detected in the image.")
 
-    # Choose the largest detected face (most likely the main subject)
-    x, y, w, h = sorted(faces, key=lambda f: f[2]*f[3], reverse=True)[0]
+    regions = []
+    for face in faces[:max_faces]:
+        x1, y1, x2, y2 = expand_box(face, image.shape, expand_ratio)
+        regions.append({"image": image[y1:y2, x1:x2], "bbox": (x1, y1, x2, y2)})
+    return regions
+
+
+def detect_faces(image, min_size=80):
+    """Face boxes (x, y, w, h) in a BGR image, largest first."""
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    faces = _get_face_cascade().detectMultiScale(gray, scaleFactor=1.1, minNeighbors=5, minSize=(min_size, min_size))
+    return sorted((tuple(int(v) for v in f) for f in faces), key=lambda f: f[2]*f[3], reverse=True)
+
 
-    # Expand the bounding box to include hair, chin, and sides
+def expand_box(face, shape, expand_ratio=0.3):
+    """Expand a face box to include hair, chin and sides, clipped to the image."""
+    x, y, w, h = face
     h_expand = int(h * expand_ratio)
     w_expand = int(w * expand_ratio)
 
     x1 = max(x - w_expand, 0)
     y1 = max(y - h_expand, 0)
-    x2 = min(x + w + w_expand, image.shape[1])
-    y2 = min(y + h + h_expand, image.shape[0])
+    x2 = min(x + w + w_expand, shape[1])
+    y2 = min(y + h + h_expand, shape[0])
+    return x1, y1, x2, y2
 
-    # Crop expanded region
-    cropped_face = image[y1:y2, x1:x2]
 
-    # Save cropped face
-    cv2.imwrite(output_path, cropped_face)
+_cascades = threading.local()
 
-    print(f"✅ Face cropped (with hair/chin) and saved as: {output_path}")
-    return output_path
+
+def _get_face_cascade():
+    """Loads OpenCV's Haar cascade once per thread (classifiers are not safe to share)."""
+    cascade = getattr(_cascades, "face", None)
+    if cascade is None:
+        cascade = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
+        _cascades.face = cascade
+    return cascade
 
 
 # Example usage
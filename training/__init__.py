@@ -0,0 +1,6 @@
+"""
+Offline training utilities for the ConvNeXt attribute model.
+
+Mirrors the setup of model/convnext_tiny_celeb.ipynb so data prepared here can
+be fed to the notebook (or to the modules in this package) unchanged.
+"""
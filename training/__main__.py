@@ -0,0 +1,195 @@
+"""
+Headless training and evaluation (the notebook's pipeline as a CLI).
+
+Usage:
+    python -m training train --csv attributes.csv --csv celebrity.csv \\
+        --data-dir "mix images" --data-dir "celebrity images" --workers 4 --threads 8 --amp auto
+    python -m training train ... --cache data/faces_cache            # read from training.dataset_cache
+    python -m training eval --checkpoint model/convnext_tiny_celeb_bundle.pth --csv ... --data-dir ...
+
+Training splits the data 70/15/15 with the notebook's seed, keeps the epoch with
+the best validation mean AUC, tunes per-attribute thresholds on the validation
+split and writes a checkpoint bundle (weights + thresholds + metadata).
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import time
+
+import numpy as np
+import torch
+
+from training.config import (
+    ATTRIBUTES, BACKBONE, FREEZE_EPOCHS, IMG_SIZE, LR_BACKBONE, LR_HEAD, NUM_EPOCHS, SEED, WEIGHT_DECAY,
+)
+from training.engine import (
+    ThroughputReport, add_common_args, autocast_dtype, configure_threads, make_loader, predict, summarize,
+    train_one_epoch,
+)
+
+DEFAULT_BUNDLE_PATH = os.path.join("model", "convnext_tiny_celeb_bundle.pth")
+
+
+def seed_everything(seed: int = SEED) -> None:
+    torch.manual_seed(seed)
+    np.random.seed(seed)
+    random.seed(seed)
+
+
+def train(args) -> int:
+    from training.checkpoint import save_bundle
+    from training.data import make_dataset, make_prepare, read_csvs, split_dataframe, weighted_sampler
+    from training.model import build_model, param_groups, pos_weight_from_labels, set_backbone_frozen
+    from training.thresholds import evaluate_with_thresholds, tune_thresholds
+
+    seed_everything()
+    device = torch.device(args.device or ("cuda" if torch.cuda.is_available() else "cpu"))
+    amp_dtype = autocast_dtype(device, args.amp)
+    print(f"Device: {device} | autocast: {amp_dtype or 'off'}")
+
+    df = read_csvs(args.csv)
+    train_df, val_df, test_df = split_dataframe(df)
+    print(f"Train: {len(train_df)} | Val: {len(val_df)} | Test: {len(test_df)}")
+
+    loader_kwargs = dict(batch_size=args.batch_size, device=device, num_workers=args.workers,
+                         prefetch_factor=args.prefetch_factor, persistent_workers=not args.no_persistent_workers)
+    data = dict(img_dirs=args.data_dir, cache=args.cache, cache_mode=args.cache_mode)
+    train_dataset = make_dataset(train_df, True, **data)
+    # Labels of the samples actually served (a cache skips missing images)
+    sampler, train_labels = weighted_sampler(train_dataset)
+    train_loader = make_loader(train_dataset, sampler=sampler, **loader_kwargs)
+    val_loader = make_loader(make_dataset(val_df, False, **data), **loader_kwargs)
+    test_loader = make_loader(make_dataset(test_df, False, **data), **loader_kwargs)
+    prepare = make_prepare(args.cache, args.cache_mode)
+
+    model = build_model(len(ATTRIBUTES), args.backbone, pretrained=not args.no_pretrained).to(device)
+    pos_weight = pos_weight_from_labels(train_labels).to(device)
+    optimizer = torch.optim.AdamW(param_groups(model, args.lr_head, args.lr_backbone), weight_decay=WEIGHT_DECAY)
+    scheduler = torch.optim.lr_scheduler.CosineAnnealingLR(optimizer, T_max=args.epochs)
+    # Loss scaling is only needed for fp16; bf16 has fp32's exponent range
+    scaler = torch.amp.GradScaler(device.type, enabled=amp_dtype == torch.float16)
+
+    report = ThroughputReport()
+    best_metric = -1.0
+    best_state = None
+    for epoch in range(1, args.epochs + 1):
+        set_backbone_frozen(model, epoch <= args.freeze_epochs)
+        epoch_start = time.perf_counter()
+        train_loss = train_one_epoch(model, train_loader, optimizer, scaler, device, pos_weight, amp_dtype,
+                                     report.phase("train"), prepare)
+        val_probs, val_targets, val_loss = predict(model, val_loader, device, pos_weight, amp_dtype,
+                                                   report.phase("val"), prepare)
+        scheduler.step()
+        val_metrics = summarize(val_probs, val_targets)
+        print(f"Epoch {epoch}/{args.epochs} | Train loss: {train_loss:.4f} | Val loss: {val_loss:.4f} | "
+              f"Mean val Acc: {val_metrics['mean_acc']:.4f} | Mean val Auc: {val_metrics['mean_auc']:.4f} | "
+              f"{time.perf_counter() - epoch_start:.0f}s")
+
+        if not math.isnan(val_metrics["mean_auc"]) and val_metrics["mean_auc"] > best_metric:
+            best_metric = val_metrics["mean_auc"]
+            best_state = {name: t.detach().cpu().clone() for name, t in model.state_dict().items()}
+            save_bundle(args.out, best_state, attributes=ATTRIBUTES, backbone=args.backbone,
+                        metrics={"val_mean_auc": best_metric})
+            print(f"✅ Saved best model (Mean Auc={best_metric:.4f}) to {args.out}")
+
+    if best_state is not None:
+        model.load_state_dict(best_state)
+    val_probs, val_targets, _ = predict(model, val_loader, device, pos_weight, amp_dtype, report.phase("val"), prepare)
+    thresholds, _ = tune_thresholds(val_probs, val_targets, objective=args.objective)
+    test_probs, test_targets, _ = predict(model, test_loader, device, pos_weight, amp_dtype,
+                                          report.phase("test"), prepare)
+    val_acc, _ = evaluate_with_thresholds(val_probs, val_targets, thresholds)
+    test_acc, test_per_attr = evaluate_with_thresholds(test_probs, test_targets, thresholds)
+    test_metrics = summarize(test_probs, test_targets)
+
+    save_bundle(args.out, model, thresholds, ATTRIBUTES, args.backbone, IMG_SIZE, args.objective, metrics={
+        "val_mean_auc": best_metric, "val_mean_acc": val_acc, "test_mean_acc": test_acc,
+        "test_mean_auc": test_metrics["mean_auc"],
+    })
+
+    print("\nPer-Attribute Accuracies (Test):")
+    for name, acc, th in zip(ATTRIBUTES, test_per_attr, thresholds):
+        print(f"{name:25s}: acc={acc:.4f} (th={th:.2f})")
+    print(f"\nVal Mean Accuracy: {val_acc:.4f} | Test Mean Accuracy: {test_acc:.4f} | "
+          f"Test Mean Auc: {test_metrics['mean_auc']:.4f}")
+    print(f"✅ Saved bundle with tuned thresholds to {args.out}")
+    report.print()
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report.as_dict(), f, indent=2)
+    return 0
+
+
+def evaluate(args) -> int:
+    from training.checkpoint import load_bundle
+    from training.data import make_dataset, make_prepare, read_csvs, split_dataframe
+    from training.model import build_model
+
+    device = torch.device(args.device or ("cuda" if torch.cuda.is_available() else "cpu"))
+    amp_dtype = autocast_dtype(device, args.amp)
+    bundle = load_bundle(args.checkpoint)
+    if bundle["attributes"] != ATTRIBUTES:
+        print("❌ Checkpoint attributes do not match training.config.ATTRIBUTES")
+        return 1
+
+    df = read_csvs(args.csv)
+    frames = dict(zip(("train", "val", "test"), split_dataframe(df)))
+    frame = df if args.split == "all" else frames[args.split]
+
+    model = build_model(len(ATTRIBUTES), bundle["backbone"], pretrained=False)
+    model.load_state_dict(bundle["state_dict"])
+    model.to(device)
+    dataset = make_dataset(frame, False, args.data_dir, args.cache, args.cache_mode)
+    loader = make_loader(dataset, batch_size=args.batch_size, device=device, num_workers=args.workers,
+                         prefetch_factor=args.prefetch_factor, persistent_workers=False)
+
+    report = ThroughputReport()
+    probs, targets, loss = predict(model, loader, device, amp_dtype=amp_dtype, stats=report.phase(args.split),
+                                   prepare=make_prepare(args.cache, args.cache_mode))
+    metrics = summarize(probs, targets, bundle["thresholds"])
+    for name, acc, auc in zip(ATTRIBUTES, metrics["per_attr_acc"], metrics["per_attr_auc"]):
+        print(f"{name:25s}: acc={acc:.4f} auc={auc:.4f}")
+    source = "tuned" if bundle["thresholds"] is not None else "0.5"
+    print(f"\n{args.split}: Mean Acc ({source} thresholds): {metrics['mean_acc']:.4f} | "
+          f"Mean Auc: {metrics['mean_auc']:.4f} | Loss: {loss:.4f}")
+    report.print()
+    return 0
+
+
+def main() -> int:
+    from training.thresholds import OBJECTIVES
+
+    parser = argparse.ArgumentParser(prog="python -m training", description="Train or evaluate the attribute model")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    train_parser = sub.add_parser("train", help="Train and write a checkpoint bundle")
+    add_common_args(train_parser)
+    train_parser.add_argument("--backbone", default=BACKBONE)
+    train_parser.add_argument("--epochs", type=int, default=NUM_EPOCHS)
+    train_parser.add_argument("--freeze-epochs", type=int, default=FREEZE_EPOCHS)
+    train_parser.add_argument("--lr-head", type=float, default=LR_HEAD)
+    train_parser.add_argument("--lr-backbone", type=float, default=LR_BACKBONE)
+    train_parser.add_argument("--no-pretrained", action="store_true")
+    train_parser.add_argument("--no-persistent-workers", action="store_true")
+    train_parser.add_argument("--objective", choices=OBJECTIVES, default="accuracy", help="Threshold tuning objective")
+    train_parser.add_argument("--out", default=DEFAULT_BUNDLE_PATH)
+    train_parser.add_argument("--report", help="Write the throughput report as JSON")
+
+    eval_parser = sub.add_parser("eval", help="Evaluate a checkpoint")
+    add_common_args(eval_parser)
+    eval_parser.add_argument("--checkpoint", required=True)
+    eval_parser.add_argument("--split", choices=("train", "val", "test", "all"), default="test")
+
+    args = parser.parse_args()
+    if not args.cache and not args.data_dir:
+        parser.error("--data-dir is required unless --cache is given")
+    configure_threads(args.threads, args.interop_threads)
+    return train(args) if args.command == "train" else evaluate(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
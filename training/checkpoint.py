@@ -0,0 +1,60 @@
+"""
+Checkpoint bundles: weights plus everything needed to use them.
+
+A bundle is a torch.save()d dict with the state_dict, backbone name, attribute
+order, input size and the per-attribute thresholds tuned on validation data.
+model_weights.load_checkpoint() understands bundles as well as the notebook's
+plain state_dicts, so a bundle can replace model/convnext_tiny_celeb.pth.
+"""
+
+import os
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+import torch
+
+from training.config import ATTRIBUTES, BACKBONE, IMG_SIZE
+
+BUNDLE_FORMAT = 1
+
+
+def save_bundle(path: str, model, thresholds: Optional[Sequence[float]] = None,
+                attributes: List[str] = ATTRIBUTES, backbone: str = BACKBONE, img_size: int = IMG_SIZE,
+                objective: Optional[str] = None, metrics: Optional[Dict[str, float]] = None) -> str:
+    """
+    Write a bundle atomically.
+
+    Args:
+        path (str): Destination .pth file
+        model: Trained module (or a state_dict)
+        thresholds (sequence, optional): Per-attribute thresholds in `attributes` order
+        objective (str, optional): Objective the thresholds were tuned for
+        metrics (dict, optional): Scalar metrics to keep alongside the weights
+
+    Returns:
+        str: The written path
+    """
+    state_dict = model.state_dict() if hasattr(model, "state_dict") else model
+    bundle = {
+        "format": BUNDLE_FORMAT,
+        "state_dict": {name: tensor.detach().cpu() for name, tensor in state_dict.items()},
+        "backbone": backbone,
+        "attributes": list(attributes),
+        "img_size": img_size,
+        "thresholds": [float(th) for th in thresholds] if thresholds is not None else None,
+        "objective": objective,
+        "metrics": {key: float(value) for key, value in (metrics or {}).items()},
+        "created_at": time.time(),
+    }
+    tmp_path = path + ".tmp"
+    torch.save(bundle, tmp_path)
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_bundle(path: str) -> Dict[str, Any]:
+    """Read a bundle (or wrap a plain state_dict in one with default metadata)."""
+    from model_weights import load_checkpoint
+
+    state_dict, info = load_checkpoint(path)
+    return {"state_dict": state_dict, **info}
@@ -0,0 +1,19 @@
+"""Training defaults shared with model/convnext_tiny_celeb.ipynb."""
+
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from model_weights import ATTRIBUTES, BACKBONE  # noqa: E402
+
+FILENAME_COL = "image_id"
+IMG_SIZE = 224
+SEED = 42
+
+# Training hyperparameters (notebook defaults)
+BATCH_SIZE = 16
+NUM_EPOCHS = 20
+LR_HEAD = 1e-4
+LR_BACKBONE = 1e-5
+WEIGHT_DECAY = 1e-4
+FREEZE_EPOCHS = 2
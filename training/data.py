@@ -0,0 +1,145 @@
+"""Datasets and transforms from model/convnext_tiny_celeb.ipynb."""
+
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import torch
+import torchvision.transforms as T
+from PIL import Image
+from torch.utils.data import Dataset, WeightedRandomSampler
+
+from training.config import ATTRIBUTES, FILENAME_COL, IMG_SIZE, SEED
+
+IMAGENET_MEAN = [0.485, 0.456, 0.406]
+IMAGENET_STD = [0.229, 0.224, 0.225]
+
+
+def read_csv(csv_path, attr_cols: List[str] = ATTRIBUTES):
+    df = pd.read_csv(csv_path)
+    missing_cols = [c for c in [FILENAME_COL] + attr_cols if c not in df.columns]
+    if missing_cols:
+        raise ValueError(f"Missing columns in CSV: {missing_cols}")
+    return df
+
+
+def read_csvs(csv_paths, attr_cols: List[str] = ATTRIBUTES):
+    """Concatenate attribute CSVs and map -1/1 labels to 0/1, as the notebook does."""
+    df = pd.concat([read_csv(p, attr_cols) for p in csv_paths], ignore_index=True)
+    for c in attr_cols:
+        if set(df[c].unique()) <= {-1, 1}:
+            df[c] = (df[c] == 1).astype(int)
+    return df
+
+
+class FacesDataset(Dataset):
+    """Opens and decodes each JPEG on every access (the notebook's original path)."""
+
+    def __init__(self, df, img_dirs: List[str], attr_cols: List[str] = ATTRIBUTES, transforms=None):
+        self.df = df.reset_index(drop=True)
+        # Store a list of Path objects for the image directories
+        self.img_dirs = [Path(d) for d in img_dirs]
+        self.attr_cols = attr_cols
+        self.transforms = transforms
+
+    def __len__(self):
+        return len(self.df)
+
+    def targets(self) -> np.ndarray:
+        """float32 labels in position order (see MemmapFacesDataset.targets)."""
+        return self.df[self.attr_cols].to_numpy(dtype=np.float32)
+
+    def find_image(self, img_name: str) -> Path:
+        # Check each directory for the image file
+        for img_dir in self.img_dirs:
+            potential_path = img_dir / img_name
+            if potential_path.exists():
+                return potential_path
+        raise FileNotFoundError(f"Image {img_name} not found in any of the specified directories.")
+
+    def __getitem__(self, idx):
+        row = self.df.iloc[idx]
+        img = Image.open(self.find_image(row[FILENAME_COL])).convert("RGB")
+        if self.transforms:
+            img = self.transforms(img)
+        attrs = torch.tensor(row[self.attr_cols].values.astype(np.float32))
+        return img, attrs
+
+
+def get_transforms(img_size=IMG_SIZE, train=True):
+    if train:
+        return T.Compose([
+            T.RandomResizedCrop(img_size, scale=(0.6, 1.0)),
+            T.RandomHorizontalFlip(p=0.5),
+            T.RandomRotation(12),
+            T.ColorJitter(brightness=0.2, contrast=0.2, saturation=0.2, hue=0.02),
+            T.ToTensor(),
+            T.Normalize(mean=IMAGENET_MEAN, std=IMAGENET_STD),
+            T.RandomErasing(p=0.2, scale=(0.02, 0.25), ratio=(0.3, 3.3), value='random')
+        ])
+    else:
+        return T.Compose([
+            T.Resize(int(img_size * 1.14)),
+            T.CenterCrop(img_size),
+            T.ToTensor(),
+            T.Normalize(mean=IMAGENET_MEAN, std=IMAGENET_STD),
+        ])
+
+
+def split_dataframe(df):
+    """70% train, 15% val, 15% test, identical to the notebook's split."""
+    from sklearn.model_selection import train_test_split
+
+    train_df, temp_df = train_test_split(df, test_size=0.3, random_state=SEED, shuffle=True)
+    val_df, test_df = train_test_split(temp_df, test_size=0.5, random_state=SEED, shuffle=True)
+    return train_df, val_df, test_df
+
+
+def sample_weights(labels: np.ndarray) -> np.ndarray:
+    """Weights for the notebook's WeightedRandomSampler (rare attributes drawn more often)."""
+    pos_freq = labels.sum(axis=0)
+    pos_freq = np.where(pos_freq == 0, 1, pos_freq)
+    inv_freq = len(labels) / (pos_freq * labels.shape[1])
+    weights = labels @ inv_freq
+    return np.where(weights > 0, weights, 0.5)
+
+
+def weighted_sampler(dataset) -> Tuple[WeightedRandomSampler, np.ndarray]:
+    """
+    The notebook's WeightedRandomSampler over the samples `dataset` serves.
+
+    Weights come from dataset.targets(), not the split's frame, so they stay
+    aligned when a cached dataset skips missing images.
+
+    Returns:
+        tuple: (sampler, labels) where labels feed pos_weight_from_labels()
+    """
+    labels = dataset.targets()
+    weights = sample_weights(labels)
+    return WeightedRandomSampler(weights, num_samples=len(weights), replacement=True), labels
+
+
+def make_dataset(frame, train: bool, img_dirs: List[str], cache: Optional[str] = None, cache_mode: str = "pil"):
+    """
+    FacesDataset over JPEGs, or the memory-mapped cache when `cache` is given.
+
+    Args:
+        frame (DataFrame): A split of the DataFrame the cache was built from
+        cache_mode (str): "pil" applies get_transforms(); "array" yields
+            zero-copy crops to be finished by make_prepare()
+    """
+    if not cache:
+        return FacesDataset(frame, img_dirs, ATTRIBUTES, transforms=get_transforms(train=train))
+    from training.dataset_cache import MemmapFacesDataset
+    if cache_mode == "array":
+        return MemmapFacesDataset(cache, rows=frame.index, random_crop=train)
+    return MemmapFacesDataset(cache, rows=frame.index, transforms=get_transforms(train=train))
+
+
+def make_prepare(cache: Optional[str] = None, cache_mode: str = "pil"):
+    """Batch -> model input on the device, matching make_dataset()."""
+    if cache and cache_mode == "array":
+        from training.dataset_cache import to_model_input
+        return to_model_input
+    return lambda imgs, device, train: imgs.to(device, non_blocking=True)
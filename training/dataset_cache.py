@@ -0,0 +1,326 @@
+"""
+One-time preprocessed image cache for training.
+
+FacesDataset opens, decodes and resizes every JPEG on every epoch. This module
+decodes the whole dataset once, resizes each image with its aspect ratio kept
+(short side to CACHE_SIZE, nothing cropped) and writes it into the top-left
+corner of one canvas per row of a single uint8 array of shape
+(N, canvas, canvas, 3) stored as a .npy file, with each image's size and the
+labels in parallel arrays. MemmapFacesDataset then memory-maps that file:
+reading a sample is an array slice backed by the page cache, not a file open +
+JPEG decode.
+
+Because the whole field of view is kept, the training transforms
+(RandomResizedCrop, rotation) see the same image as on the JPEG path, only
+pre-resized. The canvas is CACHE_SIZE * MAX_ASPECT; the rare image more
+elongated than MAX_ASPECT is scaled down to fit it (short side below
+CACHE_SIZE, still whole).
+
+The cache keeps the row order of the DataFrame it was built from, so the
+notebook's train/val/test splits (DataFrames with the positional index of the
+concatenated CSVs) select rows directly.
+
+Usage:
+    python -m training.dataset_cache build --csv attributes.csv --csv celebrity.csv \\
+        --data-dir "mix images" --data-dir "celebrity images" --out data/faces_cache --workers 4
+    python -m training.dataset_cache info data/faces_cache
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+import torch
+from PIL import Image
+from torch.utils.data import Dataset
+
+from training.config import ATTRIBUTES, FILENAME_COL, IMG_SIZE
+
+# Eval transforms resize to int(IMG_SIZE * 1.14) = 255 before cropping, so a
+# 256 short side loses nothing either pipeline uses.
+CACHE_SIZE = 256
+# Longest aspect ratio stored at the full short side (CelebA-style 178x218 is 1.22)
+MAX_ASPECT = 1.25
+
+IMAGES_FILE = "images.npy"
+LABELS_FILE = "labels.npy"
+SIZES_FILE = "sizes.npy"
+IDS_FILE = "image_ids.txt"
+META_FILE = "meta.json"
+
+
+def canvas_side(size: int = CACHE_SIZE) -> int:
+    return round(size * MAX_ASPECT)
+
+
+def load_resized(path: Path, size: int = CACHE_SIZE, canvas: Optional[int] = None) -> np.ndarray:
+    """
+    Decode an image and resize it, aspect ratio kept, to a short side of `size`
+    (less when the long side would exceed `canvas`). Nothing is cropped.
+
+    Returns:
+        ndarray: uint8 HWC image
+    """
+    canvas = canvas or canvas_side(size)
+    with Image.open(path) as img:
+        # draft() lets libjpeg decode at 1/2, 1/4 or 1/8 scale when the source is much larger
+        img.draft("RGB", (size, size))
+        img = img.convert("RGB")
+        width, height = img.size
+        scale = min(size / min(width, height), canvas / max(width, height))
+        new_w, new_h = max(1, min(canvas, round(width * scale))), max(1, min(canvas, round(height * scale)))
+        img = img.resize((new_w, new_h), Image.BILINEAR)
+        return np.asarray(img, dtype=np.uint8)
+
+
+def _find_image(img_dirs: Sequence[Path], img_name: str) -> Optional[Path]:
+    for img_dir in img_dirs:
+        potential_path = img_dir / img_name
+        if potential_path.exists():
+            return potential_path
+    return None
+
+
+def _fill_chunk(images_path: str, start: int, names: List[str], img_dirs: List[str],
+                size: int) -> Tuple[List[int], List[Tuple[int, int]]]:
+    """Worker: decode `names` into rows start.. of the memmap. Returns the rows that failed and each row's (h, w)."""
+    images = np.load(images_path, mmap_mode="r+")
+    canvas = images.shape[1]
+    dirs = [Path(d) for d in img_dirs]
+    failed, sizes = [], []
+    for offset, name in enumerate(names):
+        path = _find_image(dirs, name)
+        try:
+            if path is None:
+                raise FileNotFoundError(name)
+            image = load_resized(path, size, canvas)
+            height, width = image.shape[:2]
+            images[start + offset, :height, :width] = image
+            sizes.append((height, width))
+        except (FileNotFoundError, OSError):
+            failed.append(start + offset)
+            sizes.append((0, 0))
+    images.flush()
+    del images
+    return failed, sizes
+
+
+def build_cache(df, img_dirs: List[str], out_dir, attr_cols: List[str] = ATTRIBUTES,
+                size: int = CACHE_SIZE, workers: int = 0, chunk_size: int = 512) -> dict:
+    """
+    Decode every image of `df` into a memory-mapped array.
+
+    Args:
+        df (DataFrame): Rows with FILENAME_COL and 0/1 attribute columns, in cache order
+        img_dirs (list): Directories searched for each image, in order
+        out_dir: Cache directory
+        attr_cols (list): Attribute columns, in label order
+        size (int): Short side of the cached images (canvas side is size * MAX_ASPECT)
+        workers (int): Decoding processes; 0 decodes in this process
+        chunk_size (int): Images per work item
+
+    Returns:
+        dict: The cache metadata that was written
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    names = [str(n) for n in df[FILENAME_COL].tolist()]
+    n = len(names)
+    start_time = time.perf_counter()
+
+    # Written under a temporary name so an interrupted build is never picked up as a cache
+    partial_path = out_dir / (IMAGES_FILE + ".partial")
+    canvas = canvas_side(size)
+    images = np.lib.format.open_memmap(partial_path, mode="w+", dtype=np.uint8, shape=(n, canvas, canvas, 3))
+    del images
+
+    chunks = [(str(partial_path), i, names[i:i + chunk_size], [str(d) for d in img_dirs], size)
+              for i in range(0, n, chunk_size)]
+    failed, sizes = [], []
+    if workers > 0:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for chunk_failed, chunk_sizes in pool.map(_fill_chunk, *zip(*chunks)):
+                failed.extend(chunk_failed)
+                sizes.extend(chunk_sizes)
+    else:
+        for chunk in chunks:
+            chunk_failed, chunk_sizes = _fill_chunk(*chunk)
+            failed.extend(chunk_failed)
+            sizes.extend(chunk_sizes)
+
+    os.replace(partial_path, out_dir / IMAGES_FILE)
+    np.save(out_dir / SIZES_FILE, np.array(sizes, dtype=np.int32).reshape(n, 2))
+    np.save(out_dir / LABELS_FILE, df[attr_cols].to_numpy(dtype=np.float32))
+    with open(out_dir / IDS_FILE, "w", encoding="utf-8") as f:
+        f.write("\n".join(names) + "\n")
+
+    meta = {
+        "created_at": time.time(),
+        "samples": n,
+        "image_size": size,
+        "canvas_size": canvas,
+        "attributes": list(attr_cols),
+        "missing_rows": sorted(failed),
+    }
+    with open(out_dir / META_FILE, "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+
+    elapsed = time.perf_counter() - start_time
+    print(f"✅ Cached {n - len(failed)} images ({n * canvas * canvas * 3 / 1e9:.2f} GB) in {elapsed:.1f}s "
+          f"({(n / elapsed) if elapsed else 0:.0f} img/s)")
+    if failed:
+        print(f"⚠️ {len(failed)} images could not be read and will be skipped")
+    return meta
+
+
+def load_meta(cache_dir) -> dict:
+    with open(Path(cache_dir) / META_FILE, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def to_model_input(images, device, train: bool = False, mean=None, std=None):
+    """
+    Turn a uint8 NHWC batch from the array mode of MemmapFacesDataset into a
+    normalized float NCHW batch on `device`, flipping half of it when training.
+    """
+    from training.data import IMAGENET_MEAN, IMAGENET_STD
+
+    mean = torch.tensor(mean or IMAGENET_MEAN, device=device).view(1, 3, 1, 1)
+    std = torch.tensor(std or IMAGENET_STD, device=device).view(1, 3, 1, 1)
+    x = images.to(device, non_blocking=True).permute(0, 3, 1, 2).float().div_(255)
+    if train:
+        flip = torch.rand(x.shape[0], device=device) < 0.5
+        x = torch.where(flip.view(-1, 1, 1, 1), x.flip(-1), x)
+    return (x - mean) / std
+
+
+class MemmapFacesDataset(Dataset):
+    """
+    Drop-in replacement for FacesDataset that reads from a build_cache() directory.
+
+    With `transforms` (e.g. get_transforms()) samples are PIL images of the whole
+    original field of view, as FacesDataset produces them but pre-resized to a
+    CACHE_SIZE short side. Without transforms samples are uint8 HWC array views
+    of the memmap cropped to `crop_size` (random crop when `random_crop`, else
+    center crop): no copy is made until the DataLoader collates the batch, and
+    to_model_input() finishes the work on the device. Array mode only augments
+    with random crops and flips.
+
+    Caches built before images kept their aspect ratio (no sizes.npy) hold
+    center-cropped squares; they still load, with that field of view.
+
+    Unlike FacesDataset, which raises FileNotFoundError on a missing image,
+    rows whose image could not be cached (meta "missing_rows") are skipped with
+    a warning: len(dataset) can be smaller than the frame it was built from and
+    positions no longer line up with the frame's rows. Use targets() for labels
+    aligned with the positions the dataset serves.
+    """
+
+    def __init__(self, cache_dir, rows: Optional[Sequence[int]] = None, transforms=None,
+                 crop_size: int = IMG_SIZE, random_crop: bool = False):
+        """
+        Args:
+            cache_dir: Directory written by build_cache()
+            rows: Cache rows to expose, e.g. train_df.index for a split of the
+                DataFrame the cache was built from; defaults to all rows
+            transforms: PIL transforms applied to each image
+            crop_size (int): Crop side in array mode
+            random_crop (bool): Random instead of center crop in array mode
+        """
+        self.cache_dir = Path(cache_dir)
+        meta = load_meta(self.cache_dir)
+        self.image_size = meta["image_size"]
+        sizes_path = self.cache_dir / SIZES_FILE
+        if sizes_path.exists():
+            self.sizes = np.load(sizes_path)
+        else:
+            self.sizes = np.full((meta["samples"], 2), self.image_size, dtype=np.int32)
+        self.attributes = meta["attributes"]
+        missing = set(meta["missing_rows"])
+        rows = [int(r) for r in (range(meta["samples"]) if rows is None else rows)]
+        self.rows = np.array([r for r in rows if r not in missing], dtype=np.int64)
+        if len(self.rows) < len(rows):
+            print(f"⚠️ {len(rows) - len(self.rows)} of {len(rows)} rows have no cached image and are skipped")
+        self.labels = torch.from_numpy(np.load(self.cache_dir / LABELS_FILE))
+        self.transforms = transforms
+        self.crop_size = min(crop_size, self.image_size)
+        self.random_crop = random_crop
+        # Opened lazily so each DataLoader worker maps the file itself instead of
+        # receiving a pickled copy of the array
+        self._images = None
+
+    @property
+    def images(self) -> np.ndarray:
+        if self._images is None:
+            # Copy-on-write mapping: reads share the page cache, and the views are
+            # writable so default_collate can wrap them without warnings
+            self._images = np.load(self.cache_dir / IMAGES_FILE, mmap_mode="c")
+        return self._images
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_images"] = None
+        return state
+
+    def __len__(self):
+        return len(self.rows)
+
+    def targets(self) -> np.ndarray:
+        """float32 labels of the served samples, in position order (missing rows excluded)."""
+        return self.labels.numpy()[self.rows]
+
+    def __getitem__(self, idx):
+        row = self.rows[idx]
+        height, width = self.sizes[row]
+        image = self.images[row, :height, :width]  # view into the memmap, no copy
+        attrs = self.labels[row]
+        if self.transforms:
+            return self.transforms(Image.fromarray(image)), attrs
+        crop = self.crop_size
+        if min(height, width) < crop:
+            # Only images more elongated than MAX_ASPECT; upscaled (a copy) so the batch collates
+            scale = crop / min(height, width)
+            width, height = max(crop, round(width * scale)), max(crop, round(height * scale))
+            image = np.asarray(Image.fromarray(image).resize((width, height), Image.BILINEAR))
+        if self.random_crop:
+            top, left = np.random.randint(0, height - crop + 1), np.random.randint(0, width - crop + 1)
+        else:
+            top, left = (height - crop) // 2, (width - crop) // 2
+        return image[top:top + crop, left:left + crop], attrs
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Build or inspect the preprocessed training image cache")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="Decode all images into the cache")
+    build.add_argument("--csv", action="append", required=True, help="Attribute CSV (repeatable)")
+    build.add_argument("--data-dir", action="append", required=True, help="Image directory (repeatable)")
+    build.add_argument("--out", required=True, help="Cache directory")
+    build.add_argument("--size", type=int, default=CACHE_SIZE)
+    build.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    info = sub.add_parser("info", help="Describe an existing cache")
+    info.add_argument("cache_dir")
+    args = parser.parse_args()
+
+    if args.command == "info":
+        meta = load_meta(args.cache_dir)
+        size = os.path.getsize(Path(args.cache_dir) / IMAGES_FILE)
+        print(f"{meta['samples']} samples at {meta['image_size']}px short side, {len(meta['attributes'])} attributes, "
+              f"{size / 1e9:.2f} GB, {len(meta['missing_rows'])} missing")
+        return 0
+
+    from training.data import read_csvs
+
+    df = read_csvs(args.csv)
+    build_cache(df, args.data_dir, args.out, size=args.size, workers=args.workers)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
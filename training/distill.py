@@ -0,0 +1,206 @@
+"""
+Knowledge distillation of the ConvNeXt attribute model into a smaller student.
+
+The student (MobileNetV3 by default, any timm backbone works) is trained on the
+notebook's transforms and splits against the teacher's soft attribute
+probabilities, mixed with the focal loss on the ground-truth labels. Both models
+get thresholds tuned on the validation split; the report compares per-attribute
+test accuracy next to single-image CPU latency and weight memory.
+
+The result is a checkpoint bundle, so the serving loader picks it up unchanged:
+model_weights.load_model("model/mobilenetv3_celeb_bundle.pth").
+
+Usage:
+    python -m training.distill --csv attributes.csv --data-dir images --epochs 10 \\
+        --student mobilenetv3_large_100 --out model/mobilenetv3_celeb_bundle.pth
+"""
+
+import argparse
+import json
+import math
+import os
+import sys
+import time
+
+import numpy as np
+import torch
+import torch.nn.functional as F
+
+from training.config import ATTRIBUTES, IMG_SIZE, WEIGHT_DECAY
+from training.engine import (
+    ThroughputReport, add_common_args, autocast_dtype, configure_threads, make_loader, predict, summarize,
+    train_one_epoch,
+)
+from training.model import focal_bce_with_logits
+
+DEFAULT_STUDENT = "mobilenetv3_large_100"
+DEFAULT_OUT = os.path.join("model", "mobilenetv3_celeb_bundle.pth")
+
+
+def distillation_loss(student_logits, teacher_logits, labels, temperature: float = 2.0, alpha: float = 0.7,
+                      pos_weight=None):
+    """
+    alpha * soft BCE against the teacher's tempered probabilities
+    + (1 - alpha) * focal BCE against the labels.
+    """
+    soft_targets = torch.sigmoid(teacher_logits / temperature)
+    # T^2 keeps the soft term's gradient scale independent of the temperature
+    soft = F.binary_cross_entropy_with_logits(student_logits / temperature, soft_targets) * temperature ** 2
+    hard = focal_bce_with_logits(student_logits, labels, pos_weight=pos_weight)
+    return alpha * soft + (1 - alpha) * hard
+
+
+def weight_bytes(model) -> int:
+    return sum(t.numel() * t.element_size() for t in list(model.parameters()) + list(model.buffers()))
+
+
+@torch.inference_mode()
+def measure_latency(model, img_size: int = IMG_SIZE, runs: int = 50, warmup: int = 10) -> dict:
+    """Single-image CPU latency in ms (p50/p95), with the current torch thread settings."""
+    model.eval()
+    x = torch.randn(1, 3, img_size, img_size)
+    for _ in range(warmup):
+        model(x)
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        model(x)
+        timings.append((time.perf_counter() - start) * 1000)
+    return {"p50_ms": float(np.percentile(timings, 50)), "p95_ms": float(np.percentile(timings, 95))}
+
+
+def main() -> int:
+    from model_weights import MODEL_PATH, load_model
+    from training.checkpoint import save_bundle
+    from training.data import make_dataset, make_prepare, read_csvs, split_dataframe, weighted_sampler
+    from training.model import build_model, pos_weight_from_labels
+    from training.thresholds import OBJECTIVES, evaluate_with_thresholds, tune_thresholds
+
+    parser = argparse.ArgumentParser(description="Distill the attribute model into a smaller student")
+    add_common_args(parser)
+    parser.add_argument("--teacher", default=MODEL_PATH, help="Teacher checkpoint (.pth, .safetensors or bundle)")
+    parser.add_argument("--student", default=DEFAULT_STUDENT, help="timm backbone of the student")
+    parser.add_argument("--epochs", type=int, default=10)
+    parser.add_argument("--lr", type=float, default=1e-3)
+    parser.add_argument("--temperature", type=float, default=2.0)
+    parser.add_argument("--alpha", type=float, default=0.7, help="Weight of the teacher term")
+    parser.add_argument("--no-pretrained", action="store_true")
+    parser.add_argument("--no-persistent-workers", action="store_true")
+    parser.add_argument("--objective", choices=OBJECTIVES, default="accuracy", help="Threshold tuning objective")
+    parser.add_argument("--latency-threads", type=int, default=1,
+                        help="CPU threads for the latency comparison (free-tier instances have one vCPU)")
+    parser.add_argument("--out", default=DEFAULT_OUT)
+    parser.add_argument("--report", help="Write the comparison as JSON")
+    args = parser.parse_args()
+    if not args.cache and not args.data_dir:
+        parser.error("--data-dir is required unless --cache is given")
+    configure_threads(args.threads, args.interop_threads)
+
+    torch.manual_seed(0)
+    device = torch.device(args.device or ("cuda" if torch.cuda.is_available() else "cpu"))
+    amp_dtype = autocast_dtype(device, args.amp)
+
+    df = read_csvs(args.csv)
+    train_df, val_df, test_df = split_dataframe(df)
+    loader_kwargs = dict(batch_size=args.batch_size, device=device, num_workers=args.workers,
+                         prefetch_factor=args.prefetch_factor, persistent_workers=not args.no_persistent_workers)
+    data = dict(img_dirs=args.data_dir, cache=args.cache, cache_mode=args.cache_mode)
+    train_dataset = make_dataset(train_df, True, **data)
+    sampler, train_labels = weighted_sampler(train_dataset)
+    train_loader = make_loader(train_dataset, sampler=sampler, **loader_kwargs)
+    val_loader = make_loader(make_dataset(val_df, False, **data), **loader_kwargs)
+    test_loader = make_loader(make_dataset(test_df, False, **data), **loader_kwargs)
+    prepare = make_prepare(args.cache, args.cache_mode)
+
+    teacher = load_model(args.teacher)
+    if teacher.checkpoint_info["attributes"] != ATTRIBUTES:
+        print("❌ Teacher attributes do not match training.config.ATTRIBUTES")
+        return 1
+    teacher_backbone = teacher.checkpoint_info["backbone"]
+    teacher.to(device).eval()
+    student = build_model(len(ATTRIBUTES), args.student, pretrained=not args.no_pretrained).to(device)
+    pos_weight = pos_weight_from_labels(train_labels).to(device)
+
+    def loss_fn(logits, labels, imgs):
+        with torch.no_grad(), torch.autocast(device_type=device.type, dtype=amp_dtype or torch.float32,
+                                             enabled=amp_dtype is not None):
+            teacher_logits = teacher(imgs).float()
+        return distillation_loss(logits, teacher_logits, labels, args.temperature, args.alpha, pos_weight)
+
+    optimizer = torch.optim.AdamW(student.parameters(), lr=args.lr, weight_decay=WEIGHT_DECAY)
+    scheduler = torch.optim.lr_scheduler.CosineAnnealingLR(optimizer, T_max=args.epochs)
+    scaler = torch.amp.GradScaler(device.type, enabled=amp_dtype == torch.float16)
+
+    report = ThroughputReport()
+    best_metric, best_state = -1.0, None
+    for epoch in range(1, args.epochs + 1):
+        train_loss = train_one_epoch(student, train_loader, optimizer, scaler, device, amp_dtype=amp_dtype,
+                                     stats=report.phase("train"), prepare=prepare, loss_fn=loss_fn)
+        val_probs, val_targets, val_loss = predict(student, val_loader, device, pos_weight, amp_dtype,
+                                                   report.phase("val"), prepare)
+        scheduler.step()
+        val_auc = summarize(val_probs, val_targets)["mean_auc"]
+        print(f"Epoch {epoch}/{args.epochs} | Distill loss: {train_loss:.4f} | Val loss: {val_loss:.4f} | "
+              f"Mean val Auc: {val_auc:.4f}")
+        if not math.isnan(val_auc) and val_auc > best_metric:
+            best_metric = val_auc
+            best_state = {name: t.detach().cpu().clone() for name, t in student.state_dict().items()}
+            save_bundle(args.out, best_state, backbone=args.student, metrics={"val_mean_auc": best_metric})
+            print(f"✅ Saved best student (Mean Auc={best_metric:.4f}) to {args.out}")
+    if best_state is not None:
+        student.load_state_dict(best_state)
+
+    # Both models get thresholds tuned the same way so the comparison is fair
+    results = {}
+    for name, model in (("teacher", teacher), ("student", student)):
+        val_probs, val_targets, _ = predict(model, val_loader, device, amp_dtype=amp_dtype, prepare=prepare)
+        thresholds, _ = tune_thresholds(val_probs, val_targets, objective=args.objective)
+        test_probs, test_targets, _ = predict(model, test_loader, device, amp_dtype=amp_dtype,
+                                              stats=report.phase(f"test_{name}"), prepare=prepare)
+        test_acc, per_attr = evaluate_with_thresholds(test_probs, test_targets, thresholds)
+        results[name] = {"thresholds": thresholds, "mean_acc": test_acc, "per_attr_acc": per_attr,
+                         "mean_auc": summarize(test_probs, test_targets)["mean_auc"]}
+
+    save_bundle(args.out, student, results["student"]["thresholds"], ATTRIBUTES, args.student, IMG_SIZE,
+                args.objective, metrics={"val_mean_auc": best_metric, "test_mean_acc": results["student"]["mean_acc"],
+                                         "test_mean_auc": results["student"]["mean_auc"]})
+
+    torch.set_num_threads(args.latency_threads)
+    for name, model in (("teacher", teacher), ("student", student)):
+        model.cpu()
+        results[name].update(measure_latency(model), weight_mb=weight_bytes(model) / 1e6,
+                             params_m=sum(p.numel() for p in model.parameters()) / 1e6)
+
+    teacher_res, student_res = results["teacher"], results["student"]
+    print(f"\n{'attribute':25s} {'teacher':>8} {'student':>8} {'delta':>7}")
+    for attr, t_acc, s_acc in zip(ATTRIBUTES, teacher_res["per_attr_acc"], student_res["per_attr_acc"]):
+        print(f"{attr:25s} {t_acc:8.4f} {s_acc:8.4f} {s_acc - t_acc:+7.4f}")
+    print(f"{'mean':25s} {teacher_res['mean_acc']:8.4f} {student_res['mean_acc']:8.4f} "
+          f"{student_res['mean_acc'] - teacher_res['mean_acc']:+7.4f}")
+
+    print(f"\n{'model':<8} {'backbone':<24} {'params':>8} {'weights':>9} {'p50':>8} {'p95':>8} {'test auc':>9}")
+    for name, backbone in (("teacher", teacher_backbone), ("student", args.student)):
+        r = results[name]
+        print(f"{name:<8} {backbone:<24} {r['params_m']:7.1f}M {r['weight_mb']:7.1f}MB "
+              f"{r['p50_ms']:6.1f}ms {r['p95_ms']:6.1f}ms {r['mean_auc']:9.4f}")
+    print(f"\nStudent: {teacher_res['p50_ms'] / student_res['p50_ms']:.1f}x faster, "
+          f"{teacher_res['weight_mb'] / student_res['weight_mb']:.1f}x smaller "
+          f"({args.latency_threads} CPU thread{'s' if args.latency_threads != 1 else ''})")
+    print(f"✅ Saved student bundle to {args.out}")
+    report.print()
+
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump({
+                name: {
+                    "backbone": teacher_backbone if name == "teacher" else args.student,
+                    "per_attr_acc": dict(zip(ATTRIBUTES, map(float, r["per_attr_acc"]))),
+                    **{k: float(r[k]) for k in ("mean_acc", "mean_auc", "p50_ms", "p95_ms", "weight_mb", "params_m")},
+                }
+                for name, r in results.items()
+            }, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
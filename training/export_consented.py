@@ -0,0 +1,172 @@
+"""
+Pack consented crops into a retraining dataset.
+
+Reads the consent index (no directory walk), resizes every accepted crop so its
+short side is IMG_SIZE and writes WebDataset-style tar shards: each sample is
+`<key>.jpg` plus `<key>.json` with its attribute labels. A sidecar labels.csv in
+the notebook's CSV format (image_id + one 0/1 column per attribute) and a
+manifest.json are written next to the shards.
+
+Labels are the model's own predictions recorded at consent time, i.e. pseudo-
+labels; review or correct labels.csv before using it as ground truth. Consents
+without a recorded prediction are skipped unless --include-unlabeled is given.
+
+Usage:
+    python -m training.export_consented --out exports/consented [--shard-size 1000]
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import tarfile
+import time
+from pathlib import Path
+
+from PIL import Image
+
+from training.config import ATTRIBUTES, FILENAME_COL, IMG_SIZE
+
+
+class ShardWriter:
+    """Writes samples into numbered tar files, starting a new one every `max_samples`."""
+
+    def __init__(self, out_dir: Path, prefix: str = "consented", max_samples: int = 1000):
+        self.out_dir = Path(out_dir)
+        self.prefix = prefix
+        self.max_samples = max_samples
+        self.shards = []
+        self._tar = None
+        self._count = 0
+
+    def _open_next(self) -> None:
+        self.close()
+        name = f"{self.prefix}-{len(self.shards):06d}.tar"
+        self.shards.append(name)
+        self._tar = tarfile.open(self.out_dir / name, "w")
+        self._count = 0
+
+    def write(self, key: str, files: dict) -> str:
+        """Add one sample (extension -> bytes). Returns the shard it went into."""
+        if self._tar is None or self._count >= self.max_samples:
+            self._open_next()
+        mtime = time.time()
+        for ext, data in files.items():
+            info = tarfile.TarInfo(f"{key}.{ext}")
+            info.size = len(data)
+            info.mtime = mtime
+            self._tar.addfile(info, io.BytesIO(data))
+        self._count += 1
+        return self.shards[-1]
+
+    def close(self) -> None:
+        if self._tar is not None:
+            self._tar.close()
+            self._tar = None
+
+
+def resize_short_side(img: Image.Image, size: int) -> Image.Image:
+    width, height = img.size
+    scale = size / min(width, height)
+    if scale >= 1.0:
+        return img
+    return img.resize((max(size, round(width * scale)), max(size, round(height * scale))), Image.BILINEAR)
+
+
+def labels_from_prediction(prediction: dict) -> dict:
+    """0/1 label per attribute from a stored {"attr": {"predicted": bool}} prediction."""
+    labels = {}
+    for attr in ATTRIBUTES:
+        value = prediction.get(attr)
+        if isinstance(value, dict):
+            value = value.get("predicted")
+        labels[attr] = int(bool(value)) if value is not None else None
+    return labels
+
+
+def export(entries, accepted_dir: Path, out_dir: Path, size: int = IMG_SIZE,
+           shard_size: int = 1000, quality: int = 95, include_unlabeled: bool = False) -> dict:
+    """
+    Export consent index entries into shards.
+
+    Returns:
+        dict: The manifest that was written
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    writer = ShardWriter(out_dir, max_samples=shard_size)
+    exported = skipped_unlabeled = missing = 0
+    start = time.perf_counter()
+
+    with open(out_dir / "labels.csv", "w", encoding="utf-8", newline="") as label_file:
+        table = csv.writer(label_file)
+        table.writerow([FILENAME_COL] + ATTRIBUTES + ["shard", "sha256"])
+
+        for entry in entries:
+            prediction = json.loads(entry["prediction"]) if entry.get("prediction") else None
+            if prediction is None and not include_unlabeled:
+                skipped_unlabeled += 1
+                continue
+
+            path = Path(accepted_dir) / entry["path"]
+            try:
+                with Image.open(path) as img:
+                    img = resize_short_side(img.convert("RGB"), size)
+                    buf = io.BytesIO()
+                    img.save(buf, format="JPEG", quality=quality)
+            except (FileNotFoundError, OSError):
+                missing += 1
+                continue
+
+            labels = labels_from_prediction(prediction or {})
+            key = os.path.splitext(entry["filename"])[0]
+            shard = writer.write(key, {
+                "jpg": buf.getvalue(),
+                "json": json.dumps({"image_id": entry["filename"], "labels": labels}).encode("utf-8"),
+            })
+            table.writerow([entry["filename"]] + ["" if labels[a] is None else labels[a] for a in ATTRIBUTES]
+                           + [shard, entry["sha256"]])
+            exported += 1
+
+    writer.close()
+    manifest = {
+        "created_at": time.time(),
+        "samples": exported,
+        "skipped_unlabeled": skipped_unlabeled,
+        "missing_files": missing,
+        "image_size": size,
+        "attributes": ATTRIBUTES,
+        "shards": writer.shards,
+        "labels": "labels.csv",
+    }
+    with open(out_dir / "manifest.json", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+    elapsed = time.perf_counter() - start
+    print(f"✅ Exported {exported} samples into {len(writer.shards)} shards in {elapsed:.1f}s "
+          f"({skipped_unlabeled} unlabeled skipped, {missing} missing)")
+    return manifest
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Export consented images as a training dataset")
+    parser.add_argument("--out", required=True, help="Output directory")
+    parser.add_argument("--size", type=int, default=IMG_SIZE, help="Short side after resizing")
+    parser.add_argument("--shard-size", type=int, default=1000, help="Samples per tar shard")
+    parser.add_argument("--quality", type=int, default=95, help="JPEG quality of re-encoded crops")
+    parser.add_argument("--since", type=float, default=0.0, help="Only consents after this epoch time")
+    parser.add_argument("--include-unlabeled", action="store_true")
+    args = parser.parse_args()
+
+    from consent_store import default_index
+
+    index = default_index()
+    export(index.iter_entries(args.since), index.accepted_dir, Path(args.out), size=args.size,
+           shard_size=args.shard_size, quality=args.quality, include_unlabeled=args.include_unlabeled)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
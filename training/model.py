@@ -0,0 +1,52 @@
+"""Model, loss and parameter groups from model/convnext_tiny_celeb.ipynb."""
+
+import numpy as np
+import torch
+import torch.nn.functional as F
+
+from training.config import BACKBONE
+
+HEAD_KEYWORDS = ("head", "fc", "classifier", "output", "ln", "norm")
+
+
+def build_model(num_classes: int, backbone: str = BACKBONE, pretrained: bool = True):
+    import timm
+    return timm.create_model(backbone.lower(), pretrained=pretrained, num_classes=num_classes)
+
+
+def focal_bce_with_logits(logits, targets, pos_weight=None, alpha=0.25, gamma=2.0, reduction='mean'):
+    bce = F.binary_cross_entropy_with_logits(logits, targets, pos_weight=pos_weight, reduction='none')
+    probs = torch.sigmoid(logits)
+    p_t = probs * targets + (1 - probs) * (1 - targets)
+    modulating_factor = (1.0 - p_t) ** gamma
+    alpha_factor = targets * alpha + (1 - targets) * (1 - alpha)
+    loss = alpha_factor * modulating_factor * bce
+    if reduction == 'mean':
+        return loss.mean()
+    elif reduction == 'sum':
+        return loss.sum()
+    return loss
+
+
+def pos_weight_from_labels(labels: np.ndarray) -> torch.Tensor:
+    """neg/pos ratio per attribute (1.0 for attributes without positives)."""
+    pos = labels.sum(axis=0)
+    neg = len(labels) - pos
+    return torch.tensor(np.where(pos == 0, 1.0, neg / (pos + 1e-6)), dtype=torch.float32)
+
+
+def is_head_param(name: str) -> bool:
+    return any(k in name.lower() for k in HEAD_KEYWORDS)
+
+
+def param_groups(model, lr_head: float, lr_backbone: float):
+    head_params, backbone_params = [], []
+    for name, p in model.named_parameters():
+        (head_params if is_head_param(name) else backbone_params).append(p)
+    return [{"params": head_params, "lr": lr_head}, {"params": backbone_params, "lr": lr_backbone}]
+
+
+def set_backbone_frozen(model, frozen: bool) -> None:
+    """Freeze everything except the head parameters (the notebook's FREEZE_EPOCHS phase)."""
+    for name, p in model.named_parameters():
+        p.requires_grad = not frozen or is_head_param(name)
@@ -0,0 +1,102 @@
+"""
+Streaming dataset over the tar shards written by training.export_consented.
+
+Each worker reads whole shards sequentially (one open + sequential reads per
+shard instead of one open/stat per image), so the notebook's per-file
+FacesDataset lookups across DATA_DIRS go away. Shards are split between
+DataLoader workers; an optional shuffle buffer mixes samples across shards.
+"""
+
+import glob
+import io
+import json
+import os
+import random
+import tarfile
+from typing import Callable, Iterator, List, Optional, Sequence, Union
+
+import numpy as np
+import torch
+from PIL import Image
+from torch.utils.data import IterableDataset, get_worker_info
+
+from training.config import ATTRIBUTES
+
+
+def _iter_samples(shard_path: str) -> Iterator[dict]:
+    """Groups consecutive tar members by key: {"__key__": key, ext: bytes, ...}."""
+    sample = None
+    with tarfile.open(shard_path, "r|") as tar:  # streaming mode, no random access
+        for member in tar:
+            if not member.isfile():
+                continue
+            key, _, ext = member.name.rpartition(".")
+            if sample is not None and sample["__key__"] != key:
+                yield sample
+                sample = None
+            if sample is None:
+                sample = {"__key__": key}
+            sample[ext] = tar.extractfile(member).read()
+    if sample is not None:
+        yield sample
+
+
+class ShardDataset(IterableDataset):
+    def __init__(self, shards: Union[str, Sequence[str]], attr_cols: List[str] = ATTRIBUTES,
+                 transforms: Optional[Callable] = None, shuffle_buffer: int = 0, seed: int = 0):
+        """
+        Args:
+            shards: Directory, glob pattern or list of .tar paths
+            attr_cols: Attribute order of the label tensor
+            transforms: torchvision-style transform applied to the PIL image
+            shuffle_buffer: Size of the sample shuffle buffer (0 = keep shard order)
+            seed: Seed for shard order and buffer shuffling
+        """
+        if isinstance(shards, str):
+            pattern = os.path.join(shards, "*.tar") if os.path.isdir(shards) else shards
+            shards = sorted(glob.glob(pattern))
+        self.shards = list(shards)
+        self.attr_cols = list(attr_cols)
+        self.transforms = transforms
+        self.shuffle_buffer = shuffle_buffer
+        self.seed = seed
+        self.epoch = 0
+
+    def set_epoch(self, epoch: int) -> None:
+        self.epoch = epoch
+
+    def _worker_shards(self) -> List[str]:
+        shards = list(self.shards)
+        if self.shuffle_buffer:
+            random.Random(self.seed + self.epoch).shuffle(shards)
+        info = get_worker_info()
+        if info is None:
+            return shards
+        return shards[info.id::info.num_workers]
+
+    def _decode(self, sample: dict):
+        img = Image.open(io.BytesIO(sample["jpg"])).convert("RGB")
+        if self.transforms:
+            img = self.transforms(img)
+        labels = json.loads(sample["json"])["labels"]
+        # Unlabeled attributes (None) become 0, matching the notebook's -1 -> 0 mapping
+        attrs = torch.tensor(np.array([labels.get(a) or 0 for a in self.attr_cols], dtype=np.float32))
+        return img, attrs
+
+    def __iter__(self):
+        info = get_worker_info()
+        rng = random.Random(self.seed + self.epoch + (info.id if info else 0))
+        buffer = []
+        for shard in self._worker_shards():
+            for sample in _iter_samples(shard):
+                if "jpg" not in sample or "json" not in sample:
+                    continue
+                if not self.shuffle_buffer:
+                    yield self._decode(sample)
+                    continue
+                buffer.append(sample)
+                if len(buffer) >= self.shuffle_buffer:
+                    yield self._decode(buffer.pop(rng.randrange(len(buffer))))
+        rng.shuffle(buffer)
+        for sample in buffer:
+            yield self._decode(sample)
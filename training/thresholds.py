@@ -0,0 +1,180 @@
+"""
+Per-attribute decision thresholds, tuned on validation predictions.
+
+The notebook's tune_thresholds tried 101 grid thresholds per attribute, each a
+full pass over the validation set. Here every attribute is handled at once:
+probabilities are sorted per column, cumulative positive counts give the
+confusion matrix at every possible cut point, and the objective is evaluated
+for all (attribute, cut) pairs in one vectorized step. That is O(n log n) per
+attribute and yields the exact optimum rather than a grid approximation.
+
+Usage:
+    python -m training.thresholds val_probs.npz --objective f1 --out model/thresholds.json
+    (the .npz holds `probs` and `targets` arrays of shape (n_samples, n_attributes))
+"""
+
+import argparse
+import json
+import sys
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from training.config import ATTRIBUTES
+
+OBJECTIVES = ("accuracy", "f1", "balanced_accuracy")
+
+
+def _objective(name: str, tp, fp, fn, tn) -> np.ndarray:
+    positives = tp + fn
+    negatives = fp + tn
+    with np.errstate(divide="ignore", invalid="ignore"):
+        if name == "accuracy":
+            return (tp + tn) / (positives + negatives)
+        if name == "f1":
+            return np.where(2 * tp + fp + fn > 0, 2 * tp / (2 * tp + fp + fn), 0.0)
+        if name == "balanced_accuracy":
+            tpr = np.where(positives > 0, tp / positives, np.nan)
+            tnr = np.where(negatives > 0, tn / negatives, np.nan)
+            # Single-class columns fall back to the rate that is defined
+            return np.nan_to_num(np.nanmean(np.stack([tpr, tnr]), axis=0), nan=0.0)
+    raise ValueError(f"Unknown objective '{name}', expected one of {OBJECTIVES}")
+
+
+def _pick(scores: np.ndarray, thresholds: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Best cut per column; ties go to the threshold closest to 0.5."""
+    best = scores.max(axis=0)
+    tied = scores >= best - 1e-12
+    distance = np.where(tied, np.abs(thresholds - 0.5), np.inf)
+    idx = distance.argmin(axis=0)
+    cols = np.arange(scores.shape[1])
+    return thresholds[idx, cols], scores[idx, cols]
+
+
+def tune_thresholds(probs: np.ndarray, targets: np.ndarray, objective: str = "accuracy",
+                    grid: Optional[Sequence[float]] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Find the threshold that maximizes `objective` for every attribute.
+
+    Args:
+        probs (ndarray): Sigmoid outputs, shape (n_samples, n_attributes)
+        targets (ndarray): 0/1 labels, same shape
+        objective (str): "accuracy", "f1" or "balanced_accuracy"
+        grid (sequence, optional): Restrict candidates to these thresholds
+            (e.g. np.linspace(0, 1, 101) to reproduce the notebook); by default
+            every cut between distinct probabilities is considered
+
+    Returns:
+        tuple: (thresholds, best scores), each of shape (n_attributes,);
+            predictions are `probs >= thresholds`
+    """
+    probs = np.asarray(probs, dtype=np.float64)
+    targets = np.asarray(targets, dtype=np.float64)
+    if probs.shape != targets.shape or probs.ndim != 2:
+        raise ValueError(f"probs and targets must be matching 2-D arrays, got {probs.shape} and {targets.shape}")
+    n, n_attrs = probs.shape
+    cols = np.arange(n_attrs)
+
+    order = np.argsort(-probs, axis=0, kind="stable")
+    sorted_probs = np.take_along_axis(probs, order, axis=0)
+    sorted_targets = np.take_along_axis(targets, order, axis=0)
+    # cum_tp[k] = positives among the k highest probabilities, k = 0..n
+    cum_tp = np.vstack([np.zeros((1, n_attrs)), np.cumsum(sorted_targets, axis=0)])
+    total_pos = cum_tp[-1]
+
+    if grid is None:
+        k = np.arange(n + 1)[:, None]
+        # Threshold for "top k are positive": midway between the k-th and (k+1)-th probability
+        upper = np.vstack([np.nextafter(sorted_probs[:1], np.inf), sorted_probs])
+        lower = np.vstack([sorted_probs, sorted_probs[-1:]])
+        thresholds = np.where(k == n, sorted_probs[-1:], (upper + lower) / 2)
+        thresholds = np.where((thresholds > lower) | (k == n), thresholds, upper)
+        # A cut inside a run of equal probabilities is not achievable by any threshold
+        valid = np.vstack([np.ones((1, n_attrs), bool), sorted_probs[:-1] > sorted_probs[1:],
+                           np.ones((1, n_attrs), bool)])
+        counts = np.broadcast_to(k, (n + 1, n_attrs))
+    else:
+        grid = np.asarray(grid, dtype=np.float64)
+        thresholds = np.broadcast_to(grid[:, None], (len(grid), n_attrs))
+        # Number of probabilities >= each grid value, per column (ascending view of the sort)
+        ascending = sorted_probs[::-1]
+        counts = np.stack([n - np.searchsorted(ascending[:, j], grid, side="left") for j in cols], axis=1)
+        valid = np.ones_like(counts, dtype=bool)
+
+    tp = np.take_along_axis(cum_tp, counts, axis=0)
+    fp = counts - tp
+    fn = total_pos - tp
+    tn = (n - total_pos) - fp
+    scores = np.where(valid, _objective(objective, tp, fp, fn, tn), -np.inf)
+    return _pick(scores, thresholds)
+
+
+def evaluate_with_thresholds(probs: np.ndarray, targets: np.ndarray,
+                             thresholds: np.ndarray) -> Tuple[float, np.ndarray]:
+    """
+    Returns:
+        tuple: (mean accuracy, per-attribute accuracy)
+    """
+    preds = np.asarray(probs) >= np.asarray(thresholds)[None, :]
+    per_attr_acc = (preds == np.asarray(targets).astype(bool)).mean(axis=0)
+    return float(per_attr_acc.mean()), per_attr_acc
+
+
+def collect_predictions(model, loader, device, desc: str = "Predict") -> Tuple[np.ndarray, np.ndarray]:
+    """Run `model` over `loader` once; returns (probs, targets) for tuning and evaluation."""
+    import torch
+    from tqdm import tqdm
+
+    model.eval()
+    all_targets, all_probs = [], []
+    with torch.no_grad():
+        for imgs, labels in tqdm(loader, desc=desc, leave=False):
+            outputs = model(imgs.to(device))
+            all_probs.append(torch.sigmoid(outputs.float()).cpu().numpy())
+            all_targets.append(labels.numpy())
+    return np.vstack(all_probs), np.vstack(all_targets)
+
+
+def save_thresholds(path: str, thresholds: Sequence[float], attributes: List[str] = ATTRIBUTES,
+                    objective: str = "accuracy") -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({
+            "objective": objective,
+            "thresholds": {attr: round(float(th), 6) for attr, th in zip(attributes, thresholds)},
+        }, f, indent=2)
+
+
+def load_thresholds(path: str, attributes: List[str] = ATTRIBUTES, default: float = 0.5) -> np.ndarray:
+    """Thresholds in `attributes` order; attributes missing from the file get `default`."""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    by_name: Dict[str, float] = data.get("thresholds", data)
+    return np.array([float(by_name.get(attr, default)) for attr in attributes])
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Tune per-attribute thresholds from saved predictions")
+    parser.add_argument("predictions", help=".npz with `probs` and `targets` arrays")
+    parser.add_argument("--objective", choices=OBJECTIVES, default="accuracy")
+    parser.add_argument("--grid", type=int, default=0, help="Use an N-point grid over [0, 1] instead of exact cuts")
+    parser.add_argument("--out", help="Write thresholds JSON here")
+    args = parser.parse_args()
+
+    data = np.load(args.predictions)
+    probs, targets = data["probs"], data["targets"]
+    grid = np.linspace(0.0, 1.0, args.grid) if args.grid else None
+    thresholds, scores = tune_thresholds(probs, targets, args.objective, grid=grid)
+    _, per_attr_acc = evaluate_with_thresholds(probs, targets, thresholds)
+
+    for name, th, score, acc in zip(ATTRIBUTES, thresholds, scores, per_attr_acc):
+        print(f"{name:25s}: th={th:.3f} {args.objective}={score:.4f} acc={acc:.4f}")
+    print(f"\nMean {args.objective}: {scores.mean():.4f} | Mean accuracy: {per_attr_acc.mean():.4f}")
+
+    if args.out:
+        save_thresholds(args.out, thresholds, objective=args.objective)
+        print(f"✅ Saved thresholds to {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())